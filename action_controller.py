@@ -1,121 +1,251 @@
 # action_controller.py
-
-import pyautogui
+#
+# Gesture -> action dispatch. The profile mappings (gesture name -> action key) are compiled
+# once into one immutable table per profile, gesture -> _Binding (the action with the backend
+# and its arguments already bound, plus whether it is subject to the swipe cooldown).
+# execute_action is then one dict lookup and a call. Mapping updates (from the Tk thread) and
+# profile changes (from app_detector's thread) build the new tables first and swap them in with
+# a single attribute assignment, so execute_action never takes a lock or sees a half-updated map.
+# A mapping may also name a macro (config.MACROS) or hold a step list; those bindings hand the
+# compiled macro to a MacroPlayer and return immediately (see macros.py).
+
+import threading
 import time
 import config
 import app_detector # To get the current application profile
+import input_backends
+from action_scheduler import ActionScheduler
+from macros import MacroPlayer, compile_macro
 
 # --- Define Base Actions ---
+# Every action receives the input backend (see input_backends.py) as its first argument.
 BASE_ACTIONS = {
-    "do_nothing": lambda **kwargs: None,
-    "mouse_move": lambda x, y, **kwargs: pyautogui.moveTo(x, y, duration=config.PYAUTOGUI_MOVE_DURATION_MOUSE),
-    "mouse_drag": lambda x, y, **kwargs: pyautogui.moveTo(x, y, duration=config.PYAUTOGUI_MOVE_DURATION_DRAG),
-    "left_click": lambda **kwargs: pyautogui.click(),
-    "double_click": lambda **kwargs: pyautogui.doubleClick(),
-    "mouse_down_left": lambda **kwargs: pyautogui.mouseDown(button='left'),
-    "mouse_up_left": lambda **kwargs: pyautogui.mouseUp(button='left'),
-    "scroll": lambda amount, **kwargs: pyautogui.scroll(amount),
-    "hotkey_left": lambda **kwargs: pyautogui.hotkey('left'),
-    "hotkey_right": lambda **kwargs: pyautogui.hotkey('right'),
-    "hotkey_up": lambda **kwargs: pyautogui.hotkey('up'),
-    "hotkey_down": lambda **kwargs: pyautogui.hotkey('down'),
-    "hotkey_alt_left": lambda **kwargs: pyautogui.hotkey('alt', 'left'), # Example for browser back
-    "hotkey_alt_right": lambda **kwargs: pyautogui.hotkey('alt', 'right'),# Example for browser forward
-    "hotkey_ctrl_z": lambda **kwargs: pyautogui.hotkey('ctrl', 'z'),
-    "hotkey_ctrl_shift_z": lambda **kwargs: pyautogui.hotkey('ctrl', 'shift', 'z'),
+    "do_nothing": lambda backend, **kwargs: None,
+    "mouse_move": lambda backend, x, y, **kwargs: backend.move_to(x, y, duration=config.PYAUTOGUI_MOVE_DURATION_MOUSE),
+    "mouse_drag": lambda backend, x, y, **kwargs: backend.move_to(x, y, duration=config.PYAUTOGUI_MOVE_DURATION_DRAG),
+    "left_click": lambda backend, **kwargs: backend.click(),
+    "double_click": lambda backend, **kwargs: backend.double_click(),
+    "mouse_down_left": lambda backend, **kwargs: backend.mouse_down('left'),
+    "mouse_up_left": lambda backend, **kwargs: backend.mouse_up('left'),
+    "scroll": lambda backend, amount, **kwargs: backend.scroll(amount),
+    "hotkey_left": lambda backend, **kwargs: backend.hotkey('left'),
+    "hotkey_right": lambda backend, **kwargs: backend.hotkey('right'),
+    "hotkey_up": lambda backend, **kwargs: backend.hotkey('up'),
+    "hotkey_down": lambda backend, **kwargs: backend.hotkey('down'),
+    "hotkey_alt_left": lambda backend, **kwargs: backend.hotkey('alt', 'left'), # Example for browser back
+    "hotkey_alt_right": lambda backend, **kwargs: backend.hotkey('alt', 'right'),# Example for browser forward
+    "hotkey_ctrl_z": lambda backend, **kwargs: backend.hotkey('ctrl', 'z'),
+    "hotkey_ctrl_shift_z": lambda backend, **kwargs: backend.hotkey('ctrl', 'shift', 'z'),
+    "zoom_in": lambda backend, **kwargs: backend.hotkey('ctrl', '='),
+    "zoom_out": lambda backend, **kwargs: backend.hotkey('ctrl', '-'),
     # New keyboard actions
-    "press_f5": lambda **kwargs: pyautogui.hotkey('shift', 'f5'),
-    "press_a": lambda **kwargs: pyautogui.press('a'),
-    "press_b": lambda **kwargs: pyautogui.press('b'),
-    "press_c": lambda **kwargs: pyautogui.press('c'),
-    "press_d": lambda **kwargs: pyautogui.press('d'),
-    "press_e": lambda **kwargs: pyautogui.press('e'),
-    "press_f": lambda **kwargs: pyautogui.press('f'),
-    "press_g": lambda **kwargs: pyautogui.press('g'),
-    "press_h": lambda **kwargs: pyautogui.press('h'),
-    "press_i": lambda **kwargs: pyautogui.press('i'),
-    "press_j": lambda **kwargs: pyautogui.press('j'),
-    "press_k": lambda **kwargs: pyautogui.press('k'),
-    "press_l": lambda **kwargs: pyautogui.press('l'),
-    "press_m": lambda **kwargs: pyautogui.press('m'),
-    "press_n": lambda **kwargs: pyautogui.press('n'),
-    "press_o": lambda **kwargs: pyautogui.press('o'),
-    "press_p": lambda **kwargs: pyautogui.press('p'),
-    "press_q": lambda **kwargs: pyautogui.press('q'),
-    "press_r": lambda **kwargs: pyautogui.press('r'),
-    "press_s": lambda **kwargs: pyautogui.press('s'),
-    "press_t": lambda **kwargs: pyautogui.press('t'),
-    "press_u": lambda **kwargs: pyautogui.press('u'),
-    "press_v": lambda **kwargs: pyautogui.press('v'),
-    "press_w": lambda **kwargs: pyautogui.press('w'),
-    "press_x": lambda **kwargs: pyautogui.press('x'),
-    "press_y": lambda **kwargs: pyautogui.press('y'),
-    "press_z": lambda **kwargs: pyautogui.press('z'),
-    "press_space": lambda **kwargs: pyautogui.press('space'),
-    "press_esc": lambda **kwargs: pyautogui.press('esc'),
+    "press_f5": lambda backend, **kwargs: backend.hotkey('shift', 'f5'),
+    "press_a": lambda backend, **kwargs: backend.press('a'),
+    "press_b": lambda backend, **kwargs: backend.press('b'),
+    "press_c": lambda backend, **kwargs: backend.press('c'),
+    "press_d": lambda backend, **kwargs: backend.press('d'),
+    "press_e": lambda backend, **kwargs: backend.press('e'),
+    "press_f": lambda backend, **kwargs: backend.press('f'),
+    "press_g": lambda backend, **kwargs: backend.press('g'),
+    "press_h": lambda backend, **kwargs: backend.press('h'),
+    "press_i": lambda backend, **kwargs: backend.press('i'),
+    "press_j": lambda backend, **kwargs: backend.press('j'),
+    "press_k": lambda backend, **kwargs: backend.press('k'),
+    "press_l": lambda backend, **kwargs: backend.press('l'),
+    "press_m": lambda backend, **kwargs: backend.press('m'),
+    "press_n": lambda backend, **kwargs: backend.press('n'),
+    "press_o": lambda backend, **kwargs: backend.press('o'),
+    "press_p": lambda backend, **kwargs: backend.press('p'),
+    "press_q": lambda backend, **kwargs: backend.press('q'),
+    "press_r": lambda backend, **kwargs: backend.press('r'),
+    "press_s": lambda backend, **kwargs: backend.press('s'),
+    "press_t": lambda backend, **kwargs: backend.press('t'),
+    "press_u": lambda backend, **kwargs: backend.press('u'),
+    "press_v": lambda backend, **kwargs: backend.press('v'),
+    "press_w": lambda backend, **kwargs: backend.press('w'),
+    "press_x": lambda backend, **kwargs: backend.press('x'),
+    "press_y": lambda backend, **kwargs: backend.press('y'),
+    "press_z": lambda backend, **kwargs: backend.press('z'),
+    "press_space": lambda backend, **kwargs: backend.press('space'),
+    "press_esc": lambda backend, **kwargs: backend.press('esc'),
+
 
+}
 
+# Arguments the base actions read from the gesture data; actions not listed here take none.
+# Actions from a custom `actions` table get the whole gesture data as keyword arguments.
+ACTION_ARGUMENTS = {
+    "mouse_move": ("x", "y"),
+    "mouse_drag": ("x", "y"),
+    "scroll": ("amount",),
 }
 
+# Gestures that start (and are blocked by) the SWIPE_ACTION_DELAY cooldown
+COOLDOWN_GESTURES = frozenset([
+    config.GESTURE_SWIPE_LEFT, config.GESTURE_SWIPE_RIGHT,
+    config.GESTURE_SWIPE_UP, config.GESTURE_SWIPE_DOWN,
+    config.GESTURE_FIST_TO_OPEN, config.GESTURE_OPEN_TO_FIST,
+])
+
+_NO_DATA = {}  # shared, never modified
+
+
+class _Binding:
+    """One compiled mapping entry: call(gesture_data) runs the action."""
+    __slots__ = ("action_key", "call", "cooldown")
+
+    def __init__(self, action_key, call, cooldown):
+        self.action_key = action_key
+        self.call = call
+        self.cooldown = cooldown
+
 
 class ActionController:
-    def __init__(self, initial_mappings=None):
-        pyautogui.FAILSAFE = config.PYAUTOGUI_FAILSAFE
-        self.active_profile_name = app_detector.get_active_application_profile()
+    def __init__(self, initial_mappings=None, actions=None, clock=time.time, profile_provider=None, backend=None,
+                 macros=None):
+        """
+        actions: action key -> callable(backend, **gesture_data) table, defaults to BASE_ACTIONS.
+        macros: macro name -> step list table (see macros.py), defaults to config.MACROS.
+        clock: time source used for cooldowns.
+        profile_provider: callable returning the active profile name, defaults to app_detector
+            (whose background detector also pushes profile changes to this controller).
+        backend: input_backends.InputBackend, defaults to the one named by config.INPUT_BACKEND.
+        """
+        self.backend = backend if backend is not None else input_backends.create_backend()
+        self.actions = actions if actions is not None else BASE_ACTIONS
+        self.macros = macros if macros is not None else config.MACROS
+        self.macro_player = None  # created with the first macro binding
+        self.clock = clock
+        self.profile_provider = profile_provider if profile_provider is not None else app_detector.get_active_application_profile
+        self._follows_detector = profile_provider is None
+        self._swap_lock = threading.Lock()  # serializes the writers; execute_action never takes it
+        self._next_profile_poll = 0.0
+        self.active_profile_name = self.profile_provider()
         # Initialize with provided mappings or default from config
         self.all_app_gesture_mappings = initial_mappings if initial_mappings is not None else config.CUSTOM_APP_GESTURE_MAPPINGS
-        self.current_gesture_map = self.all_app_gesture_mappings.get(self.active_profile_name, self.all_app_gesture_mappings["default"])
-        print(f"ActionController initialized with profile: {self.active_profile_name}")
+        self._tables = self._compile_tables(self.all_app_gesture_mappings)
+        self._table = self._table_for(self._tables, self.active_profile_name)
+        if self._follows_detector:
+            app_detector.add_profile_listener(self._on_profile_changed)
+        print(f"ActionController initialized with profile: {self.active_profile_name} (input backend: {self.backend.name})")
 
         self.cooldown_until = 0.0
 
+    @property
+    def current_gesture_map(self):
+        """The active profile's gesture -> action key mapping (as compiled)."""
+        return {gesture: binding.action_key for gesture, binding in self._table.items()}
+
+    def _bind(self, action_key):
+        """callable(gesture_data) running `action_key` on this controller's backend."""
+        function = self.actions[action_key]
+        backend = self.backend
+        names = ACTION_ARGUMENTS.get(action_key, ()) if function is BASE_ACTIONS.get(action_key) else None
+        if names is None:
+            return lambda data: function(backend, **data)
+        if not names:
+            return lambda data: function(backend)
+        if len(names) == 1:
+            name = names[0]
+            return lambda data: function(backend, data[name])
+        first, second = names
+        return lambda data: function(backend, data[first], data[second])
+
+    def _bind_macro(self, name, steps):
+        """callable(gesture_data) starting the macro on the MacroPlayer; None (with a message) if it does not compile."""
+        try:
+            macro = compile_macro(name, steps, self.actions, ACTION_ARGUMENTS)
+        except (ValueError, TypeError) as e:
+            print(f"Ignoring macro: {e}")
+            return None
+        if self.macro_player is None:
+            self.macro_player = MacroPlayer(self.backend, ActionScheduler())
+        player = self.macro_player
+        return lambda data: player.start(macro)
+
+    def _compile_tables(self, mappings):
+        """profile -> {gesture: _Binding}; gestures mapped to unknown action keys or bad macros are left out."""
+        tables = {}
+        for profile, mapping in mappings.items():
+            table = {}
+            for gesture, action in mapping.items():
+                if isinstance(action, list):  # inline macro
+                    action_key, call = "macro", self._bind_macro(f"{profile}/{gesture}", action)
+                elif action in self.actions:
+                    action_key, call = action, self._bind(action)
+                elif action in self.macros:
+                    action_key, call = action, self._bind_macro(action, self.macros[action])
+                else:
+                    continue
+                if call is not None:
+                    table[gesture] = _Binding(action_key, call, gesture in COOLDOWN_GESTURES)
+            tables[profile] = table
+        return tables
+
+    @staticmethod
+    def _table_for(tables, profile_name):
+        return tables.get(profile_name, tables["default"])
+
     def update_profile(self):
-        new_profile_name = app_detector.get_active_application_profile()
+        self._on_profile_changed(self.profile_provider())
+
+    def _on_profile_changed(self, new_profile_name):
+        """Profile listener; called from app_detector's detector thread when the active window changes."""
         if new_profile_name != self.active_profile_name:
-            self.active_profile_name = new_profile_name
-            self.current_gesture_map = self.all_app_gesture_mappings.get(self.active_profile_name, self.all_app_gesture_mappings["default"])
+            with self._swap_lock:
+                self.active_profile_name = new_profile_name
+                self._table = self._table_for(self._tables, new_profile_name)
             print(f"ActionController switched to profile: {self.active_profile_name}")
+            if config.MACRO_CANCEL_ON_PROFILE_CHANGE:
+                self.cancel_macros()
+
+    def cancel_macros(self):
+        """Stops running macros and releases the keys / buttons they hold."""
+        if self.macro_player is not None:
+            self.macro_player.cancel_all()
+
+    def macro_snapshot(self):
+        """MacroPlayer and scheduler statistics (runs, scheduling jitter), or None without macros."""
+        return self.macro_player.snapshot() if self.macro_player is not None else None
+
+    def close(self):
+        """Unregisters the profile listener, stops macros (releasing held keys) and closes the backend."""
+        if self._follows_detector:
+            app_detector.remove_profile_listener(self._on_profile_changed)
+        if self.macro_player is not None:
+            self.macro_player.close()
+        self.backend.close()
 
     def update_gesture_mappings(self, new_mappings):
         """
         Updates the internal gesture mappings with new ones from the UI.
         """
-        self.all_app_gesture_mappings = new_mappings
-        # Re-apply the current profile's map based on the new mappings
-        self.current_gesture_map = self.all_app_gesture_mappings.get(self.active_profile_name, self.all_app_gesture_mappings["default"])
+        tables = self._compile_tables(new_mappings)
+        with self._swap_lock:
+            self.all_app_gesture_mappings = new_mappings
+            self._tables = tables
+            # Re-apply the current profile's map based on the new mappings
+            self._table = self._table_for(tables, self.active_profile_name)
         print("ActionController mappings updated.")
 
     def execute_action(self, gesture_name, gesture_data=None):
-        major_gestures = [
-            config.GESTURE_SWIPE_LEFT, config.GESTURE_SWIPE_RIGHT,
-            config.GESTURE_SWIPE_UP, config.GESTURE_SWIPE_DOWN,
-            config.GESTURE_FIST_TO_OPEN, config.GESTURE_OPEN_TO_FIST
-        ]
-
-        if time.time() < self.cooldown_until and gesture_name in major_gestures:
+        # While app_detector's background detector runs, profile changes are pushed to
+        # _on_profile_changed; otherwise poll the provider, at most every PROFILE_POLL_INTERVAL.
+        if not (self._follows_detector and app_detector.is_detector_running()):
+            now = self.clock()
+            if now >= self._next_profile_poll:
+                self._next_profile_poll = now + config.PROFILE_POLL_INTERVAL
+                self.update_profile()
+
+        binding = self._table.get(gesture_name)
+        if binding is None:
+            return
+        if binding.cooldown and self.clock() < self.cooldown_until:
             return
 
-        if gesture_data is None:
-            gesture_data = {}
-
-        self.update_profile()
-
-        action_key = self.current_gesture_map.get(gesture_name)
-
-        if action_key and action_key in BASE_ACTIONS:
-            action_function = BASE_ACTIONS[action_key]
-
-            try:
-                if action_key in ["mouse_move", "mouse_drag"]:
-                    x, y = gesture_data.get('x'), gesture_data.get('y')
-                    # print(f"DEBUG: Executing {action_key} to screen coordinates: X={x}, Y={y}")
-
-                action_function(**gesture_data)
-
-                if gesture_name in [config.GESTURE_SWIPE_LEFT, config.GESTURE_SWIPE_RIGHT,
-                                    config.GESTURE_SWIPE_UP, config.GESTURE_SWIPE_DOWN,
-                                    config.GESTURE_FIST_TO_OPEN, config.GESTURE_OPEN_TO_FIST]:
-                    self.cooldown_until = time.time() + config.SWIPE_ACTION_DELAY
-
-            except Exception as e:
-                print(f"Error executing action '{action_key}' for gesture '{gesture_name}': {e}")
\ No newline at end of file
+        try:
+            binding.call(gesture_data if gesture_data is not None else _NO_DATA)
+            if binding.cooldown:
+                self.cooldown_until = self.clock() + config.SWIPE_ACTION_DELAY
+        except Exception as e:
+            print(f"Error executing action '{binding.action_key}' for gesture '{gesture_name}': {e}")
@@ -0,0 +1,100 @@
+# action_dispatcher.py
+#
+# Runs ActionController.execute_action on its own thread so slow OS input calls
+# (pyautogui.moveTo with a duration, the global pyautogui.PAUSE sleep, ...) never stall
+# hand tracking or the display loop.
+#
+# Pending actions are kept in order. Continuous events are coalesced with the newest
+# pending entry of the same kind, so a slow input layer sees fewer, fresher events:
+#   - Mouse Moving / Dragging: the latest position wins.
+#   - Scroll Up / Scroll Down: amounts are summed; the direction follows the sign of the sum.
+# Discrete events (clicks, drag start/drop, swipes, key presses) are never merged or dropped,
+# and a continuous event never jumps ahead of a discrete one.
+# The capture-to-action time of every cursor move feeds an optional LatencyEstimate, which the
+# recognizer's cursor prediction extrapolates by (see motion_predictor.py).
+
+import threading
+import time
+from collections import deque
+
+import config
+from metrics import GLASS_TO_ACTION
+
+_LATEST_WINS = frozenset([config.GESTURE_MOUSE_MOVING, config.GESTURE_DRAGGING])
+_ACCUMULATE = frozenset([config.GESTURE_SCROLL_UP, config.GESTURE_SCROLL_DOWN])
+
+
+class ActionDispatcher:
+    def __init__(self, action_controller, metrics=None, latency_estimate=None):
+        self.action_controller = action_controller
+        self.metrics = metrics
+        self.latency_estimate = latency_estimate
+        self._pending = deque()  # [gesture_name, gesture_data, stamps]
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="ActionDispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Executes whatever is still pending (e.g. a drag drop), then stops the worker thread."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def submit(self, gesture_name, gesture_data, stamps=None):
+        """Queues a recognized gesture for execution. Never blocks on the OS input layer."""
+        stamps = dict(stamps) if stamps else {}
+        with self._cond:
+            tail = self._pending[-1] if self._pending else None
+            if tail is not None and self._coalesce(tail, gesture_name, gesture_data, stamps):
+                if self.metrics is not None:
+                    self.metrics.increment("actions_coalesced")
+                return
+            self._pending.append([gesture_name, gesture_data, stamps])
+            self._cond.notify()
+
+    def pending_count(self):
+        return len(self._pending)
+
+    @staticmethod
+    def _coalesce(tail, gesture_name, gesture_data, stamps):
+        """Merges the new event into the pending tail entry if both are the same continuous kind."""
+        tail_name, tail_data, _ = tail
+        if gesture_name in _LATEST_WINS and tail_name == gesture_name:
+            tail[1], tail[2] = gesture_data, stamps
+            return True
+        if gesture_name in _ACCUMULATE and tail_name in _ACCUMULATE:
+            amount = tail_data.get('amount', 0) + gesture_data.get('amount', 0)
+            merged = dict(gesture_data)
+            merged['amount'] = amount
+            tail[0] = config.GESTURE_SCROLL_UP if amount > 0 else config.GESTURE_SCROLL_DOWN
+            tail[1], tail[2] = merged, stamps
+            return True
+        return False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                gesture_name, gesture_data, stamps = self._pending.popleft()
+
+            if gesture_name in _ACCUMULATE and gesture_data.get('amount', 0) == 0:
+                continue  # scrolls that cancelled out while waiting
+            stamps["action_dequeue"] = time.perf_counter()
+            self.action_controller.execute_action(gesture_name, gesture_data)
+            stamps["action"] = time.perf_counter()
+            if self.metrics is not None:
+                self.metrics.record_stamps(stamps, first="action_dequeue", last="action")
+                if "capture" in stamps:
+                    self.metrics.record(GLASS_TO_ACTION, stamps["action"] - stamps["capture"])
+            if self.latency_estimate is not None and gesture_name in _LATEST_WINS and "capture" in stamps:
+                self.latency_estimate.update(stamps["action"] - stamps["capture"])
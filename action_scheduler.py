@@ -0,0 +1,133 @@
+# action_scheduler.py
+#
+# Timer thread for delayed input actions (macro steps, see macros.py). Timers live in a hashed
+# timer wheel: `slots` buckets of `tick` seconds each, a timer going into the bucket of its
+# deadline tick (modulo the wheel size). Scheduling is O(1) and cancelling removes the timer from
+# its (short) bucket; each tick only looks at one bucket, and timers more than one revolution
+# away simply stay in it until their tick comes around.
+#
+# The thread sleeps until the next tick only while timers are pending; with nothing scheduled
+# it waits on a condition variable and costs nothing. Callbacks run on the scheduler thread,
+# in deadline order within a tick, so input events of one macro never interleave out of order.
+# How late every timer fires (tick rounding + wake-up latency + earlier callbacks in the same
+# tick) is recorded in a LatencyHistogram as the scheduling jitter.
+
+import math
+import threading
+import time
+
+import config
+from metrics import LatencyHistogram
+
+
+class Timer:
+    __slots__ = ("deadline", "tick", "callback", "cancelled")
+
+    def __init__(self, deadline, tick, callback):
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        self.cancelled = False
+
+
+class ActionScheduler:
+    def __init__(self, tick=None, slots=None, clock=time.perf_counter):
+        """
+        tick: wheel resolution in seconds (config.ACTION_SCHEDULER_TICK).
+        slots: buckets in the wheel (config.ACTION_SCHEDULER_SLOTS); tick * slots is one revolution.
+        """
+        self.tick = tick if tick is not None else config.ACTION_SCHEDULER_TICK
+        self.slots = slots if slots is not None else config.ACTION_SCHEDULER_SLOTS
+        self.clock = clock
+        self.jitter = LatencyHistogram(window=config.METRICS_WINDOW_SECONDS)
+        self.fired = 0
+        self.cancelled = 0
+        self._wheel = [[] for _ in range(self.slots)]
+        self._pending = 0           # timers in the wheel
+        self._origin = clock()
+        self._last_tick = -1        # last tick whose bucket was processed
+        self._cond = threading.Condition(threading.Lock())
+        self._stopping = False
+        self._thread = None
+
+    def _tick_of(self, t):
+        return int(math.ceil((t - self._origin) / self.tick))
+
+    def schedule(self, deadline, callback):
+        """Runs callback() on the scheduler thread at `deadline` (clock time). Returns a Timer for cancel()."""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._start()
+            if not self._pending:
+                # The wheel was idle: continue from the current tick instead of replaying the idle ones
+                self._last_tick = max(self._last_tick, self._tick_of(self.clock()) - 1)
+            # Never into a bucket that has already been processed: past deadlines fire on the next tick
+            tick = max(self._tick_of(deadline), self._last_tick + 1)
+            timer = Timer(deadline, tick, callback)
+            self._wheel[tick % self.slots].append(timer)
+            self._pending += 1
+            self._cond.notify()
+        return timer
+
+    def schedule_in(self, delay, callback):
+        return self.schedule(self.clock() + delay, callback)
+
+    def cancel(self, timer):
+        """Cancels a timer that has not fired yet (no effect afterwards)."""
+        with self._cond:
+            if not timer.cancelled:
+                timer.cancelled = True
+                self.cancelled += 1
+                bucket = self._wheel[timer.tick % self.slots]
+                if timer in bucket:  # not yet taken out by _run
+                    bucket.remove(timer)
+                    self._pending -= 1
+                    self._cond.notify()  # with nothing left pending the thread goes back to waiting
+
+    def _start(self):
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="ActionScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stops the thread; pending timers are dropped."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait_for(lambda: self._pending or self._stopping)
+                if self._stopping:
+                    return
+                next_tick = self._last_tick + 1
+                wait = self._origin + next_tick * self.tick - self.clock()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue  # re-check: stop requested, or an earlier timer scheduled
+                self._last_tick = next_tick
+                bucket = self._wheel[next_tick % self.slots]
+                due = [timer for timer in bucket if timer.tick <= next_tick]
+                if not due:
+                    continue
+                bucket[:] = [timer for timer in bucket if timer.tick > next_tick]
+                self._pending -= len(due)
+            due.sort(key=lambda timer: timer.deadline)
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                self.jitter.record(max(0.0, self.clock() - timer.deadline))
+                self.fired += 1
+                try:
+                    timer.callback()
+                except Exception as e:
+                    print(f"Error in scheduled action: {e}")
+
+    def snapshot(self):
+        stats = self.jitter.snapshot()
+        return {"fired": self.fired, "cancelled_timers": self.cancelled, "pending": self._pending,
+                "jitter_p50_ms": stats["p50_ms"], "jitter_p99_ms": stats["p99_ms"], "jitter_max_ms": stats["max_ms"]}
@@ -2,8 +2,16 @@
 # For a real implementation, you would use OS-specific libraries
 # like pywin32 (Windows), AppKit (macOS), or python-xlib (Linux).
 # Using pygetwindow for a cross-platform attempt.
+import os
+import select
+import sys
+import threading
+
 import pygetwindow as gw
 
+import config
+import profile_rules
+
 _current_app_profile_name = "default" # Default profile
 
 SUPPORTED_PROFILES = {
@@ -21,29 +29,59 @@ if _profile_keys:
     _current_app_profile_name = _profile_keys[0]
     _current_profile_index = 0
 
+# Background detector (see ProfileDetector); None until start_profile_detector() is called
+_detector = None
+_profile_listeners = []
 
-def get_active_application_profile():
+
+def profile_for_window_title(window_title, process=None, window_class=None):
+    """Maps a window (title, optional process / class name) to a profile name, or None if no rule matches."""
+    return profile_rules.get_rule_set().match(window_title, process, window_class)
+
+
+def _win32_window_details(hwnd, rule_set):
+    """(process name, window class) of a Win32 window; only what the rules actually use is queried."""
+    import ctypes
+    from ctypes import wintypes
+    user32, kernel32 = ctypes.windll.user32, ctypes.windll.kernel32
+    process = window_class = None
+    if rule_set.needs_window_class:
+        buf = ctypes.create_unicode_buffer(256)
+        if user32.GetClassNameW(hwnd, buf, 256):
+            window_class = buf.value
+    if rule_set.needs_process:
+        pid = wintypes.DWORD()
+        user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+        handle = kernel32.OpenProcess(0x1000, False, pid.value)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if handle:
+            try:
+                size = wintypes.DWORD(260)
+                buf = ctypes.create_unicode_buffer(260)
+                if kernel32.QueryFullProcessImageNameW(handle, 0, buf, ctypes.byref(size)):
+                    process = os.path.basename(buf.value)
+            finally:
+                kernel32.CloseHandle(handle)
+    return process, window_class
+
+
+def detect_active_application_profile():
     """
-    Returns the name of the current application profile.
-    Attempts to detect the active window's application.
+    Queries the window manager for the active window and resolves its profile.
+    This is a window-manager round-trip; the hot path should use get_active_application_profile().
     """
-    global _current_app_profile_name # Ensure we are modifying the global variable
-
     if gw:
         try:
             active_window = gw.getActiveWindow()
             if active_window:
-                window_title = active_window.title.lower()
-                # print(f"Active window: {window_title}") # For debugging
-                if "抖音" in window_title:
-                    return "douyin"
-                elif "chrome" in window_title or "firefox" in window_title or "edge" in window_title:
-                    return "browser"
-                elif "哔哩哔哩" in window_title:
-                    return "bilibili"
-                elif "ppt" in window_title:
-                    return "WPS"
-                # Add other application detection logic here
+                # print(f"Active window: {active_window.title}") # For debugging
+                process = window_class = None
+                rule_set = profile_rules.get_rule_set()
+                hwnd = getattr(active_window, "_hWnd", None)
+                if hwnd and (rule_set.needs_process or rule_set.needs_window_class):
+                    process, window_class = _win32_window_details(hwnd, rule_set)
+                profile = profile_for_window_title(active_window.title, process, window_class)
+                if profile:
+                    return profile
         except Exception as e:
             # print(f"Error detecting active window: {e}") # Might be too noisy
             # Fallback to the manually cycled profile if detection fails
@@ -51,6 +89,170 @@ def get_active_application_profile():
     # Fallback to the manually cycled profile if pygetwindow is not available or fails
     return _current_app_profile_name
 
+
+def get_active_application_profile():
+    """
+    Returns the name of the current application profile.
+    Reads the cached value while the background detector runs, otherwise detects directly.
+    """
+    if _detector is not None and _detector.is_alive():
+        return _detector.profile
+    return detect_active_application_profile()
+
+
+def add_profile_listener(callback):
+    """Registers callback(profile_name), called from the detector thread whenever the profile changes."""
+    if callback not in _profile_listeners:
+        _profile_listeners.append(callback)
+
+
+def remove_profile_listener(callback):
+    if callback in _profile_listeners:
+        _profile_listeners.remove(callback)
+
+
+def is_detector_running():
+    return _detector is not None and _detector.is_alive()
+
+
+class ProfileDetector(threading.Thread):
+    """
+    Resolves the active window's profile off the hot path and caches it.
+    On X11 (with python-xlib) it wakes on _NET_ACTIVE_WINDOW / window title changes and
+    falls back to polling every `poll_interval` seconds; elsewhere it just polls.
+    """
+
+    def __init__(self, poll_interval=None, use_x11_events=None):
+        super().__init__(name="ProfileDetector", daemon=True)
+        self.poll_interval = poll_interval if poll_interval is not None else config.PROFILE_POLL_INTERVAL
+        self.use_x11_events = config.PROFILE_USE_X11_EVENTS if use_x11_events is None else use_x11_events
+        self.profile = detect_active_application_profile()
+        self._stop_event = threading.Event()
+        self._refresh_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+        self._refresh_event.set()
+
+    def refresh(self):
+        """Requests an immediate re-detection (e.g. after a manual profile switch)."""
+        self._refresh_event.set()
+
+    def _update(self, profile):
+        if profile != self.profile:
+            self.profile = profile
+            for callback in list(_profile_listeners):
+                try:
+                    callback(profile)
+                except Exception as e:
+                    print(f"Error in profile listener: {e}")
+
+    def run(self):
+        if self.use_x11_events and sys.platform.startswith("linux"):
+            try:
+                self._run_x11()
+                return
+            except Exception as e:
+                print(f"X11 window events unavailable ({e}), polling for the active window instead.")
+        self._run_polling()
+
+    def _run_polling(self):
+        while not self._stop_event.is_set():
+            self._update(detect_active_application_profile())
+            self._refresh_event.wait(self.poll_interval)
+            self._refresh_event.clear()
+
+    def _run_x11(self):
+        from Xlib import X, display
+
+        disp = display.Display()
+        root = disp.screen().root
+        net_active_window = disp.intern_atom("_NET_ACTIVE_WINDOW")
+        net_wm_name = disp.intern_atom("_NET_WM_NAME")
+        wm_name = disp.intern_atom("WM_NAME")
+        utf8_string = disp.intern_atom("UTF8_STRING")
+        root.change_attributes(event_mask=X.PropertyChangeMask)
+        watched_window = None
+
+        net_wm_pid = disp.intern_atom("_NET_WM_PID")
+        rule_set = profile_rules.get_rule_set()
+
+        def window_details(window):
+            process = window_class = None
+            if rule_set.needs_window_class:
+                wm_class = window.get_wm_class()  # (instance, class)
+                window_class = wm_class[1] if wm_class else None
+            if rule_set.needs_process:
+                pid = window.get_full_property(net_wm_pid, X.AnyPropertyType)
+                if pid and pid.value:
+                    try:
+                        with open(f"/proc/{pid.value[0]}/comm", "r") as f:
+                            process = f.read().strip()
+                    except OSError:
+                        pass
+            return process, window_class
+
+        def active_window():
+            nonlocal watched_window
+            prop = root.get_full_property(net_active_window, X.AnyPropertyType)
+            if not prop or not prop.value:
+                return None, None, None
+            window = disp.create_resource_object("window", prop.value[0])
+            if watched_window is None or watched_window.id != window.id:
+                # Also wake up when the active window changes its own title (e.g. a browser tab switch)
+                window.change_attributes(event_mask=X.PropertyChangeMask)
+                watched_window = window
+            name = window.get_full_property(net_wm_name, utf8_string)
+            if name and name.value:
+                value = name.value
+                title = value.decode("utf-8", "replace") if isinstance(value, bytes) else value
+            else:
+                title = window.get_wm_name()
+            return (title,) + window_details(window)
+
+        def resolve():
+            try:
+                title, process, window_class = active_window()
+            except Exception:
+                title = process = window_class = None
+            profile = profile_for_window_title(title, process, window_class)
+            self._update(profile or _current_app_profile_name)
+
+        resolve()
+        try:
+            while not self._stop_event.is_set():
+                ready, _, _ = select.select([disp.fileno()], [], [], self.poll_interval)
+                changed = not ready  # timeout: periodic safety re-check
+                while disp.pending_events():
+                    event = disp.next_event()
+                    if event.type == X.PropertyNotify and event.atom in (net_active_window, net_wm_name, wm_name):
+                        changed = True
+                if self._refresh_event.is_set():
+                    self._refresh_event.clear()
+                    changed = True
+                if changed:
+                    resolve()
+        finally:
+            disp.close()
+
+
+def start_profile_detector():
+    """Starts the background detector if it is not running yet. Safe to call repeatedly."""
+    global _detector
+    if _detector is None or not _detector.is_alive():
+        _detector = ProfileDetector()
+        _detector.start()
+    return _detector
+
+
+def stop_profile_detector():
+    global _detector
+    if _detector is not None:
+        _detector.stop()
+        _detector.join(timeout=1)
+        _detector = None
+
+
 def cycle_app_profile():
     """
     Cycles through available application profiles.
@@ -60,6 +262,8 @@ def cycle_app_profile():
     _current_profile_index = (_current_profile_index + 1) % len(_profile_keys)
     _current_app_profile_name = _profile_keys[_current_profile_index]
     print(f"Manually switched to profile: {SUPPORTED_PROFILES[_current_app_profile_name]}")
+    if _detector is not None:
+        _detector.refresh()
     return _current_app_profile_name
 
 def get_current_profile_display_name():
@@ -67,4 +271,5 @@ def get_current_profile_display_name():
     # unless manual cycling is the only source of truth.
     # For this setup, get_active_application_profile now incorporates detection.
     detected_profile = get_active_application_profile()
-    return SUPPORTED_PROFILES.get(detected_profile, "Unknown Profile")
\ No newline at end of file
+    # Profiles that only exist in the rules (config.APP_PROFILE_RULES) are shown by name
+    return SUPPORTED_PROFILES.get(detected_profile, detected_profile or "Unknown Profile")
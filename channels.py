@@ -0,0 +1,69 @@
+# channels.py
+#
+# Single-slot "latest value wins" channels for the pipeline's frame and landmark handoffs.
+# A bounded queue makes the producer either wait (and then hand over a frame that is already
+# stale) or drop the *new* item; a mailbox keeps only the newest item instead:
+#   - put() never blocks. If the previous item has not been taken yet it is replaced, counted
+#     as a drop and passed to on_drop (e.g. to release its FramePool slot).
+#   - get() sleeps on a condition variable and wakes as soon as an item arrives, so consumers
+#     do not poll and always get the freshest frame.
+#   - close() wakes every waiter; get() then returns None.
+
+import threading
+
+_EMPTY = object()
+
+
+class LatestChannel:
+    def __init__(self, name, on_drop=None):
+        """
+        name: label for drop counters and logs (e.g. "frame_channel").
+        on_drop: callable(item) for an item overwritten before anyone took it. Called on the
+            producer's thread, outside the channel lock.
+        """
+        self.name = name
+        self.on_drop = on_drop
+        self.puts = 0
+        self.drops = 0
+        self._item = _EMPTY
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+
+    def put(self, item):
+        """Publishes `item`, replacing an untaken one. Returns False if the channel is closed (item not stored)."""
+        with self._cond:
+            if self._closed:
+                return False
+            dropped = self._item
+            self._item = item
+            self.puts += 1
+            if dropped is not _EMPTY:
+                self.drops += 1
+            self._cond.notify()
+        if dropped is not _EMPTY and self.on_drop is not None:
+            self.on_drop(dropped)
+        return True
+
+    def get(self, timeout=None):
+        """Takes the newest item, waiting up to `timeout` seconds for one. Returns None on timeout or once closed."""
+        with self._cond:
+            if self._item is _EMPTY and not self._closed:
+                self._cond.wait_for(lambda: self._item is not _EMPTY or self._closed, timeout)
+            item = self._item
+            if item is _EMPTY:
+                return None
+            self._item = _EMPTY
+            return item
+
+    def drain(self):
+        """Takes the pending item without waiting, or None (e.g. to release it on shutdown)."""
+        return self.get(timeout=0)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
@@ -9,7 +9,48 @@ SCREEN_W, SCREEN_H = pyautogui.size()
 GESTURE_DEBOUNCE_DELAY = 0.3  # seconds
 
 # MediaPipe Hands Configuration
-MAX_NUM_HANDS = 1
+MAX_NUM_HANDS = 2
+# Multi-hand tracking (see hand_tracker.HandIdTracker and multi_hand.MultiHandRecognizer)
+PRIMARY_HAND_POLICY = "first"           # Picks the hand that drives actions: "first", "right", "left" or "largest"
+HAND_TRACK_MAX_DISTANCE = 0.2           # Max normalized centre movement per frame to keep a hand's track id
+HAND_TRACK_MAX_MISSED = 3               # Frames a hand may be missing before its track (and primary role) is dropped
+PINCH_ZOOM_ENABLED = True               # Two-hand pinch zoom
+PINCH_ZOOM_STEP_RATIO = 0.15            # Relative change of the distance between the two pinches per zoom step
+# Region-of-interest inference (see HandTracker): crop around the previous frame's hands
+HAND_ROI_ENABLED = False                # Off: measured no latency gain over full frame (MediaPipe already tracks on its own crop),
+                                        # p95 is higher from ROI misses that need a second full-frame pass
+HAND_ROI_MARGIN = 0.3                   # Margin around the hands' bounding box, as a fraction of its size, on each side
+HAND_ROI_MIN_SIZE = 0.35                # Minimum ROI side as a fraction of the shorter frame side
+HAND_ROI_HYSTERESIS = 1.6               # Keep the current ROI while the hands stay inside and it is at most this much larger than needed
+HAND_ROI_FULL_FRAME_INTERVAL = 30       # Full-frame pass every N ROI frames to find new hands (while fewer than MAX_NUM_HANDS are tracked)
+
+# Duty cycling while nobody is in front of the camera (see duty_cycle.py)
+DUTY_CYCLE_ENABLED = True
+DUTY_CYCLE_IDLE_AFTER = 5.0             # Seconds without a hand before dropping to the idle rate
+DUTY_CYCLE_IDLE_INTERVAL = 0.25         # Seconds between processed frames while idle (4 Hz); bounds the wake-up latency
+
+# Preallocated frame buffers shared by capture, tracking and display (see frame_buffers.py).
+# Must cover every frame in flight: one per channel (frame, result) + one per thread.
+FRAME_POOL_SIZE = 8
+
+# Out-of-process inference (see inference_process.py): MediaPipe runs in a worker process that
+# reads frames from shared memory, so it does not share the GIL with recognition, actions and the UI
+INFERENCE_IN_SUBPROCESS = False
+INFERENCE_SHM_SLOTS = 2                 # Frame slots in the shared-memory ring
+INFERENCE_SHM_MAX_FRAME = (1920, 1080)  # Largest frame (width, height) a slot can hold
+INFERENCE_START_TIMEOUT = 30.0          # Seconds to wait for the worker to load MediaPipe
+INFERENCE_FRAME_TIMEOUT = 1.0           # Seconds to wait for one frame's result before giving up on it
+
+# Multi-session mode (see session.py): several cameras served by one host.
+# Each entry holds session.SessionSpec arguments, e.g.
+#   {"name": "room-a", "source": 0, "profile": "WPS"},
+#   {"name": "room-b", "source": "rtsp://10.0.0.12/stream", "input_backend": "recording"},
+SESSIONS = []
+SESSION_PROCESSES = None                # Host processes; None = one per CPU core (at most one per session)
+SESSION_STALL_TIMEOUT = 10.0            # Seconds without a frame before a session is restarted
+SESSION_RESTART_DELAY = 2.0             # Seconds between a session (or host process) failing and its restart
+SESSION_STATUS_INTERVAL = 1.0           # Seconds between status reports from the host processes
+
 MIN_DETECTION_CONFIDENCE = 0.7
 MIN_TRACKING_CONFIDENCE = 0.5
 
@@ -26,8 +67,9 @@ PINCH_CLOSE_RATIO = 0.15
 PINCH_OPEN_RATIO = 0.25
 
 # Scroll Control Parameters
-SCROLL_MOVEMENT_THRESHOLD_Y = 0.005     # Min normalized vertical wrist movement for scroll (Adjusted for finger)
-SCROLL_SENSITIVITY_FACTOR = 2000        # Multiplier for scroll amount
+SCROLL_SPEED_THRESHOLD_Y = 0.15         # Min vertical speed (normalized units / s) of the wrist / fingertip to scroll (0.005 per frame at 30 fps)
+SCROLL_VELOCITY_WINDOW = 0.1            # Seconds of history the scroll speed is measured over
+SCROLL_SENSITIVITY_FACTOR = 2000        # Scroll amount per normalized unit of vertical movement
 SCROLL_ENGAGE_HOLD_TIME = 0.8           # 触发scroll的最小维持时间
 
 # Swipe Gesture Parameters
@@ -36,7 +78,8 @@ SCROLL_ENGAGE_HOLD_TIME = 0.8           # 触发scroll的最小维持时间
 # SWIPE_MIN_DISTANCE = 0.1              # 归一化距离，挥手需要的最小距离 (0.15约为屏幕宽度的15%)
 # SWIPE_MAX_DURATION = 0.4              # 秒，完成挥手所需的最大时间
 SWIPE_ACTION_DELAY = 1                  # Seconds to wait after a swipe action
-SWIPE_VELOCITY_THRESHOLD = 0.025
+SWIPE_SPEED_THRESHOLD = 0.15            # Min wrist speed (normalized units / s) for a swipe (0.025 over 5 frames at 30 fps)
+SWIPE_VELOCITY_WINDOW = 0.15            # Seconds the wrist speed is averaged over; keep it <= SWIPE_COOLDOWN
 SWIPE_COOLDOWN = 0.2                    # 张手握拳0.2秒后才判断挥手
 
 # New: Fist/Open Hand Gesture Parameters
@@ -50,7 +93,39 @@ MOUSE_MAP_X_MIN = 0.25                   # Normalized hand x-coordinate to map t
 MOUSE_MAP_X_MAX = 0.75                   # Normalized hand x-coordinate to map to screen right
 MOUSE_MAP_Y_MIN = 0.05                   # Normalized hand y-coordinate to map to screen top
 MOUSE_MAP_Y_MAX = 0.55                   # Normalized hand y-coordinate to map to screen bottom
-MOUSE_SMOOTHING_FACTOR = 0.25           # Lower is smoother but more 'laggy', higher is more responsive but less smooth. 0.2 is a good start.
+
+# Landmark smoothing for cursor and drag: One Euro filter (see filters.py), per profile.
+# The cutoff frequency grows with hand speed: cutoff = min_cutoff + beta * speed.
+#   min_cutoff: cutoff (Hz) when still. Lower is steadier at rest but slower to start moving.
+#   beta:       extra cutoff per unit of speed (frame widths / s). Higher lags less in fast moves.
+#   d_cutoff:   cutoff (Hz) of the speed estimate.
+# The defaults have the same jitter at rest as the old 0.25 EMA at 30 fps, with about a quarter of its lag.
+LANDMARK_FILTER_PARAMS = {
+    "default": {"min_cutoff": 0.3, "beta": 8.0, "d_cutoff": 1.0},
+    "browser": {"min_cutoff": 0.3, "beta": 8.0, "d_cutoff": 1.0},
+    "WPS": {"min_cutoff": 0.2, "beta": 4.0, "d_cutoff": 1.0},         # steadier pointer for slides
+    "douyin": {"min_cutoff": 0.5, "beta": 10.0, "d_cutoff": 1.0},     # mostly scrolling: favour responsiveness
+    "bilibili": {"min_cutoff": 0.5, "beta": 10.0, "d_cutoff": 1.0},
+}
+
+# Predictive cursor (see motion_predictor.py): extrapolate the cursor / drag point by the measured
+# capture-to-action latency so it does not trail the finger. Per profile. Off everywhere until it
+# has been measured on real recordings: it halves the error on a smooth synthetic movement, but
+# overshoots when the hand stops (p95 147 -> 166 px on the benchmark's pose sequence at 80 ms).
+# Turn a profile on only once `python motion_predictor.py --check <its recordings>` passes.
+CURSOR_PREDICTION = {
+    "default": False,
+    "browser": False,
+    "WPS": False,
+    "douyin": False,
+    "bilibili": False,
+}
+CURSOR_PREDICTION_LATENCY = 0.08             # Seconds; starting value until glass-to-action latency has been measured
+CURSOR_PREDICTION_MAX_HORIZON = 0.15         # Never extrapolate further than this (seconds)
+# Kalman noise model. Higher process noise / lower measurement noise follow direction changes
+# faster but extrapolate more of the hand's jitter (`python motion_predictor.py <recording>` to compare).
+CURSOR_PREDICTION_PROCESS_NOISE = 20.0       # Acceleration noise density
+CURSOR_PREDICTION_MEASUREMENT_NOISE = 1e-3   # Position variance (normalized units^2)
 
 # PyAutoGUI Settings
 PYAUTOGUI_FAILSAFE = False
@@ -59,8 +134,58 @@ PYAUTOGUI_MOVE_DURATION_DRAG = 0.01
 pyautogui.PAUSE = 0.01
 pyautogui.MINIMUM_DURATION = 0.01
 
-# Frame rate assumption (for speed calculation if time delta isn't precise)
-ASSUMED_FPS = 60
+# OS input injection backend (see input_backends.py): "pyautogui", "xtest" (X11), "uinput" (Linux),
+# or "recording" (no OS input; events are kept in memory). Run `python input_backends.py` to compare latencies.
+INPUT_BACKEND = "pyautogui"
+
+# Active application profile detection (see app_detector.ProfileDetector)
+PROFILE_POLL_INTERVAL = 0.5             # Seconds between active-window checks (also the fallback re-check on X11)
+PROFILE_USE_X11_EVENTS = True           # On X11 with python-xlib, wake on _NET_ACTIVE_WINDOW / title changes instead of only polling
+
+# Window -> profile rules (see profile_rules.py). Each rule names a profile and any of:
+#   "title_contains": substring(s) of the window title (case-insensitive)
+#   "title_regex":    regular expression(s) searched in the title (case-insensitive, no named groups)
+#   "process":        executable name(s) of the window's process, e.g. "chrome.exe" / "chrome"
+#   "window_class":   window class name(s) (X11 WM_CLASS / Win32 class name)
+#   "priority":       higher wins when several rules match (default 0; ties go to the earlier rule)
+APP_PROFILE_RULES = [
+    {"profile": "douyin", "title_contains": "抖音", "priority": 40},
+    {"profile": "browser", "title_contains": ["chrome", "firefox", "edge"], "priority": 30},
+    {"profile": "bilibili", "title_contains": "哔哩哔哩", "priority": 20},
+    {"profile": "WPS", "title_contains": "ppt", "priority": 10},
+]
+PROFILE_RULES_PATH = None               # Optional JSON file with more rules (same format), appended to the list above
+PROFILE_RULE_CACHE_SIZE = 256           # Resolved (title, process, class) -> profile entries kept in the LRU cache
+
+# Learned posture classifier (see posture_classifier.py): a trained .npz model replaces the
+# heuristic fist / open / pointing / thumbs-up checks. None keeps the heuristics.
+POSTURE_CLASSIFIER_PATH = None
+
+# Landmark history for swipe / scroll velocities and gesture templates (see kinematics.py)
+KINEMATICS_HISTORY_SECONDS = 2.0        # Longest velocity window / gesture template that can be queried
+KINEMATICS_MAX_FPS = 120                # Highest frame rate the history is sized for
+
+# User-defined motion gestures matched with DTW (see gesture_templates.py). The library is
+# built with `python gesture_templates.py add ...`; a missing file disables matching.
+GESTURE_TEMPLATE_PATH = "gesture_templates.json"
+GESTURE_TEMPLATE_SAMPLES = 32           # Points each trajectory is resampled to
+GESTURE_TEMPLATE_BAND = 0.1             # Sakoe-Chiba warping band, as a fraction of the samples
+GESTURE_TEMPLATE_MAX_DISTANCE = 0.2     # Max RMS DTW distance (in hand sizes) for a match
+GESTURE_TEMPLATE_MIN_EXTENT = 1.0       # The hand must move at least this far (in hand sizes) to be matched
+GESTURE_TEMPLATE_DURATION_STEP = 0.1    # Template durations are bucketed to this many seconds
+GESTURE_TEMPLATE_COOLDOWN = 0.5         # Seconds after a match before the next one
+# States a template may interrupt (never in the middle of a drag, click or scroll)
+GESTURE_TEMPLATE_STATES = ("IDLE", "MOUSE_MOVING", "FIST_STEADY", "OPEN_HAND_STEADY")
+
+# Pipeline latency metrics (see metrics.py)
+METRICS_WINDOW_SECONDS = 10.0           # Rolling histogram window
+METRICS_DUMP_PATH = None                # e.g. "pipeline_metrics.json"; None disables the periodic dump
+METRICS_DUMP_INTERVAL = 5.0             # Seconds between dumps
+UI_STATS_REFRESH_MS = 1000              # Refresh period of the UI stats panel
+
+# Landmark recording (for offline replay, see replay.py). None disables recording.
+# The path is passed through time.strftime, e.g. "recordings/session_%Y%m%d_%H%M%S.hblm"
+LANDMARK_RECORDING_PATH = None
 
 # --- Gesture Names (Used for recognition and mapping) ---
 GESTURE_NONE = "No Gesture"
@@ -87,17 +212,23 @@ GESTURE_FIST_TO_OPEN = "Fist to Open"
 GESTURE_OPEN_TO_FIST = "Open to Fist"
 GESTURE_PRESS_ESC = "Press ESC"
 
+# Two-hand gestures
+GESTURE_ZOOM_IN = "Zoom In"
+GESTURE_ZOOM_OUT = "Zoom Out"
+
 
-# --- New: State Definitions for Gesture Recognition State Machine ---
+# --- State Definitions for the Gesture Recognition State Machine ---
+# (transitions are declared in gesture_recognizer.build_gesture_machine)
 STATE_IDLE = "IDLE"
 STATE_MOUSE_MOVING = "MOUSE_MOVING"
 STATE_PINCH_DETECTED = "PINCH_DETECTED"
 STATE_POSSIBLE_DOUBLE_CLICK = "POSSIBLE_DOUBLE_CLICK"
 STATE_DRAGGING = "DRAGGING"
 STATE_SCROLL_MODE = "SCROLL_MODE"
-STATE_SWIPE_PENDING = "SWIPE_PENDING"
-STATE_HAND_CLOSED_STEADY = "HAND_CLOSED_STEADY"
-STATE_HAND_OPEN_STEADY = "HAND_OPEN_STEADY"
+STATE_THUMBS_UP_SCROLL = "THUMBS_UP_SCROLL"
+STATE_FIST_STEADY = "FIST_STEADY"           # Waiting in a fist posture
+STATE_OPEN_HAND_STEADY = "OPEN_HAND_STEADY" # Waiting in an open hand posture
+GESTURE_STATE_TRACE = False                 # Print every state transition (gesture_state_machine.print_trace)
 
 CUSTOM_APP_GESTURE_MAPPINGS = {
     "default": {
@@ -115,6 +246,8 @@ CUSTOM_APP_GESTURE_MAPPINGS = {
         GESTURE_SWIPE_DOWN: "hotkey_down",
         GESTURE_FIST_TO_OPEN: "press_f",
         GESTURE_OPEN_TO_FIST: "press_esc",
+        GESTURE_ZOOM_IN: "zoom_in",
+        GESTURE_ZOOM_OUT: "zoom_out",
     },
     "browser": {
         GESTURE_MOUSE_MOVING: "mouse_move",
@@ -131,6 +264,8 @@ CUSTOM_APP_GESTURE_MAPPINGS = {
         GESTURE_SWIPE_DOWN: "hotkey_down",
         GESTURE_FIST_TO_OPEN: "do_nothing",
         GESTURE_OPEN_TO_FIST: "do_nothing",
+        GESTURE_ZOOM_IN: "zoom_in",
+        GESTURE_ZOOM_OUT: "zoom_out",
     },
     "douyin": {
         GESTURE_MOUSE_MOVING: "mouse_move",
@@ -147,6 +282,8 @@ CUSTOM_APP_GESTURE_MAPPINGS = {
         GESTURE_SWIPE_DOWN: "hotkey_down",
         GESTURE_FIST_TO_OPEN: "press_h",
         GESTURE_OPEN_TO_FIST: "press_esc",
+        GESTURE_ZOOM_IN: "do_nothing",
+        GESTURE_ZOOM_OUT: "do_nothing",
     },
     "bilibili": {
         GESTURE_MOUSE_MOVING: "mouse_move",
@@ -163,6 +300,8 @@ CUSTOM_APP_GESTURE_MAPPINGS = {
         GESTURE_SWIPE_DOWN: "hotkey_down",
         GESTURE_FIST_TO_OPEN: "press_f",
         GESTURE_OPEN_TO_FIST: "press_esc",
+        GESTURE_ZOOM_IN: "do_nothing",
+        GESTURE_ZOOM_OUT: "do_nothing",
     },
     "WPS": {
         GESTURE_MOUSE_MOVING: "mouse_move",
@@ -179,6 +318,8 @@ CUSTOM_APP_GESTURE_MAPPINGS = {
         GESTURE_SWIPE_DOWN: "hotkey_down",
         GESTURE_FIST_TO_OPEN: "press_f5",
         GESTURE_OPEN_TO_FIST: "press_esc",
+        GESTURE_ZOOM_IN: "zoom_in",
+        GESTURE_ZOOM_OUT: "zoom_out",
     }
 
 }
@@ -201,6 +342,8 @@ AVAILABLE_ACTIONS = [
     "hotkey_alt_right",
     "hotkey_ctrl_z",
     "hotkey_ctrl_shift_z",
+    "zoom_in",
+    "zoom_out",
     "press_f5",
     "press_a",
     "press_b",
@@ -231,4 +374,19 @@ AVAILABLE_ACTIONS = [
     "press_space",
     "press_esc",
 ]
-AVAILABLE_ACTIONS.sort() # Sort for consistent display
\ No newline at end of file
+AVAILABLE_ACTIONS.sort() # Sort for consistent display
+
+# --- Macros (composite actions, see macros.py) ---
+# A mapping may name one of these instead of an action key, or hold a step list directly.
+MACROS = {
+    "copy": [{"hotkey": ["ctrl", "c"]}],
+    "paste": [{"hotkey": ["ctrl", "v"]}],
+    "select_all_copy": [{"hotkey": ["ctrl", "a"]}, {"wait": 0.1}, {"hotkey": ["ctrl", "c"]}],
+    "bilibili_triple": [{"down": "q"}, {"wait": 2.0}, {"up": "q"}],     # 长按Q一键三连
+    "next_tab_x3": [{"repeat": 3, "steps": [{"hotkey": ["ctrl", "tab"]}], "interval": 0.2}],
+}
+MACRO_STEP_DELAY = 0.02                 # Seconds between consecutive macro steps
+MACRO_TYPE_INTERVAL = 0.03              # Default seconds between typed characters
+MACRO_CANCEL_ON_PROFILE_CHANGE = True   # Stop running macros (and release held keys) when the active app changes
+ACTION_SCHEDULER_TICK = 0.005           # Timer wheel resolution (seconds)
+ACTION_SCHEDULER_SLOTS = 512            # Timer wheel buckets (one revolution = TICK * SLOTS seconds)
\ No newline at end of file
@@ -0,0 +1,111 @@
+# duty_cycle.py
+#
+# Drops the pipeline to a low sampling rate while nobody is in front of the camera.
+#   - active: every frame is read, decoded and run through hand tracking.
+#   - idle:   entered after `idle_after` seconds without a hand. The camera thread keeps
+#             grabbing frames (so the driver buffer stays fresh) but only decodes and processes
+#             one every `idle_interval` seconds.
+# The first processed frame with a hand switches back to active, so the frame after a
+# detection already runs at the full rate. Worst-case wake-up latency is idle_interval plus one
+# frame period and one inference.
+#
+# CPU use (time.process_time, all threads) is accounted per mode, so the snapshot reports the
+# measured saving of idle over active.
+
+import time
+
+import config
+
+MODE_ACTIVE = "active"
+MODE_IDLE = "idle"
+
+
+class DutyCycleScheduler:
+    def __init__(self, idle_after=None, idle_interval=None, clock=time.monotonic, cpu_clock=time.process_time):
+        """
+        idle_after: seconds without a hand before going idle (config.DUTY_CYCLE_IDLE_AFTER).
+        idle_interval: seconds between processed frames while idle, i.e. the wake-up latency
+            bound (config.DUTY_CYCLE_IDLE_INTERVAL).
+        """
+        self.idle_after = config.DUTY_CYCLE_IDLE_AFTER if idle_after is None else idle_after
+        self.idle_interval = config.DUTY_CYCLE_IDLE_INTERVAL if idle_interval is None else idle_interval
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+
+        now = clock()
+        self.mode = MODE_ACTIVE
+        self.last_hand_time = now
+        self._last_sample_time = 0.0
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.wakeups = 0
+
+        # Per-mode accounting: mode -> [wall seconds, cpu seconds]
+        self._usage = {MODE_ACTIVE: [0.0, 0.0], MODE_IDLE: [0.0, 0.0]}
+        self._mode_since = now
+        self._mode_since_cpu = cpu_clock()
+
+    def should_process(self):
+        """Camera thread: True to read and process this frame, False to just grab (skip) it."""
+        if self.mode == MODE_ACTIVE:
+            return True
+        now = self.clock()
+        if now - self._last_sample_time >= self.idle_interval:
+            self._last_sample_time = now
+            return True
+        self.frames_skipped += 1
+        return False
+
+    def report(self, hand_present):
+        """Processing thread: called once per processed frame with whether any hand was found."""
+        now = self.clock()
+        self.frames_processed += 1
+        if hand_present:
+            self.last_hand_time = now
+            if self.mode == MODE_IDLE:
+                self.wakeups += 1
+                self._switch(MODE_ACTIVE, now)
+        elif self.mode == MODE_ACTIVE and now - self.last_hand_time > self.idle_after:
+            self._switch(MODE_IDLE, now)
+
+    def _switch(self, mode, now):
+        cpu = self.cpu_clock()
+        usage = self._usage[self.mode]
+        usage[0] += now - self._mode_since
+        usage[1] += cpu - self._mode_since_cpu
+        self._mode_since, self._mode_since_cpu = now, cpu
+        self.mode = mode
+        print(f"Duty cycle: switched to {mode} mode")
+
+    def cpu_percent(self, mode):
+        """Average CPU use (percent of one core) measured while in `mode`, or None if never in it."""
+        wall, cpu = self._usage[mode]
+        if mode == self.mode:
+            wall += self.clock() - self._mode_since
+            cpu += self.cpu_clock() - self._mode_since_cpu
+        return cpu / wall * 100 if wall > 0 else None
+
+    def snapshot(self):
+        active_cpu = self.cpu_percent(MODE_ACTIVE)
+        idle_cpu = self.cpu_percent(MODE_IDLE)
+        saving = None
+        if active_cpu and idle_cpu is not None:
+            saving = max(0.0, (1 - idle_cpu / active_cpu) * 100)
+        return {
+            "mode": self.mode,
+            "idle_rate_hz": 1.0 / self.idle_interval if self.idle_interval > 0 else None,
+            "frames_processed": self.frames_processed,
+            "frames_skipped": self.frames_skipped,
+            "wakeups": self.wakeups,
+            "active_cpu_percent": active_cpu,
+            "idle_cpu_percent": idle_cpu,
+            "idle_cpu_saving_percent": saving,
+        }
+
+    def overlay_text(self):
+        if self.mode == MODE_ACTIVE:
+            return "Mode: active"
+        snapshot = self.snapshot()
+        saving = snapshot["idle_cpu_saving_percent"]
+        saving_text = f", CPU -{saving:.0f}%" if saving is not None else ""
+        return f"Mode: idle ({snapshot['idle_rate_hz']:.0f} Hz{saving_text})"
@@ -0,0 +1,326 @@
+# evaluate.py
+#
+# Scores the gesture recognizer against a directory of labeled landmark sequences, so config
+# thresholds (PINCH_CLOSE_RATIO, SWIPE_SPEED_THRESHOLD, FIST_CLOSED_THRESHOLD, ...) can be tuned
+# by numbers instead of by feel. Every clip runs through a fresh GestureRecognizer on a replay
+# clock, spread over a process pool with one worker per core.
+#
+# Dataset layout (searched recursively):
+#   clip.hblm + clip.labels.json   a LandmarkRecording with its labels
+#   clip.json                      frames and labels in one file:
+#       {"frames": [{"t": 0.0, "landmarks": [[x, y, z] * 21] or null, "handedness": "Right"}, ...],
+#        "labels": [...]}
+# Labels: [{"gesture": "Left Click", "start": 3.2, "end": 3.9}, ...], in seconds from the clip's
+# first frame. A clip without labels counts as a negative (any gesture in it is a false trigger).
+#
+# A recognized gesture matches an unmatched label of the same name if it fires between the
+# label's start and end + --tolerance. Continuous gestures (cursor, drag, scroll) emit every
+# frame; emissions less than CONTINUOUS_GAP apart count as one detection.
+# Reported per gesture: precision, recall, false triggers per hour of data and the
+# time-to-recognition (detection time - label start) distribution.
+#
+# JSON clips are decoded once and cached as .npz next to the dataset (--cache-dir), keyed by
+# file size and modification time; recordings are memory-mapped and need no cache.
+#
+# Usage:
+#   python evaluate.py datasets/gestures [--processes 8] [--set PINCH_CLOSE_RATIO=0.12] [--json report.json]
+
+import argparse
+import ast
+import contextlib
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+import config
+
+CONTINUOUS_GESTURES = frozenset([
+    config.GESTURE_MOUSE_MOVING, config.GESTURE_DRAGGING,
+    config.GESTURE_SCROLL_UP, config.GESTURE_SCROLL_DOWN,
+])
+CONTINUOUS_GAP = 0.3  # seconds
+NUM_LANDMARKS = 21
+
+
+# --- Loading ---
+
+def find_clips(root):
+    """Sorted paths of every .hblm recording and .json clip under `root` (label files excluded)."""
+    clips = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]  # skips the cache
+        for filename in filenames:
+            if filename.endswith(".hblm") or (filename.endswith(".json") and not filename.endswith(".labels.json")):
+                clips.append(os.path.join(directory, filename))
+    return sorted(clips)
+
+
+def _read_labels(entries, path):
+    labels = []
+    for entry in entries:
+        try:
+            labels.append((entry["gesture"], float(entry["start"]), float(entry["end"])))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{path}: bad label {entry!r} (expected gesture, start, end)")
+    return labels
+
+
+def _decode_json_clip(path):
+    """Returns (timestamps, present, landmarks, handedness labels, labels) of a .json clip."""
+    with open(path, "r") as f:
+        clip = json.load(f)
+    frames = clip.get("frames", [])
+    timestamps = np.zeros(len(frames), dtype=np.float64)
+    present = np.zeros(len(frames), dtype=bool)
+    landmarks = np.zeros((len(frames), NUM_LANDMARKS, 3), dtype=np.float32)
+    handedness = []
+    for i, frame in enumerate(frames):
+        timestamps[i] = frame["t"]
+        if frame.get("landmarks") is not None:
+            present[i] = True
+            landmarks[i] = frame["landmarks"]
+        handedness.append(frame.get("handedness") or "")
+    return timestamps, present, landmarks, np.array(handedness), _read_labels(clip.get("labels", []), path)
+
+
+def load_clip(path, cache_dir=None):
+    """
+    Returns (timestamps, present, landmarks, handedness, labels, capture_times) for one clip; the
+    arrays may be memory-mapped. capture_times is None for JSON clips (their "t" is the capture
+    time). JSON clips are decoded through the .npz cache in `cache_dir` when given.
+    """
+    if path.endswith(".hblm"):
+        from landmark_recording import HANDEDNESS_LABELS, LandmarkRecording
+        recording = LandmarkRecording(path)
+        records = recording.records
+        labels_path = path[:-len(".hblm")] + ".labels.json"
+        labels = []
+        if os.path.exists(labels_path):
+            with open(labels_path, "r") as f:
+                labels = _read_labels(json.load(f).get("labels", []), labels_path)
+        handedness = np.array([HANDEDNESS_LABELS.get(int(code), "") for code in records["handedness"]])
+        return (records["timestamp"], records["present"].astype(bool), records["landmarks"], handedness, labels,
+                recording.capture_times)
+
+    if cache_dir is None:
+        return _decode_json_clip(path) + (None,)
+    stat = os.stat(path)
+    key = hashlib.sha1(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:20]
+    cache_path = os.path.join(cache_dir, f"{key}.npz")
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        labels = [tuple(label) for label in json.loads(str(cached["labels"]))]
+        return cached["timestamps"], cached["present"], cached["landmarks"], cached["handedness"], labels, None
+    timestamps, present, landmarks, handedness, labels = _decode_json_clip(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp.npz"  # workers may decode the same clip; the rename is atomic
+    np.savez(tmp_path, timestamps=timestamps, present=present, landmarks=landmarks, handedness=handedness,
+             labels=np.array(json.dumps(labels)))
+    os.replace(tmp_path, cache_path)
+    return timestamps, present, landmarks, handedness, labels, None
+
+
+# --- Per-clip evaluation (runs in the worker processes) ---
+
+def _init_worker(overrides):
+    for name, value in overrides.items():
+        setattr(config, name, value)
+
+
+def detect_gestures(timestamps, present, landmarks, handedness, capture_times=None):
+    """
+    Runs a fresh GestureRecognizer over one clip. Returns [(seconds from clip start, gesture)].
+    capture_times: per-frame capture times for the hands (as in a live session), or None.
+    """
+    import replay
+    from gesture_recognizer import GestureRecognizer
+    from hand_tracker import TrackedHand
+
+    clock = replay.ReplayClock()
+    recognizer = GestureRecognizer(clock=clock)
+    recognizer.set_prediction(False)  # only moves the cursor, never changes which gesture fires
+    detections = []
+    last_continuous = {}  # gesture -> time of its previous emission
+    start = float(timestamps[0]) if len(timestamps) else 0.0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(len(timestamps)):
+            t = float(timestamps[i])
+            clock.now = t
+            hand = None
+            if present[i]:
+                hand = TrackedHand(np.array(landmarks[i], dtype=np.float32), str(handedness[i]), 1.0,
+                                   timestamp=None if capture_times is None else float(capture_times[i]))
+            gesture_name, gesture_data = recognizer.recognize(hand)
+            if gesture_name == config.GESTURE_NONE or not gesture_data.get('performed_action', False):
+                continue
+            if gesture_name in CONTINUOUS_GESTURES:
+                previous = last_continuous.get(gesture_name)
+                last_continuous[gesture_name] = t
+                if previous is not None and t - previous < CONTINUOUS_GAP:
+                    continue
+            detections.append((t - start, gesture_name))
+    return detections
+
+
+def match_detections(detections, labels, tolerance):
+    """
+    Pairs detections with labels. Returns (per-gesture counts, time-to-recognition samples):
+    counts[gesture] = {"labels", "detected", "tp", "fp"}; latencies[gesture] = [seconds].
+    """
+    counts = {}
+    latencies = {}
+
+    def entry(gesture):
+        return counts.setdefault(gesture, {"labels": 0, "detected": 0, "tp": 0, "fp": 0})
+
+    matched = [False] * len(labels)
+    for gesture, _, _ in labels:
+        entry(gesture)["labels"] += 1
+    for t, gesture in detections:
+        stats = entry(gesture)
+        stats["detected"] += 1
+        for i, (label_gesture, start, end) in enumerate(labels):
+            if not matched[i] and label_gesture == gesture and start <= t <= end + tolerance:
+                matched[i] = True
+                stats["tp"] += 1
+                latencies.setdefault(gesture, []).append(t - start)
+                break
+        else:
+            stats["fp"] += 1
+    return counts, latencies
+
+
+def evaluate_clip(task):
+    """Worker entry point: task is (path, cache_dir, tolerance). Returns a per-clip result dict."""
+    path, cache_dir, tolerance = task
+    try:
+        timestamps, present, landmarks, handedness, labels, capture_times = load_clip(path, cache_dir)
+        detections = detect_gestures(timestamps, present, landmarks, handedness, capture_times)
+    except (OSError, ValueError, KeyError) as e:
+        return {"path": path, "error": f"{type(e).__name__}: {e}"}
+    counts, latencies = match_detections(detections, labels, tolerance)
+    duration = float(timestamps[-1] - timestamps[0]) if len(timestamps) > 1 else 0.0
+    return {"path": path, "frames": len(timestamps), "duration": duration, "counts": counts, "latencies": latencies}
+
+
+# --- Aggregation ---
+
+def aggregate(results):
+    """Combines per-clip results into the report dict (see format_report)."""
+    totals = {}
+    latencies = {}
+    duration = 0.0
+    frames = 0
+    errors = []
+    for result in results:
+        if "error" in result:
+            errors.append(result)
+            continue
+        duration += result["duration"]
+        frames += result["frames"]
+        for gesture, counts in result["counts"].items():
+            total = totals.setdefault(gesture, {"labels": 0, "detected": 0, "tp": 0, "fp": 0})
+            for key, value in counts.items():
+                total[key] += value
+        for gesture, samples in result["latencies"].items():
+            latencies.setdefault(gesture, []).extend(samples)
+
+    hours = duration / 3600.0
+    gestures = {}
+    for gesture, total in sorted(totals.items()):
+        tp, fp, labels = total["tp"], total["fp"], total["labels"]
+        samples = np.asarray(latencies.get(gesture, []), dtype=np.float64) * 1000
+        gestures[gesture] = dict(
+            total,
+            fn=labels - tp,
+            precision=tp / (tp + fp) if tp + fp else None,
+            recall=tp / labels if labels else None,
+            false_triggers_per_hour=fp / hours if hours > 0 else None,
+            ttr_p50_ms=float(np.percentile(samples, 50)) if len(samples) else None,
+            ttr_p90_ms=float(np.percentile(samples, 90)) if len(samples) else None,
+            ttr_max_ms=float(samples.max()) if len(samples) else None,
+        )
+    return {
+        "clips": len(results) - len(errors),
+        "frames": frames,
+        "hours": hours,
+        "gestures": gestures,
+        "false_triggers_per_hour": sum(g["fp"] for g in totals.values()) / hours if hours > 0 else None,
+        "errors": errors,
+    }
+
+
+def format_report(report):
+    def number(value, pattern):
+        return pattern.format(value) if value is not None else "-"
+
+    lines = [f"{report['clips']} clips, {report['frames']} frames, {report['hours'] * 60:.1f} min of data",
+             f"{'gesture':<20}{'labels':>7}{'found':>7}{'prec':>7}{'recall':>7}{'FP/h':>8}"
+             f"{'ttr p50':>9}{'ttr p90':>9}{'ttr max':>9}"]
+    for gesture, g in report["gestures"].items():
+        lines.append(f"{gesture:<20}{g['labels']:>7}{g['detected']:>7}{number(g['precision'], '{:.2f}'):>7}"
+                     f"{number(g['recall'], '{:.2f}'):>7}{number(g['false_triggers_per_hour'], '{:.1f}'):>8}"
+                     f"{number(g['ttr_p50_ms'], '{:.0f}'):>9}{number(g['ttr_p90_ms'], '{:.0f}'):>9}"
+                     f"{number(g['ttr_max_ms'], '{:.0f}'):>9}")
+    lines.append(f"false triggers per hour (all gestures): {number(report['false_triggers_per_hour'], '{:.1f}')}"
+                 "  (time to recognition in ms)")
+    for error in report["errors"]:
+        lines.append(f"skipped {error['path']}: {error['error']}")
+    return "\n".join(lines)
+
+
+def run_evaluation(root, processes=None, overrides=None, tolerance=0.5, cache_dir=None):
+    """Evaluates every clip under `root` on a process pool. Returns the aggregated report."""
+    clips = find_clips(root)
+    if not clips:
+        raise ValueError(f"No clips (.hblm / .json) found under {root}")
+    processes = processes or os.cpu_count() or 1
+    tasks = [(path, cache_dir, tolerance) for path in clips]
+    # spawn, like the rest of the pipeline's worker processes; workers apply the overrides to their config
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes, initializer=_init_worker, initargs=(overrides or {},)) as pool:
+        chunksize = max(1, len(tasks) // (processes * 8))
+        results = list(pool.imap_unordered(evaluate_clip, tasks, chunksize=chunksize))
+    return aggregate(results)
+
+
+def _parse_override(text):
+    name, sep, value = text.partition("=")
+    if not sep or not hasattr(config, name):
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE with a config.py setting, got {text!r}")
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return name, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate gesture recognition on a directory of labeled landmark clips.")
+    parser.add_argument("dataset", help="Directory of .hblm (+ .labels.json) and .json clips")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: one per core)")
+    parser.add_argument("--set", dest="overrides", type=_parse_override, action="append", default=[],
+                        metavar="NAME=VALUE", help="Override a config.py setting, e.g. PINCH_CLOSE_RATIO=0.12")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Seconds after a label's end a detection still counts for it")
+    parser.add_argument("--cache-dir", help="Decoded clip cache (default: <dataset>/.eval_cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Decode JSON clips on every run")
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    cache_dir = None if args.no_cache else (args.cache_dir or os.path.join(args.dataset, ".eval_cache"))
+    start = time.perf_counter()
+    report = run_evaluation(args.dataset, args.processes, dict(args.overrides), args.tolerance, cache_dir)
+    report["wall_time"] = time.perf_counter() - start
+    print(format_report(report))
+    print(f"evaluated in {report['wall_time']:.1f}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
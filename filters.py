@@ -0,0 +1,84 @@
+# filters.py
+#
+# One Euro filter (Casiez et al., CHI 2012) over a few landmark points. It is a low-pass filter
+# whose cutoff frequency follows the signal's speed:
+#     cutoff = min_cutoff + beta * |speed|
+# so a hand held still is smoothed hard (no jitter) while a fast movement is followed with
+# little lag. A fixed EMA has to pick one of the two.
+#
+# Only the few landmarks the cursor, drag and scroll actually read are filtered (scroll keeps its
+# own filter over its one point), in plain scalar math: for one to three points that is several
+# times cheaper than the same update as NumPy array operations, whose per-call overhead
+# dominates at this size. The real frame timestamps are used, so dropped frames and uneven frame
+# rates do not change the smoothing. The speed of a point is the norm of its (x, y, z) velocity,
+# so x and y share one cutoff and diagonal movements are not distorted.
+
+import math
+
+import config
+
+
+def _alpha(cutoff, dt):
+    """Smoothing factor of a first-order low-pass with `cutoff` (Hz) for a sample `dt` seconds after the last."""
+    tau = 1.0 / (2 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        """
+        min_cutoff: cutoff (Hz) at rest. Lower = less jitter when still, more lag when a movement starts.
+        beta: cutoff increase (Hz) per unit of speed (normalized units per second). Higher = less lag when fast.
+        d_cutoff: cutoff (Hz) of the speed estimate.
+        """
+        self.set_params(min_cutoff, beta, d_cutoff)
+        self.reset()
+
+    def set_params(self, min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+
+    def reset(self):
+        self._x = None      # last filtered points, as (x, y, z) tuples
+        self._dx = None     # last filtered speed per point
+        self._t = None
+
+    def __call__(self, points, t):
+        """
+        points: sequence of (x, y, z) points (e.g. a few landmarks), always the same points in the
+        same order; t: their timestamp in seconds. Returns the filtered points as a new list of tuples.
+        """
+        if self._x is None:
+            self._x = [(float(x), float(y), float(z)) for x, y, z in points]
+            self._dx = [0.0] * len(self._x)
+            self._t = t
+            return list(self._x)
+        dt = t - self._t
+        if dt <= 0:
+            return list(self._x)  # same (or an out-of-order) timestamp: nothing new to filter
+        self._t = t
+
+        alpha_d = _alpha(self.d_cutoff, dt)
+        # Per-point _alpha(min_cutoff + beta * speed, dt), rewritten as k / (k + 1) with k = 2*pi*cutoff*dt
+        k_rest = 2 * math.pi * dt * self.min_cutoff
+        k_speed = 2 * math.pi * dt * self.beta
+        last, speeds = self._x, self._dx
+        filtered = []
+        for i, (x, y, z) in enumerate(points):
+            lx, ly, lz = last[i]
+            dx, dy, dz = x - lx, y - ly, z - lz
+            speed = speeds[i]
+            speed += alpha_d * (math.sqrt(dx * dx + dy * dy + dz * dz) / dt - speed)
+            speeds[i] = speed
+            k = k_rest + k_speed * speed
+            a = k / (k + 1.0)
+            filtered.append((lx + a * dx, ly + a * dy, lz + a * dz))
+        self._x = filtered
+        return list(filtered)
+
+
+def filter_params(profile):
+    """One Euro parameters for an application profile (config.LANDMARK_FILTER_PARAMS, falling back to "default")."""
+    params = config.LANDMARK_FILTER_PARAMS
+    return params.get(profile) or params["default"]
@@ -0,0 +1,73 @@
+# frame_buffers.py
+#
+# Fixed pool of frame buffers reused across the pipeline instead of allocating a new image
+# per frame. A slot's array is allocated by the first cap.read() into it and reused after that:
+# the camera reads into it (cap.read(image)), mirrors it in place (cv2.flip(dst=)), tracking
+# draws on it and the display shows it.
+#
+# Ownership is explicit: a slot belongs to exactly one stage at a time.
+#   camera_worker      acquire("camera")            -> handoff("frame_channel") on put
+#   processing_worker  handoff("processing") on get -> handoff("result_channel") on put
+#   display loop       handoff("display") on get    -> release() after imshow
+# A frame overwritten in a channel before anyone took it is released by the channel's on_drop. Releasing a free slot raises, so
+# ownership bugs show up at once rather than as a frame overwritten while on screen.
+
+import threading
+from collections import deque
+
+import config
+
+
+class FrameSlot:
+    __slots__ = ("index", "frame", "owner")
+
+    def __init__(self, index):
+        self.index = index
+        self.frame = None  # BGR image, allocated by the first read into this slot
+        self.owner = None  # name of the stage holding the slot, None while free
+
+
+class FramePool:
+    def __init__(self, size=None):
+        size = config.FRAME_POOL_SIZE if size is None else size
+        self.slots = [FrameSlot(i) for i in range(size)]
+        self._free = deque(self.slots)
+        self._lock = threading.Lock()
+        self.allocations = 0  # slot arrays (re)allocated by OpenCV; stays at the pool size once warm
+
+    def acquire(self, owner):
+        """Takes a free slot for `owner`, or returns None if every slot is in flight."""
+        with self._lock:
+            if not self._free:
+                return None
+            slot = self._free.popleft()
+        slot.owner = owner
+        return slot
+
+    def handoff(self, slot, owner):
+        """Records that `slot` now belongs to `owner` (the previous owner must not touch it any more)."""
+        if slot.owner is None:
+            raise RuntimeError(f"Frame slot {slot.index} handed to {owner} while free")
+        slot.owner = owner
+
+    def release(self, slot):
+        with self._lock:
+            if slot.owner is None:
+                raise RuntimeError(f"Frame slot {slot.index} released twice")
+            slot.owner = None
+            self._free.append(slot)
+
+    def free_count(self):
+        return len(self._free)
+
+    def read(self, cap, slot):
+        """cap.read() into the slot's buffer. Returns the success flag."""
+        if slot.frame is None:
+            success, frame = cap.read()
+        else:
+            success, frame = cap.read(slot.frame)
+        if success and frame is not slot.frame:
+            # First read into this slot, or the camera changed resolution
+            slot.frame = frame
+            self.allocations += 1
+        return success
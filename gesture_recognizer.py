@@ -1,23 +1,251 @@
 import time
 import config
 import utils
-from collections import deque
+import filters
+from motion_predictor import MotionPredictor
+from hand_features import HandFeatures
+from kinematics import KinematicsBuffer
+import posture_classifier
+import gesture_templates
+from gesture_state_machine import StateMachine, RESET, EVENT_LOST, print_trace
+
+
+# --- Guards: (recognizer, features, now) -> bool ---
+def _scroll_posture(r, f, now):
+    return f.is_thumbs_up_posture or f.is_middle_finger_scroll_posture
+
+def _scroll_hold_starting(r, f, now):
+    return _scroll_posture(r, f, now) and r.scroll_posture_start_time == 0.0
+
+def _scroll_held(r, f, now):
+    return _scroll_posture(r, f, now) and (now - r.scroll_posture_start_time) > config.SCROLL_ENGAGE_HOLD_TIME
+
+def _middle_scroll_held(r, f, now):
+    return _scroll_held(r, f, now) and f.is_middle_finger_scroll_posture
+
+def _fist_steady(r, f, now):
+    return f.is_fist and f.pinch_open
+
+def _open_hand_steady(r, f, now):
+    return f.is_open_hand and f.pinch_open
+
+def _debounced(r, f, now):
+    return (now - r.last_reset_time) > config.GESTURE_DEBOUNCE_DELAY
+
+def _debounced_pinch(r, f, now):
+    return _debounced(r, f, now) and f.pinch_closed
+
+def _debounced_mouse_posture(r, f, now):
+    return _debounced(r, f, now) and f.is_mouse_move_posture
+
+def _is_fist(r, f, now):
+    return f.is_fist
+
+def _not_fist(r, f, now):
+    return not f.is_fist
+
+def _is_open_hand(r, f, now):
+    return f.is_open_hand
+
+def _not_open_hand(r, f, now):
+    return not f.is_open_hand
+
+def _transition_held(r, f, now):
+    return (now - r.state_start_time) > config.GESTURE_TRANSITION_TIME
+
+def _fist_after_hold(r, f, now):
+    return f.is_fist and _transition_held(r, f, now)
+
+def _open_after_hold(r, f, now):
+    return f.is_open_hand and _transition_held(r, f, now)
+
+def _swipe_armed(r, f, now):
+    return (now - r.state_start_time) > config.SWIPE_COOLDOWN
+
+def _not_mouse_posture(r, f, now):
+    return not f.is_mouse_move_posture
+
+def _drag_confirmed(r, f, now):
+    return (now - r.state_start_time) > config.DRAG_CONFIRM_DURATION
+
+def _pinch_open(r, f, now):
+    return f.pinch_open
+
+def _pinch_closed(r, f, now):
+    return f.pinch_closed
+
+def _double_click_expired(r, f, now):
+    return (now - r.last_click_time) > config.DOUBLE_CLICK_INTERVAL
+
+def _not_middle_scroll_posture(r, f, now):
+    return not f.is_middle_finger_scroll_posture
+
+def _not_thumbs_up_posture(r, f, now):
+    return not f.is_thumbs_up_posture
+
+
+# --- Transition actions: (recognizer, features, now) ---
+def _start_scroll_hold(r, f, now):
+    r.scroll_posture_start_time = now
+
+def _clear_scroll_hold(r, f, now):
+    r.scroll_posture_start_time = 0.0
+
+def _start_scroll(r, f, now):
+    r.scroll_remainder = 0.0
+
+def _mark_click(r, f, now):
+    r.last_click_time = now
+
+def _clear_click(r, f, now):
+    r.last_click_time = 0
+
+def _transition_too_fast(r, f, now):
+    print(f"DEBUG: 时间检查失败。保持时间需要超过 {config.GESTURE_TRANSITION_TIME} 秒。")
+
+
+# --- Emitters: (recognizer, features, now) -> (gesture, data) or None ---
+# Swipe and scroll use wrist / fingertip velocities (normalized units per second) over a time
+# window of the kinematics history, so their thresholds do not depend on the frame rate.
+def _emit_swipe(r, f, now):
+    # Swipe detection logic (can only happen from a steady open hand). SWIPE_VELOCITY_WINDOW is
+    # shorter than SWIPE_COOLDOWN, so the whole window lies inside the open-hand state.
+    velocity = r.kinematics.velocity(utils.WRIST, config.SWIPE_VELOCITY_WINDOW)
+    if velocity is None:
+        return None
+    vx, vy = float(velocity[0]), float(velocity[1])
+    if abs(vx) > config.SWIPE_SPEED_THRESHOLD or abs(vy) > config.SWIPE_SPEED_THRESHOLD:
+        if abs(vx) > abs(vy): # 水平挥手
+            return (config.GESTURE_SWIPE_RIGHT if vx > 0 else config.GESTURE_SWIPE_LEFT), {'performed_action': True}
+        # 垂直挥手
+        return (config.GESTURE_SWIPE_DOWN if vy > 0 else config.GESTURE_SWIPE_UP), {'performed_action': True}
+    return None
+
+# Cursor and drag read the One Euro filtered landmarks (r.smoothed_landmarks), scroll the
+# filtered speed of its point (r.scroll_velocity); posture guards and swipes use the raw ones
+# so filtering never delays a gesture decision.
+SMOOTHED_LANDMARKS = (utils.THUMB_TIP, utils.INDEX_FINGER_TIP)  # the only ones the cursor emitters read
+
+def _emit_mouse_move(r, f, now):
+    index_tip = r.smoothed_landmarks[utils.INDEX_FINGER_TIP]
+    target_x, target_y = utils.map_to_screen(*r.cursor_point(float(index_tip[0]), float(index_tip[1])))
+    return config.GESTURE_MOUSE_MOVING, {'x': target_x, 'y': target_y, 'performed_action': True}
+
+def _emit_dragging(r, f, now):
+    points = r.smoothed_landmarks
+    target_x, target_y = utils.map_to_screen(*r.cursor_point(*utils.get_pinch_midpoint_normalized_array(points[utils.THUMB_TIP], points[utils.INDEX_FINGER_TIP])))
+    return config.GESTURE_DRAGGING, {'x': target_x, 'y': target_y, 'performed_action': True}
+
+def _scroll_from(point, r):
+    # Scroll by the distance covered since the previous frame (speed * frame interval), only while
+    # the point moves faster than SCROLL_SPEED_THRESHOLD_Y. Fractions of a scroll step carry over,
+    # so the total does not shrink at higher frame rates.
+    velocity = r.scroll_velocity(point)
+    if velocity is None:
+        return None
+    vy = float(velocity[1])
+    if abs(vy) <= config.SCROLL_SPEED_THRESHOLD_Y:
+        r.scroll_remainder = 0.0
+        return None
+    r.scroll_remainder += -1 * vy * r.scroll_kinematics.frame_interval * config.SCROLL_SENSITIVITY_FACTOR
+    scroll_amount = int(r.scroll_remainder)
+    if scroll_amount == 0:
+        return None
+    r.scroll_remainder -= scroll_amount
+    return (config.GESTURE_SCROLL_UP if scroll_amount > 0 else config.GESTURE_SCROLL_DOWN), {'amount': scroll_amount, 'performed_action': True}
+
+def _emit_middle_scroll(r, f, now):
+    return _scroll_from(utils.MIDDLE_FINGER_TIP, r)
+
+def _emit_wrist_scroll(r, f, now):
+    return _scroll_from(utils.WRIST, r)
+
+
+def build_gesture_machine():
+    """
+    Declares the recognizer's states and transitions. Returns an uncompiled StateMachine so
+    callers can add their own transitions (see StateMachine.add_transition) before compile().
+    """
+    m = StateMachine(config.STATE_IDLE)
+
+    # Priority: Check for stable, broad gestures first to avoid misinterpretation.
+    m.add_transition(config.STATE_IDLE, _scroll_hold_starting, actions=[_start_scroll_hold], name="scroll_hold_start")
+    m.add_transition(config.STATE_IDLE, _middle_scroll_held, config.STATE_SCROLL_MODE, actions=[_start_scroll])
+    m.add_transition(config.STATE_IDLE, _scroll_held, config.STATE_THUMBS_UP_SCROLL, actions=[_start_scroll])
+    m.add_transition(config.STATE_IDLE, _scroll_posture, name="scroll_hold")
+    m.add_transition(config.STATE_IDLE, _fist_steady, config.STATE_FIST_STEADY)
+    m.add_transition(config.STATE_IDLE, _open_hand_steady, config.STATE_OPEN_HAND_STEADY)
+    m.add_transition(config.STATE_IDLE, _debounced_pinch, config.STATE_PINCH_DETECTED)
+    m.add_transition(config.STATE_IDLE, _debounced_mouse_posture, config.STATE_MOUSE_MOVING)
+    m.add_transition(config.STATE_IDLE, _debounced, actions=[_clear_scroll_hold], name="idle")
+    # 握拳时大拇指放在拳头外侧，拇指高度应不高于近端食指关节！！！！
+
+    # --- Fist/Open Gesture Logic ---
+    # 当前是稳定的“握拳”状态，等待向“张手”转换；无论持续时间是否足够，转换后都重置
+    m.add_transition(config.STATE_FIST_STEADY, _open_after_hold, RESET, emit=config.GESTURE_FIST_TO_OPEN)
+    m.add_transition(config.STATE_FIST_STEADY, _is_open_hand, RESET, actions=[_transition_too_fast])
+    # 如果手没有变成“张手”，但也不再是“握拳”状态，说明手势乱了，安全重置
+    m.add_transition(config.STATE_FIST_STEADY, _not_fist, RESET)
+
+    # 当前是稳定的“张手”状态，检测是否转换到了“握拳”状态
+    m.add_transition(config.STATE_OPEN_HAND_STEADY, _fist_after_hold, RESET, emit=config.GESTURE_OPEN_TO_FIST)
+    m.add_transition(config.STATE_OPEN_HAND_STEADY, _is_fist, RESET, actions=[_transition_too_fast])
+    # 手不再是“张开”，但也不是“握拳”：混乱状态，安全重置
+    m.add_transition(config.STATE_OPEN_HAND_STEADY, _not_open_hand, RESET)
+    # 手势仍保持在“张开”状态：挥手检测
+    m.add_transition(config.STATE_OPEN_HAND_STEADY, _swipe_armed, RESET, emit=_emit_swipe, name="swipe")
+
+    m.add_transition(config.STATE_MOUSE_MOVING, _not_mouse_posture, RESET)
+    m.add_transition(config.STATE_MOUSE_MOVING, emit=_emit_mouse_move, name="mouse_move")
+
+    m.add_transition(config.STATE_PINCH_DETECTED, _drag_confirmed, config.STATE_DRAGGING,
+                     emit=config.GESTURE_DRAG_START)
+    m.add_transition(config.STATE_PINCH_DETECTED, _pinch_open, config.STATE_POSSIBLE_DOUBLE_CLICK, actions=[_mark_click])
+
+    m.add_transition(config.STATE_POSSIBLE_DOUBLE_CLICK, _pinch_closed, RESET,
+                     emit=config.GESTURE_DOUBLE_CLICK, actions=[_clear_click])
+    m.add_transition(config.STATE_POSSIBLE_DOUBLE_CLICK, _double_click_expired, RESET, emit=config.GESTURE_LEFT_CLICK)
+
+    m.add_transition(config.STATE_DRAGGING, _pinch_open, RESET, emit=config.GESTURE_DRAG_DROP)
+    m.add_transition(config.STATE_DRAGGING, emit=_emit_dragging, name="drag")
+    # Hand lost while dragging: release the button
+    m.add_transition(config.STATE_DRAGGING, emit=config.GESTURE_DRAG_DROP, event=EVENT_LOST, name="drag_lost")
+
+    m.add_transition(config.STATE_SCROLL_MODE, _not_middle_scroll_posture, RESET)
+    m.add_transition(config.STATE_SCROLL_MODE, emit=_emit_middle_scroll, name="scroll")
+
+    m.add_transition(config.STATE_THUMBS_UP_SCROLL, _not_thumbs_up_posture, RESET)
+    m.add_transition(config.STATE_THUMBS_UP_SCROLL, emit=_emit_wrist_scroll, name="scroll")
+    return m
+
+
+DEFAULT_GESTURE_MACHINE = build_gesture_machine().compile()
+
 
 class GestureRecognizer:
-    def __init__(self):
-        # --- State Definitions ---
-        self.STATE_IDLE = "IDLE"
-        self.STATE_PINCH_DETECTED = "PINCH_DETECTED"
-        self.STATE_POSSIBLE_DOUBLE_CLICK = "POSSIBLE_DOUBLE_CLICK"
-        self.STATE_DRAGGING = "DRAGGING"
-        # NEW: Renamed states for clarity and purpose
-        self.STATE_FIST_STEADY = "FIST_STEADY" # Waiting in a fist posture
-        self.STATE_OPEN_HAND_STEADY = "OPEN_HAND_STEADY" # Waiting in an open hand posture
-        self.STATE_MOUSE_MOVING = "MOUSE_MOVING"
-        self.STATE_SCROLL_MODE = "SCROLL_MODE"
-        self.STATE_THUMBS_UP_SCROLL = "THUMBS_UP_SCROLL"
-        
-        self.current_state = self.STATE_IDLE
+    def __init__(self, clock=time.time, machine=None, trace=None, filter_params=None, latency_estimate=None,
+                 classifier=None, templates=None):
+        """
+        clock: time source (seconds). Injectable so recorded sessions can be replayed deterministically.
+        machine: CompiledStateMachine, defaults to DEFAULT_GESTURE_MACHINE.
+        trace: callable(from_state, to_state, transition_name, gesture, now) called on every fired
+            transition; defaults to gesture_state_machine.print_trace if config.GESTURE_STATE_TRACE.
+        filter_params: One Euro parameters for the landmark filter (see set_filter_params),
+            defaults to the "default" profile's.
+        latency_estimate: motion_predictor.LatencyEstimate the cursor is extrapolated by when
+            prediction is on (see set_prediction); defaults to a fixed CURSOR_PREDICTION_LATENCY.
+        classifier: posture_classifier.PostureClassifier for the posture flags, defaults to the
+            model at config.POSTURE_CLASSIFIER_PATH (None: the utils heuristics).
+        templates: gesture_templates.TemplateLibrary of custom motion gestures, defaults to the
+            library at config.GESTURE_TEMPLATE_PATH (None: no custom gestures).
+        """
+        self.clock = clock
+        self.machine = machine if machine is not None else DEFAULT_GESTURE_MACHINE
+        self.trace = trace if trace is not None else (print_trace if config.GESTURE_STATE_TRACE else None)
+        self.classifier = classifier if classifier is not None else posture_classifier.default_classifier()
+        self.templates = templates if templates is not None else gesture_templates.default_library()
+
+        self.state_id = self.machine.initial_state_id
 
         # --- Timers & Counters ---
         self.state_start_time = 0.0
@@ -26,253 +254,163 @@ class GestureRecognizer:
         self.last_reset_time = 0.0
 
         # --- Positions & Data ---
-        self.smoothed_mouse_pos_normalized = (0, 0)
-        self.is_new_movement_gesture = True
-        self.prev_landmarks = None
-        self.prev_scroll_y = None
-        self.wrist_velocity_tracker = deque(maxlen=5) # For swipe detection
+        self.landmark_filter = filters.OneEuroFilter(**(filter_params or filters.filter_params("default")))
+        self.scroll_filter = filters.OneEuroFilter(**(filter_params or filters.filter_params("default")))
+        self.scroll_kinematics = KinematicsBuffer(num_points=1)  # filtered history of the scroll point
+        self.cursor_predictor = MotionPredictor()
+        self.prediction_enabled = config.CURSOR_PREDICTION["default"]
+        self.latency_estimate = latency_estimate
+        self.kinematics = KinematicsBuffer()  # timestamped landmark history, for swipe and scroll velocities
+        self.scroll_remainder = 0.0
+        self._template_block_until = 0.0  # no template matches before this frame time (cooldown)
+        self._pending_template = None     # (template, distance) still improving, see _match_template
+
+        # --- Per-frame feature bookkeeping ---
+        self.last_features = None       # HandFeatures of the most recent frame
+        self.feature_evaluations = 0    # Number of features actually computed for the most recent frame
+        self._frame_index = 0
+        self._frame_time = 0.0          # capture time of the current frame, for the landmark filter and kinematics
+        self._smoothed = None
+        self._smoothed_index = -1       # frame index self._smoothed was computed for
+        self._predicted_index = -1      # frame index the cursor predictor was last updated on
+        self._scroll_index = -1         # frame index the scroll filter was last updated on
+        self._scroll_point = None       # landmark the scroll filter follows
+
+    @property
+    def current_state(self):
+        return self.machine.state_names[self.state_id]
 
     def _reset_all_states(self):
         # Reset all state variables to their initial values
-        self.current_state = self.STATE_IDLE
+        self.state_id = self.machine.initial_state_id
         self.state_start_time = 0.0
         self.last_click_time = 0.0
         self.scroll_posture_start_time = 0.0
-        self.is_new_movement_gesture = True
-        self.prev_scroll_y = None
-        self.wrist_velocity_tracker.clear()
-        self.last_reset_time = time.time()
-        
-    def _enter_state(self, state):
+        self.scroll_remainder = 0.0
+        self.last_reset_time = self.clock()
+
+    def _enter_state(self, state_id):
         # Helper function to transition to a new state and reset the timer
-        self.current_state = state
-        self.state_start_time = time.time()
-
-    def _apply_smoothing(self, raw_pos):
-        # Applies exponential moving average to smooth mouse movements
-        if self.is_new_movement_gesture:
-            self.smoothed_mouse_pos_normalized = raw_pos
-            self.is_new_movement_gesture = False
-        else:
-            prev_smooth_x, prev_smooth_y = self.smoothed_mouse_pos_normalized
-            smooth_x = prev_smooth_x + config.MOUSE_SMOOTHING_FACTOR * (raw_pos[0] - prev_smooth_x)
-            smooth_y = prev_smooth_y + config.MOUSE_SMOOTHING_FACTOR * (raw_pos[1] - prev_smooth_y)
-            self.smoothed_mouse_pos_normalized = (smooth_x, smooth_y)
-        return self.smoothed_mouse_pos_normalized
-
-    def recognize(self, hand_landmark_obj):
-
-        current_time = time.time()
-        recognized_gesture = config.GESTURE_NONE
-        gesture_data = {}
-
-        # If hand is lost, handle drag drop and reset state
-        if not hand_landmark_obj:
-            if self.current_state == self.STATE_DRAGGING:
-                recognized_gesture, gesture_data['performed_action'] = config.GESTURE_DRAG_DROP, True
+        self.state_id = state_id
+        self.state_start_time = self.clock()
+
+    @property
+    def smoothed_landmarks(self):
+        """
+        One Euro filtered landmarks of the current frame as {landmark index: (x, y, z)}, for the
+        SMOOTHED_LANDMARKS only, computed on first use. Only the cursor and drag states read them,
+        so other frames skip the filter; after such a gap the filter restarts from the raw
+        landmarks (a new movement starts where the hand is).
+        """
+        if self._smoothed_index != self._frame_index:
+            if self._smoothed_index != self._frame_index - 1:
+                self.landmark_filter.reset()
+            c = self.last_features.measurements  # flat floats, usually already there from the posture checks
+            smoothed = self.landmark_filter([c[3 * i:3 * i + 3] for i in SMOOTHED_LANDMARKS], self._frame_time)
+            self._smoothed = dict(zip(SMOOTHED_LANDMARKS, smoothed))
+            self._smoothed_index = self._frame_index
+        return self._smoothed
+
+    def scroll_velocity(self, point):
+        """
+        Mean (vx, vy, vz) of the One Euro filtered landmark `point` over SCROLL_VELOCITY_WINDOW,
+        or None until the filtered history covers the window. Like the cursor filter, it restarts
+        from the raw landmark after a frame without scrolling or when the point changes.
+        """
+        if self._scroll_index != self._frame_index - 1 or self._scroll_point != point:
+            self.scroll_filter.reset()
+            self.scroll_kinematics.clear()
+        self._scroll_index = self._frame_index
+        self._scroll_point = point
+        c = self.last_features.measurements
+        self.scroll_kinematics.push(self._frame_time, self.scroll_filter([c[3 * point:3 * point + 3]], self._frame_time))
+        return self.scroll_kinematics.velocity(0, config.SCROLL_VELOCITY_WINDOW)
+
+    def cursor_point(self, x, y):
+        """
+        Normalized cursor position for the current frame: (x, y) itself, or with prediction on,
+        extrapolated by the expected capture-to-action latency. The predictor restarts after a
+        frame without cursor output, like the landmark filter.
+        """
+        if not self.prediction_enabled:
+            return x, y
+        if self._predicted_index != self._frame_index - 1:
+            self.cursor_predictor.reset()
+        self._predicted_index = self._frame_index
+        self.cursor_predictor.update(x, y, self._frame_time)
+        latency = self.latency_estimate.value if self.latency_estimate is not None else config.CURSOR_PREDICTION_LATENCY
+        return self.cursor_predictor.predict(latency)
+
+    def set_prediction(self, enabled):
+        """Turns predictive cursor positioning on or off (config.CURSOR_PREDICTION per profile)."""
+        self.prediction_enabled = enabled
+
+    def set_filter_params(self, params):
+        """Switches the landmark filter to another profile's parameters (dict of OneEuroFilter arguments)."""
+        self.landmark_filter.set_params(**params)
+        self.scroll_filter.set_params(**params)
+
+    def _match_template(self):
+        """
+        Custom gesture (gesture_templates) as (gesture, data), or None. A match fires on the first
+        frame its distance stops decreasing, i.e. when the movement is complete rather than as soon
+        as its first part is close enough.
+        """
+        if self._frame_time < self._template_block_until or self.current_state not in config.GESTURE_TEMPLATE_STATES:
+            self._pending_template = None
+            return None
+        match = self.templates.match(self.kinematics)
+        pending = self._pending_template
+        if match is not None and (pending is None or match[1] < pending[1]):
+            self._pending_template = match
+            return None
+        self._pending_template = None
+        if pending is None:
+            return None
+        template, distance = pending
+        # The same movement stays in the history for the template's duration; do not match it twice
+        self._template_block_until = self._frame_time + max(template.duration, config.GESTURE_TEMPLATE_COOLDOWN)
+        self._reset_all_states()
+        print(f"State: {self.current_state}, Recognized Gesture: {template.name} (template distance {distance:.3f})")
+        return template.name, {'distance': distance, 'performed_action': True}
+
+    def recognize(self, hand, features=None):
+        """
+        hand: hand_tracker.TrackedHand (landmarks as a (21, 3) float32 array), or None if no hand.
+        features: HandFeatures already built for this hand this frame (e.g. by MultiHandRecognizer).
+        """
+        current_time = self.clock()
+
+        # If hand is lost, fire the state's "lost" transition (e.g. drag drop) and reset
+        if hand is None:
+            result = self.machine.step(self, None, current_time, self.machine.lost_table, self.trace)
             self._reset_all_states()
-            return recognized_gesture, gesture_data
-
-        # --- Landmark & Posture Calculation ---
-        actual_landmarks = hand_landmark_obj.landmark
-        thumb_tip = actual_landmarks[config.mp_hands.HandLandmark.THUMB_TIP]
-        index_tip = actual_landmarks[config.mp_hands.HandLandmark.INDEX_FINGER_TIP]
-        middle_tip = actual_landmarks[config.mp_hands.HandLandmark.MIDDLE_FINGER_TIP]
-        wrist = actual_landmarks[config.mp_hands.HandLandmark.WRIST]
-        index_mcp = actual_landmarks[config.mp_hands.HandLandmark.INDEX_FINGER_MCP]
-
-        # 1. 计算一个稳定的“手掌视觉大小”作为参考基准
-        # 我们使用手腕到中指根部指关节的2D距离作为参考
-        wrist_lm = actual_landmarks[config.mp_hands.HandLandmark.WRIST]
-        mcp_lm = actual_landmarks[config.mp_hands.HandLandmark.MIDDLE_FINGER_MCP]
-        hand_scale = utils.calculate_landmark_distance_2d(wrist_lm, mcp_lm)
-
-        # 2. 根据参考基准和config中的比例，动态计算当前的阈值
-        dynamic_pinch_close_threshold = hand_scale * config.PINCH_CLOSE_RATIO
-        dynamic_pinch_open_threshold = hand_scale * config.PINCH_OPEN_RATIO
-        
-        # --- 使用新的动态阈值和2D距离进行判断 ---
-        
-        # 计算拇指和食指指尖的2D距离
-        pinch_distance_2d = utils.calculate_landmark_distance_2d(thumb_tip, index_tip)
-
-        # Use robust, orientation-independent posture detection from utils
-        is_fist = utils.is_hand_closed_to_fist(actual_landmarks)
-        is_open_hand = utils.is_hand_fully_open(actual_landmarks)
-        
-        # Keep original finger extension checks for other gestures
-        finger_ext_states = utils.get_finger_extended_states(actual_landmarks)
-        is_thumb_extended = utils.is_thumb_extended(actual_landmarks)
-        is_mouse_move_posture = finger_ext_states[0] and not any(finger_ext_states[1:])
-        is_middle_finger_scroll_posture = finger_ext_states[1] and not any([finger_ext_states[0], finger_ext_states[2], finger_ext_states[3]])
-
-        finger_ext_states = utils.get_finger_extended_states(actual_landmarks)
-        is_thumb_extended = utils.is_thumb_extended(actual_landmarks)
-        all_four_fingers_curled = not any(finger_ext_states)
-
-        # Pinch detection remains the same
-        current_pinch_is_physically_closed = pinch_distance_2d < dynamic_pinch_close_threshold
-        current_pinch_is_physically_open = pinch_distance_2d > dynamic_pinch_open_threshold
-        
-        is_basic_thumbs_up = is_thumb_extended and all_four_fingers_curled
-        is_thumbs_up_posture = False # 默认为False
-
-        if is_basic_thumbs_up:
-            # 额外几何判断：大拇指指尖必须高于食指的指关节，才是真正的“赞”
-            # 在图像坐标系中，y值越小代表位置越高
-            if thumb_tip.y < index_mcp.y:
-                is_thumbs_up_posture = True
-                
-        # if hand_landmark_obj: print(f"is_fist: {utils.is_hand_closed_to_fist(actual_landmarks)}, is_open: {utils.is_hand_fully_open(actual_landmarks)}")
-        
-        # --- Primary State Machine Logic ---
-        if self.current_state == self.STATE_IDLE:
-            # if current_pinch_is_physically_closed: print("current_pinch_is_physically_closed")
-            # Priority: Check for stable, broad gestures first to avoid misinterpretation.
-            if is_thumbs_up_posture or is_middle_finger_scroll_posture:
-                if self.scroll_posture_start_time == 0.0:
-                    self.scroll_posture_start_time = current_time
-                elif (current_time - self.scroll_posture_start_time) > config.SCROLL_ENGAGE_HOLD_TIME:
-                    self._enter_state(self.STATE_SCROLL_MODE if is_middle_finger_scroll_posture else self.STATE_THUMBS_UP_SCROLL)
-                    self.prev_scroll_y = middle_tip.y if is_middle_finger_scroll_posture else wrist.y
-            elif is_fist and current_pinch_is_physically_open:
-                self._enter_state(self.STATE_FIST_STEADY)
-            elif is_open_hand and current_pinch_is_physically_open:
-                self._enter_state(self.STATE_OPEN_HAND_STEADY)
-            elif (current_time - self.last_reset_time) > config.GESTURE_DEBOUNCE_DELAY:
-                if current_pinch_is_physically_closed:
-                    self._enter_state(self.STATE_PINCH_DETECTED)
-                elif is_mouse_move_posture:
-                    self._enter_state(self.STATE_MOUSE_MOVING)
-                    self.is_new_movement_gesture = True
-                else:
-                    self.scroll_posture_start_time = 0.0
-            # 握拳时大拇指放在拳头外侧，拇指高度应不高于近端食指关节！！！！
-
-        # --- Fist/Open Gesture Logic ---
-        elif self.current_state == self.STATE_FIST_STEADY:
-            # 当前是稳定的“握拳”状态，等待向“张手”转换
-            # 优先检查是否成功转换到了“张手”
-            if is_open_hand:
-                # 如果成功转换，再检查“握拳”姿态的持续时间是否足够长
-                time_held_open = current_time - self.state_start_time
-
-                if time_held_open > config.GESTURE_TRANSITION_TIME:
-                    recognized_gesture, gesture_data['performed_action'] = config.GESTURE_FIST_TO_OPEN, True
-                else:
-                    print(f"DEBUG: 时间检查失败。保持时间需要超过 {config.GESTURE_TRANSITION_TIME} 秒。")
-                
-                # 无论持续时间是否足够，状态已经改变，必须重置
-                self._reset_all_states()
-
-            # 如果手没有变成“张手”，但也不再是“握拳”状态，说明手势乱了，安全重置
-            elif not is_fist:
-                self._reset_all_states()
-                
-        elif self.current_state == self.STATE_OPEN_HAND_STEADY:
-            # 当前是稳定的“张手”状态。计时器(self.state_start_time)已启动。
-            # 目标：检测是否转换到了“握拳”状态。
-            # --- 检查1: 手势是否成功变成了“握拳”？
-            if is_fist:
-                # print("DEBUG: 检测到'握拳'。准备检查计时器...")
-                
-                # 计算“张手”姿态已经保持了多久
-                time_held_open = current_time - self.state_start_time
-                # print(f"DEBUG: '张手'状态已保持 {time_held_open:.2f} 秒。")
-
-                # 只有当“张手”保持时间 > 设定的阈值时，才认为是有效手势
-                if time_held_open > config.GESTURE_TRANSITION_TIME:
-                    # print("DEBUG: 时间检查通过！识别为 GESTURE_OPEN_TO_FIST。")
-                    recognized_gesture, gesture_data['performed_action'] = config.GESTURE_OPEN_TO_FIST, True
-                else:
-                    print(f"DEBUG: 时间检查失败。保持时间需要超过 {config.GESTURE_TRANSITION_TIME} 秒。")
-
-                # 重要：因为手势已经从“张开”变为“握拳”，当前状态必须结束，所以重置。
-                self._reset_all_states()
-
-            # --- 检查2: 如果没变成“握拳”，那是否变成了“非张开”的混乱状态？
-            elif not is_open_hand:
-                # print("DEBUG: 手不再是'张开'，但也不是'握拳'。判定为混乱状态，重置。")
-                # 安全重置，防止因中间状态导致程序卡住
-                self._reset_all_states()
-
-            # --- 检查3: 如果以上都不是，说明手势仍保持在“张开”状态
-            else:
-                # Swipe detection logic (can only happen from a steady open hand)
-                if (current_time - self.state_start_time) > config.SWIPE_COOLDOWN:
-                    if self.prev_landmarks:
-                        dx, dy = utils.calculate_movement_2d_normalized(self.prev_landmarks.landmark[config.mp_hands.HandLandmark.WRIST], wrist)
-                        self.wrist_velocity_tracker.append((dx, dy))
-
-                        if len(self.wrist_velocity_tracker) == self.wrist_velocity_tracker.maxlen:
-                            avg_dx = sum(v[0] for v in self.wrist_velocity_tracker)
-                            avg_dy = sum(v[1] for v in self.wrist_velocity_tracker)
-
-                            if abs(avg_dx) > config.SWIPE_VELOCITY_THRESHOLD or abs(avg_dy) > config.SWIPE_VELOCITY_THRESHOLD:
-                                if abs(avg_dx) > abs(avg_dy): # 水平挥手
-                                    recognized_gesture, gesture_data['performed_action'] = (config.GESTURE_SWIPE_RIGHT, True) if avg_dx > 0 else (config.GESTURE_SWIPE_LEFT, True)
-                                else: # 垂直挥手
-                                    recognized_gesture, gesture_data['performed_action'] = (config.GESTURE_SWIPE_DOWN, True) if dy > 0 else (config.GESTURE_SWIPE_UP, True)
-                                self._reset_all_states()
-
-        elif self.current_state == self.STATE_MOUSE_MOVING:
-            if not is_mouse_move_posture:
-                self._reset_all_states()
-            else:
-                target_x, target_y = utils.map_to_screen(*self._apply_smoothing((index_tip.x, index_tip.y)))
-                recognized_gesture, gesture_data = config.GESTURE_MOUSE_MOVING, {'x': target_x, 'y': target_y, 'performed_action': True}
-                self.prev_landmarks = hand_landmark_obj
-                return recognized_gesture, gesture_data
-
-        elif self.current_state == self.STATE_PINCH_DETECTED:
-            # print(current_pinch_is_physically_open)
-            if (current_time - self.state_start_time) > config.DRAG_CONFIRM_DURATION:
-                self._enter_state(self.STATE_DRAGGING)
-                self.is_new_movement_gesture = True
-                recognized_gesture, gesture_data['performed_action'] = config.GESTURE_DRAG_START, True
-            elif current_pinch_is_physically_open:
-                self._enter_state(self.STATE_POSSIBLE_DOUBLE_CLICK)
-                self.last_click_time = current_time
-        
-        elif self.current_state == self.STATE_POSSIBLE_DOUBLE_CLICK:
-            if current_pinch_is_physically_closed:
-                recognized_gesture, gesture_data['performed_action'] = config.GESTURE_DOUBLE_CLICK, True
-                self.last_click_time = 0
-                self._reset_all_states()
-            elif (current_time - self.last_click_time) > config.DOUBLE_CLICK_INTERVAL:
-                recognized_gesture, gesture_data['performed_action'] = config.GESTURE_LEFT_CLICK, True
-                self._reset_all_states()
-
-        elif self.current_state == self.STATE_DRAGGING:
-            if current_pinch_is_physically_open:
-                recognized_gesture, gesture_data['performed_action'] = config.GESTURE_DRAG_DROP, True
-                self._reset_all_states()
-            else:
-                target_x, target_y = utils.map_to_screen(*self._apply_smoothing(utils.get_pinch_midpoint_normalized(thumb_tip, index_tip)))
-                recognized_gesture, gesture_data = config.GESTURE_DRAGGING, {'x': target_x, 'y': target_y, 'performed_action': True}
-
-        elif self.current_state == self.STATE_SCROLL_MODE:
-            if not is_middle_finger_scroll_posture: self._reset_all_states()
-            else:
-                if self.prev_scroll_y is not None:
-                    dy = middle_tip.y - self.prev_scroll_y
-                    if abs(dy) > config.SCROLL_MOVEMENT_THRESHOLD_Y:
-                        scroll_amount = int(-1 * dy * config.SCROLL_SENSITIVITY_FACTOR)
-                        recognized_gesture, gesture_data = (config.GESTURE_SCROLL_UP if scroll_amount > 0 else config.GESTURE_SCROLL_DOWN), {'amount': scroll_amount, 'performed_action': True}
-                self.prev_scroll_y = middle_tip.y
-        
-        elif self.current_state == self.STATE_THUMBS_UP_SCROLL:
-            if not is_thumbs_up_posture: self._reset_all_states()
-            else:
-                if self.prev_scroll_y is not None:
-                    dy = wrist.y - self.prev_scroll_y
-                    if abs(dy) > config.SCROLL_MOVEMENT_THRESHOLD_Y:
-                        scroll_amount = int(-1 * dy * config.SCROLL_SENSITIVITY_FACTOR)
-                        recognized_gesture, gesture_data = (config.GESTURE_SCROLL_UP if scroll_amount > 0 else config.GESTURE_SCROLL_DOWN), {'amount': scroll_amount, 'performed_action': True}
-                self.prev_scroll_y = wrist.y
+            self._frame_index += 1  # a gap for the landmark filter
+            self.kinematics.clear()
+            self._pending_template = None
+            self.last_features = None
+            self.feature_evaluations = 0
+            return result if result is not None else (config.GESTURE_NONE, {})
+
+        # Features are computed lazily on first access, so each transition guard only pays for what it reads.
+        f = features if features is not None else HandFeatures(hand.landmarks, self.classifier)
+        self.last_features = f
+        self._frame_index += 1
+        # Use the frame's capture time when known, so queueing delays do not distort speed estimates
+        self._frame_time = hand.timestamp if hand.timestamp is not None else current_time
+        self.kinematics.push(self._frame_time, f.points)
+
+        if self.templates is not None:
+            matched = self._match_template()
+            if matched is not None:
+                self.feature_evaluations = f.evaluations
+                return matched
+
+        result = self.machine.step(self, f, current_time, trace=self.trace)
+        recognized_gesture, gesture_data = result if result is not None else (config.GESTURE_NONE, {})
 
         if recognized_gesture not in [config.GESTURE_NONE, config.GESTURE_MOUSE_MOVING]:
             print(f"State: {self.current_state}, Recognized Gesture: {recognized_gesture}, Actionable: {gesture_data.get('performed_action', False)}")
 
-        self.prev_landmarks = hand_landmark_obj # Update previous landmarks at the end of every frame
-        return recognized_gesture, gesture_data
\ No newline at end of file
+        self.feature_evaluations = f.evaluations
+        return recognized_gesture, gesture_data
@@ -0,0 +1,137 @@
+# gesture_state_machine.py
+#
+# Small table-driven state machine used by GestureRecognizer.
+# States and transitions are declared as data on a StateMachine, then compile() turns them
+# into a CompiledStateMachine: state names become integer ids and every (event, state) pair
+# gets a tuple of transitions, so a frame only looks at the transitions of the active state.
+#
+# A transition is (guard, target, emit, actions), checked in declaration order; the first one
+# whose guard passes fires:
+#   guard(ctx, f, now) -> bool      None means "always"
+#   emit                            None, a gesture name (emitted as {'performed_action': True}),
+#                                   or callable(ctx, f, now) -> (gesture_name, gesture_data) / None.
+#                                   A callable returning None means the transition is not taken
+#                                   and the next one is tried.
+#   actions                         callables(ctx, f, now) run when the transition fires
+#   target                          state name to enter, STAY (default) or RESET
+# ctx is the object driving the machine (the recognizer). It provides state_id, _enter_state(id)
+# and _reset_all_states(); f is the frame's HandFeatures (None for the "lost" event).
+
+EVENT_FRAME = "frame"  # a hand was seen this frame
+EVENT_LOST = "lost"    # no hand this frame; the driver resets after the transition
+EVENTS = (EVENT_FRAME, EVENT_LOST)
+
+STAY = None
+RESET = "<reset>"
+
+_RESET_ID = -1
+
+
+def _performed(gesture_name):
+    """Emitter for a discrete gesture."""
+    def emit(ctx, f, now):
+        return gesture_name, {'performed_action': True}
+    return emit
+
+
+def print_trace(from_state, to_state, transition, gesture, now):
+    """Trace hook that prints every transition that changes state or emits a gesture."""
+    if from_state != to_state or gesture is not None:
+        print(f"[{now:.3f}] {from_state} -> {to_state} ({transition}){' emits ' + gesture if gesture else ''}")
+
+
+class StateMachine:
+    """Declarative description of states and transitions; call compile() before use."""
+
+    def __init__(self, initial_state):
+        self.initial_state = initial_state
+        self.states = [initial_state]
+        self.transitions = []  # (event, source, guard, target, emit, actions, name)
+
+    def add_state(self, name):
+        if name not in self.states:
+            self.states.append(name)
+        return self
+
+    def add_transition(self, source, guard=None, target=STAY, emit=None, actions=(), name=None, event=EVENT_FRAME,
+                       before=None):
+        """
+        Adds a transition. Transitions of one state are tried in the order they were added;
+        before: name of an existing transition to insert ahead of (e.g. ahead of a catch-all).
+        """
+        if event not in EVENTS:
+            raise ValueError(f"Unknown event '{event}'")
+        self.add_state(source)
+        if target not in (STAY, RESET):
+            self.add_state(target)
+        if name is None:
+            name = f"{source}->{target or source}"
+        transition = (event, source, guard, target, emit, tuple(actions), name)
+        if before is None:
+            self.transitions.append(transition)
+        else:
+            names = [t[6] for t in self.transitions]
+            if before not in names:
+                raise ValueError(f"No transition named '{before}'")
+            self.transitions.insert(names.index(before), transition)
+        return self
+
+    def compile(self):
+        return CompiledStateMachine(self)
+
+
+class CompiledStateMachine:
+    """Integer-indexed dispatch tables built from a StateMachine."""
+
+    def __init__(self, spec):
+        self.state_names = list(spec.states)
+        self.state_ids = {name: i for i, name in enumerate(self.state_names)}
+        self.initial_state_id = self.state_ids[spec.initial_state]
+        rows = {event: [[] for _ in self.state_names] for event in EVENTS}
+        for event, source, guard, target, emit, actions, name in spec.transitions:
+            if target is STAY:
+                target_id = None
+            elif target == RESET:
+                target_id = _RESET_ID
+            else:
+                target_id = self.state_ids[target]
+            if isinstance(emit, str):
+                emit = _performed(emit)
+            rows[event][self.state_ids[source]].append((guard, target_id, emit, actions, name))
+        # tables[event][state_id] -> tuple of transitions
+        self.tables = {event: [tuple(row) for row in rows[event]] for event in EVENTS}
+        self.frame_table = self.tables[EVENT_FRAME]
+        self.lost_table = self.tables[EVENT_LOST]
+
+    def state_id(self, name):
+        return self.state_ids[name]
+
+    def state_name(self, state_id):
+        return self.state_names[state_id]
+
+    def step(self, ctx, f, now, table=None, trace=None):
+        """
+        Fires the first applicable transition of ctx's current state.
+        Returns (gesture_name, gesture_data), or None if nothing was emitted.
+        """
+        table = self.frame_table if table is None else table
+        for guard, target_id, emit, actions, name in table[ctx.state_id]:
+            if guard is not None and not guard(ctx, f, now):
+                continue
+            result = None
+            if emit is not None:
+                result = emit(ctx, f, now)
+                if result is None:
+                    continue
+            for action in actions:
+                action(ctx, f, now)
+            from_id = ctx.state_id
+            if target_id == _RESET_ID:
+                ctx._reset_all_states()
+            elif target_id is not None:
+                ctx._enter_state(target_id)
+            if trace is not None:
+                trace(self.state_names[from_id], self.state_names[ctx.state_id], name,
+                      result[0] if result else None, now)
+            return result
+        return None
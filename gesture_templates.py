@@ -0,0 +1,323 @@
+# gesture_templates.py
+#
+# User-defined motion gestures. Instead of a new state machine branch, a custom gesture is a
+# few recorded examples ("templates") of the movement; the recognizer compares the live landmark
+# trajectory against every template with dynamic time warping (DTW) and fires the template's
+# name as a gesture, which ActionController maps to an action like any built-in gesture.
+#
+# Trajectories: the wrist and index fingertip, resampled to GESTURE_TEMPLATE_SAMPLES points over
+# the template's duration, centred on the mean wrist position and scaled by the hand size
+# (wrist -> middle MCP), so where the hand is and how far it is from the camera do not matter.
+# Each template is compared with the live window of its own duration and warping absorbs about
+# GESTURE_TEMPLATE_BAND of that, so record examples at the speeds the gesture will be made at.
+# A match fires once its distance stops improving, i.e. right after the movement ends.
+#
+# Matching cost stays low as the library grows to hundreds of templates:
+#   - templates are bucketed by duration; the live window of every bucket is resampled in one
+#     vectorized call per frame.
+#   - LB_Keogh: every template stores the envelope (running min / max within the warping band)
+#     of its trajectory; the squared distance of the live trajectory to that envelope is a lower
+#     bound of the DTW cost. It is computed for the whole library in one vectorized expression.
+#   - full DTW only runs on templates whose bound beats the best match so far, in order of
+#     increasing bound, and abandons as soon as a row of the DTW matrix exceeds that best.
+# Most templates are ruled out by the bound, so the number of DTW evaluations grows much
+# slower than the library.
+#
+# Building a library: record examples (config.LANDMARK_RECORDING_PATH), label them in the
+# recording's .labels.json like evaluate.py datasets ({"gesture": "Circle", "start": .., "end": ..}),
+# then
+#   python gesture_templates.py add recordings/ --gesture Circle
+#   python gesture_templates.py list
+#   python gesture_templates.py remove Circle
+
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+import config
+import utils
+from kinematics import KinematicsBuffer
+
+# Landmarks sampled for a trajectory; the first two are matched, the third gives the hand size
+TRACKED_POINTS = [utils.WRIST, utils.INDEX_FINGER_TIP, utils.MIDDLE_FINGER_MCP]
+
+
+def trajectory_features(samples):
+    """(..., n, 3, 3) samples of TRACKED_POINTS -> (..., n, 4) normalized wrist and index tip x, y."""
+    hand = samples[..., 2, :2] - samples[..., 0, :2]
+    scale = np.maximum(np.sqrt((hand * hand).sum(axis=-1)).mean(axis=-1), 1e-6)
+    centre = samples[..., 0, :2].mean(axis=-2)
+    xy = (samples[..., :2, :2] - centre[..., None, None, :]) / scale[..., None, None, None]
+    return xy.reshape(samples.shape[:-2] + (4,))
+
+
+def band_width(n):
+    return max(1, int(round(n * config.GESTURE_TEMPLATE_BAND)))
+
+
+def envelope(trajectory, band):
+    """LB_Keogh envelope: (lower, upper) running min / max of `trajectory` over +-band samples."""
+    n = len(trajectory)
+    lower = np.empty_like(trajectory)
+    upper = np.empty_like(trajectory)
+    for i in range(n):
+        window = trajectory[max(0, i - band):i + band + 1]
+        lower[i] = window.min(axis=0)
+        upper[i] = window.max(axis=0)
+    return lower, upper
+
+
+def dtw_cost(a, b, band, abandon_above=math.inf):
+    """
+    DTW cost (sum of squared distances along the best warping path within +-band samples)
+    between trajectories `a` and `b` of equal length. Returns inf as soon as every cell of a
+    row exceeds `abandon_above`, since the final cost can only be larger.
+    """
+    n = len(a)
+    cost = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2).tolist()
+    inf = math.inf
+    previous = [inf] * n
+    for i in range(n):
+        row = cost[i]
+        current = [inf] * n
+        lo, hi = max(0, i - band), min(n, i + band + 1)
+        left = inf
+        row_min = inf
+        for j in range(lo, hi):
+            if i == 0 and j == 0:
+                best = 0.0
+            else:
+                best = left
+                if previous[j] < best:
+                    best = previous[j]
+                if j > 0 and previous[j - 1] < best:
+                    best = previous[j - 1]
+            left = row[j] + best
+            current[j] = left
+            if left < row_min:
+                row_min = left
+        if row_min > abandon_above:
+            return inf
+        previous = current
+    return previous[n - 1]
+
+
+class GestureTemplate:
+    """One recorded example: gesture name, duration (s) and (n, 4) normalized trajectory."""
+
+    def __init__(self, name, duration, trajectory):
+        self.name = name
+        self.duration = float(duration)
+        self.trajectory = np.asarray(trajectory, dtype=np.float32)
+
+
+class TemplateLibrary:
+    def __init__(self, templates=()):
+        self.templates = list(templates)
+        self.dtw_evaluations = 0   # full DTW computations, for judging how well the bound prunes
+        self.lb_evaluations = 0    # templates whose lower bound was computed
+        self._compile()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("samples", config.GESTURE_TEMPLATE_SAMPLES) != config.GESTURE_TEMPLATE_SAMPLES:
+            raise ValueError(f"{path}: templates have {data['samples']} samples, GESTURE_TEMPLATE_SAMPLES is "
+                             f"{config.GESTURE_TEMPLATE_SAMPLES}; rebuild the library")
+        return cls(GestureTemplate(t["name"], t["duration"], t["trajectory"]) for t in data.get("templates", []))
+
+    def save(self, path):
+        data = {"samples": config.GESTURE_TEMPLATE_SAMPLES,
+                "templates": [{"name": t.name, "duration": round(t.duration, 3),
+                               "trajectory": np.round(t.trajectory, 4).tolist()} for t in self.templates]}
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    def __len__(self):
+        return len(self.templates)
+
+    def names(self):
+        """Distinct gesture names, in the order they were added."""
+        return list(dict.fromkeys(t.name for t in self.templates))
+
+    def add(self, templates):
+        self.templates.extend(templates)
+        self._compile()
+
+    def remove(self, name):
+        """Removes every template of gesture `name`. Returns how many were removed."""
+        kept = [t for t in self.templates if t.name != name]
+        removed = len(self.templates) - len(kept)
+        self.templates = kept
+        self._compile()
+        return removed
+
+    def _compile(self):
+        """
+        Sorts the templates by duration bucket and stacks their envelopes, so one frame's lower
+        bounds for the whole library are a single vectorized expression.
+        """
+        step = config.GESTURE_TEMPLATE_DURATION_STEP
+        n = config.GESTURE_TEMPLATE_SAMPLES
+        buckets = [max(1, int(round(t.duration / step))) for t in self.templates]
+        order = sorted(range(len(self.templates)), key=lambda i: buckets[i])
+        self._members = [self.templates[i] for i in order]
+        distinct = sorted(set(buckets))
+        self._durations = np.array([b * step for b in distinct])
+        self._bucket_of = np.array([distinct.index(buckets[i]) for i in order], dtype=np.int64)
+        # Index of each bucket's first template, plus the total: bucket b is [start[b], start[b + 1])
+        self._bucket_start = np.searchsorted(self._bucket_of, np.arange(len(distinct) + 1))
+        # Sample offsets (seconds before the newest frame) for every bucket's window: (buckets, n)
+        self._offsets = self._durations[:, None] * np.linspace(-1.0, 0.0, n)[None, :]
+        envelopes = [envelope(t.trajectory, band_width(n)) for t in self._members]
+        self._lower = np.stack([lower for lower, _ in envelopes]) if envelopes else None
+        self._upper = np.stack([upper for _, upper in envelopes]) if envelopes else None
+
+    def match(self, kinematics, max_distance=None):
+        """
+        Best template for the trajectory that ends at the newest frame of `kinematics`
+        (a KinematicsBuffer). Returns (template, RMS distance in hand sizes) or None.
+        """
+        # Buckets whose window fits in the history (durations are sorted)
+        usable = int(np.searchsorted(self._durations, kinematics.span, side="right")) if self._members else 0
+        if not usable:
+            return None
+        max_distance = config.GESTURE_TEMPLATE_MAX_DISTANCE if max_distance is None else max_distance
+        n = config.GESTURE_TEMPLATE_SAMPLES
+        best_cost = max_distance * max_distance * n
+
+        # The live trajectory over every usable bucket's duration, in one resample: (usable, n, 4)
+        samples = kinematics.resample(TRACKED_POINTS, (kinematics.latest_time + self._offsets[:usable]).ravel())
+        if samples is None:
+            return None
+        queries = trajectory_features(samples.reshape(usable, n, len(TRACKED_POINTS), 3))
+        moving = np.ptp(queries, axis=1).max(axis=1) >= config.GESTURE_TEMPLATE_MIN_EXTENT
+        if not moving.any():
+            return None  # the hand has hardly moved over any window
+
+        # LB_Keogh for the templates of the usable buckets (a prefix, as they are sorted by bucket):
+        # squared distance from each query sample to the template's envelope
+        end = self._bucket_start[usable]
+        buckets = self._bucket_of[:end]
+        query = queries[buckets]
+        outside = np.maximum(query, self._lower[:end])
+        np.minimum(outside, self._upper[:end], out=outside)
+        outside -= query
+        outside *= outside
+        bounds = outside.reshape(end, -1).sum(axis=1)
+        bounds[~moving[buckets]] = np.inf
+        self.lb_evaluations += end
+
+        best = None
+        band = band_width(n)
+        for i in np.argsort(bounds):
+            if bounds[i] >= best_cost:
+                break  # every remaining bound is larger
+            template = self._members[i]
+            self.dtw_evaluations += 1
+            cost = dtw_cost(query[i], template.trajectory, band, best_cost)
+            if cost < best_cost:
+                best_cost, best = cost, template
+        if best is None:
+            return None
+        return best, math.sqrt(best_cost / n)
+
+
+_loaded = {}
+
+
+def default_library():
+    """The library at config.GESTURE_TEMPLATE_PATH (loaded once per process), or None if unset, missing or empty."""
+    path = config.GESTURE_TEMPLATE_PATH
+    if not path or not os.path.exists(path):
+        return None
+    if path not in _loaded:
+        library = TemplateLibrary.load(path)
+        print(f"Loaded {len(library)} gesture templates ({', '.join(library.names())}) from {path}")
+        _loaded[path] = library if len(library) else None
+    return _loaded[path]
+
+
+def template_names():
+    """Gesture names of the default library, for the mapping UI."""
+    library = default_library()
+    return library.names() if library is not None else []
+
+
+# --- Building templates from labeled recordings ---
+
+def extract_template(timestamps, present, landmarks, name, start, end):
+    """Template for the labeled stretch [start, end] (seconds from the clip's first frame), or None if the hand was lost."""
+    times = timestamps - timestamps[0]
+    inside = (times >= start) & (times <= end)
+    if not inside.any() or not present[inside].all():
+        return None
+    buffer = KinematicsBuffer(capacity=int(inside.sum()))
+    for i in np.nonzero(inside)[0]:
+        buffer.push(float(times[i]), landmarks[i])
+    times_in = times[inside]
+    samples = buffer.resample(TRACKED_POINTS, np.linspace(times_in[0], times_in[-1], config.GESTURE_TEMPLATE_SAMPLES))
+    if samples is None:
+        return None
+    return GestureTemplate(name, times_in[-1] - times_in[0], trajectory_features(samples))
+
+
+def main():
+    import evaluate
+    builtin = set(v for k, v in vars(config).items()
+                  if k.startswith("GESTURE_") and not k.startswith("GESTURE_TEMPLATE_") and isinstance(v, str))
+
+    parser = argparse.ArgumentParser(description="Manage the custom gesture template library.")
+    parser.add_argument("--library", default=config.GESTURE_TEMPLATE_PATH, help="Template library file (.json)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add", help="Add the labeled examples of a gesture from recordings")
+    add_parser.add_argument("clips", nargs="+", help="Labeled clips (.hblm + .labels.json, or .json) or directories")
+    add_parser.add_argument("--gesture", required=True, help="Gesture name, as used in the labels and the mappings")
+    commands.add_parser("list", help="List the gestures in the library")
+    remove_parser = commands.add_parser("remove", help="Remove every template of a gesture")
+    remove_parser.add_argument("gesture")
+    args = parser.parse_args()
+
+    library = TemplateLibrary.load(args.library) if os.path.exists(args.library) else TemplateLibrary()
+    if args.command == "list":
+        for name in library.names():
+            durations = [t.duration for t in library.templates if t.name == name]
+            print(f"{name}: {len(durations)} templates, {min(durations):.2f}-{max(durations):.2f} s")
+        return
+    if args.command == "remove":
+        print(f"Removed {library.remove(args.gesture)} templates of {args.gesture}")
+        library.save(args.library)
+        return
+
+    if args.gesture in builtin:
+        parser.error(f"{args.gesture!r} is a built-in gesture name")
+    paths = []
+    for item in args.clips:
+        paths += evaluate.find_clips(item) if os.path.isdir(item) else [item]
+    added = []
+    for path in paths:
+        timestamps, present, landmarks, _, labels, capture_times = evaluate.load_clip(path)
+        if capture_times is not None:
+            timestamps = capture_times  # the live matcher sees the hand's movement on capture times
+        for gesture, start, end in labels:
+            if gesture != args.gesture:
+                continue
+            template = extract_template(timestamps, present, landmarks, gesture, start, end)
+            if template is None:
+                print(f"{path}: skipped {gesture} at {start:.2f}s (hand lost)")
+            elif template.duration > config.KINEMATICS_HISTORY_SECONDS:
+                print(f"{path}: skipped {gesture} at {start:.2f}s ({template.duration:.2f}s is longer than "
+                      f"KINEMATICS_HISTORY_SECONDS)")
+            else:
+                added.append(template)
+    library.add(added)
+    library.save(args.library)
+    print(f"Added {len(added)} templates of {args.gesture}; {len(library)} templates in {args.library}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import config
+import utils
+
+
+class _feature:
+    """
+    Non-data descriptor: computes the feature on first access, stores the value in the
+    instance __dict__ (so later reads are plain attribute lookups) and counts the evaluation.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = self.func(obj)
+        obj.__dict__[self.name] = value
+        obj.evaluations += 1
+        return value
+
+
+class HandFeatures:
+    """
+    Per-frame hand features, evaluated lazily and memoized.
+    The recognizer builds one instance per frame; each state only pays for the features it reads.
+    `evaluations` counts how many features were actually computed for this frame.
+    With a posture_classifier.PostureClassifier, the posture flags come from its single posture
+    per frame instead of the utils heuristics.
+    """
+
+    def __init__(self, points, classifier=None):
+        self.points = points  # (21, 3) float32 landmark array
+        self.classifier = classifier
+        self.evaluations = 0
+
+    # --- Raw landmark rows ---
+    @_feature
+    def thumb_tip(self):
+        return self.points[utils.THUMB_TIP]
+
+    @_feature
+    def index_tip(self):
+        return self.points[utils.INDEX_FINGER_TIP]
+
+    @_feature
+    def middle_tip(self):
+        return self.points[utils.MIDDLE_FINGER_TIP]
+
+    @_feature
+    def wrist(self):
+        return self.points[utils.WRIST]
+
+    # --- Pinch ---
+    @_feature
+    def hand_scale(self):
+        """手腕到中指根部指关节的2D距离，作为“手掌视觉大小”参考基准。"""
+        return utils.calculate_landmark_distance_2d_array(self.points, utils.WRIST, utils.MIDDLE_FINGER_MCP)
+
+    @_feature
+    def pinch_distance(self):
+        """拇指和食指指尖的2D距离。"""
+        return utils.calculate_landmark_distance_2d_array(self.points, utils.THUMB_TIP, utils.INDEX_FINGER_TIP)
+
+    @_feature
+    def pinch_closed(self):
+        return self.pinch_distance < self.hand_scale * config.PINCH_CLOSE_RATIO
+
+    @_feature
+    def pinch_open(self):
+        return self.pinch_distance > self.hand_scale * config.PINCH_OPEN_RATIO
+
+    @_feature
+    def pinch_midpoint(self):
+        return utils.get_pinch_midpoint_normalized_array(self.thumb_tip, self.index_tip)
+
+    # --- Postures ---
+    @_feature
+    def posture(self):
+        """The classifier's posture name (see posture_classifier.POSTURES); only read with a classifier."""
+        return self.classifier.classify(self.points)
+
+    @_feature
+    def measurements(self):
+        """Landmarks as flat Python floats, shared by all posture predicates (see utils.posture_measurements)."""
+        return utils.posture_measurements(self.points)
+
+    @_feature
+    def is_fist(self):
+        if self.classifier is not None:
+            return self.posture == "fist"
+        return utils.is_hand_closed_to_fist_array(self.points, self.measurements)
+
+    @_feature
+    def is_open_hand(self):
+        if self.classifier is not None:
+            return self.posture == "open"
+        return utils.is_hand_fully_open_array(self.points, self.measurements)
+
+    @_feature
+    def finger_states(self):
+        """[Index, Middle, Ring, Pinky] extension flags."""
+        return utils.get_finger_extended_states_array(self.points, self.measurements)
+
+    @_feature
+    def thumb_extended(self):
+        return utils.is_thumb_extended_array(self.points, self.measurements)
+
+    @_feature
+    def is_mouse_move_posture(self):
+        if self.classifier is not None:
+            return self.posture == "point"
+        states = self.finger_states
+        return states[0] and not any(states[1:])
+
+    @_feature
+    def is_middle_finger_scroll_posture(self):
+        if self.classifier is not None:
+            return self.posture == "middle"
+        states = self.finger_states
+        return states[1] and not (states[0] or states[2] or states[3])
+
+    @_feature
+    def is_thumbs_up_posture(self):
+        if self.classifier is not None:
+            return self.posture == "thumbs_up"
+        # 大拇指伸展、四指卷曲，且拇指指尖高于食指根部关节（图像坐标中y越小越高）
+        if not self.thumb_extended or any(self.finger_states):
+            return False
+        return bool(self.thumb_tip[1] < self.points[utils.INDEX_FINGER_MCP, 1])
@@ -1,42 +1,241 @@
 import cv2
 import mediapipe as mp
+import numpy as np
 import config
+import utils
+
+
+class TrackedHand:
+    """
+    One detected hand for the current frame.
+    landmarks: contiguous (21, 3) float32 array of normalized x, y, z.
+    handedness: "Left" / "Right" as reported by MediaPipe.
+    score: handedness classification confidence.
+    track_id: id that stays the same for the same hand across frames (see HandIdTracker), or None.
+    timestamp: capture time of the frame (time.perf_counter), or None if unknown.
+    """
+    __slots__ = ("landmarks", "handedness", "score", "track_id", "timestamp")
+
+    def __init__(self, landmarks, handedness="", score=0.0, track_id=None, timestamp=None):
+        self.landmarks = landmarks
+        self.handedness = handedness
+        self.score = score
+        self.track_id = track_id
+        self.timestamp = timestamp
+
+
+class HandIdTracker:
+    """
+    Assigns stable track ids to the hands of consecutive frames by greedy nearest-neighbour
+    matching of hand centres. A hand reported with the other handedness pays half of
+    `max_distance` as a penalty, so MediaPipe's occasional handedness flips do not break a track.
+    A track survives up to `max_missed` frames without a match, so a hand that blinks out
+    for a frame gets its old id back.
+    """
+
+    def __init__(self, max_distance=None, max_missed=None):
+        self.max_distance = config.HAND_TRACK_MAX_DISTANCE if max_distance is None else max_distance
+        self.max_missed = config.HAND_TRACK_MAX_MISSED if max_missed is None else max_missed
+        self._tracks = {}  # track_id -> [centre_x, centre_y, handedness, missed_frames]
+        self._next_id = 1
+
+    def assign(self, hands):
+        """Sets track_id on every TrackedHand in `hands` (in place) and returns `hands`."""
+        centres = [(float(h.landmarks[:, 0].mean()), float(h.landmarks[:, 1].mean())) for h in hands]
+        pairs = []
+        for track_id, (tx, ty, handedness, _) in self._tracks.items():
+            for i, (cx, cy) in enumerate(centres):
+                cost = ((cx - tx) ** 2 + (cy - ty) ** 2) ** 0.5
+                if handedness != hands[i].handedness:
+                    cost += self.max_distance * 0.5
+                if cost <= self.max_distance:
+                    pairs.append((cost, track_id, i))
+        pairs.sort()
+        matched_tracks = set()
+        for cost, track_id, i in pairs:
+            if track_id not in matched_tracks and hands[i].track_id is None:
+                hands[i].track_id = track_id
+                matched_tracks.add(track_id)
+        for i, hand in enumerate(hands):
+            if hand.track_id is None:
+                hand.track_id = self._next_id
+                self._next_id += 1
+            self._tracks[hand.track_id] = [centres[i][0], centres[i][1], hand.handedness, 0]
+        seen = set(h.track_id for h in hands)
+        for track_id in list(self._tracks):
+            if track_id not in seen:
+                self._tracks[track_id][3] += 1
+                if self._tracks[track_id][3] > self.max_missed:
+                    del self._tracks[track_id]
+        return hands
+
+
+def draw_hand_landmarks(frame, hands):
+    """Draws the hand skeletons with plain OpenCV calls (for hands that came without MediaPipe protobufs)."""
+    height, width = frame.shape[:2]
+    for hand in hands:
+        points = [(int(x * width), int(y * height)) for x, y in hand.landmarks[:, :2].tolist()]
+        for start, end in mp.solutions.hands.HAND_CONNECTIONS:
+            cv2.line(frame, points[start], points[end], (224, 224, 224), 2, cv2.LINE_AA)
+        for point in points:
+            cv2.circle(frame, point, 3, (0, 0, 255), -1, cv2.LINE_AA)
+
+
+def draw_tracking_overlay(frame, hands, roi):
+    """Draws the inference ROI and, with several hands, their track ids."""
+    if roi is not None:
+        cv2.rectangle(frame, (roi[0], roi[1]), (roi[2] - 1, roi[3] - 1), (128, 128, 128), 1)
+    if len(hands) > 1:
+        height, width = frame.shape[:2]
+        for hand in hands:
+            wrist = hand.landmarks[utils.WRIST]
+            cv2.putText(frame, f"#{hand.track_id} {hand.handedness}", (int(wrist[0] * width), int(wrist[1] * height) + 20),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1, cv2.LINE_AA)
+
 
 class HandTracker:
-    def __init__(self):
+    def __init__(self, roi_enabled=None):
+        """
+        roi_enabled: run inference on a crop around the previous frame's hands instead of the
+            full frame (config.HAND_ROI_ENABLED). Falls back to the full frame when the crop
+            finds no hand, and periodically to discover new hands.
+        """
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
+        self.hands = self._create_hands()
+        self.mp_draw = mp.solutions.drawing_utils
+        self.id_tracker = HandIdTracker()
+
+        self.roi_enabled = config.HAND_ROI_ENABLED if roi_enabled is None else roi_enabled
+        # 视频模式下 MediaPipe 用上一帧的 landmarks 做跟踪；ROI 裁剪图与整帧的坐标系不同，
+        # 共用一个 graph 会让每次切换都拿错误的先验，所以裁剪图单独用一个实例
+        self.roi_hands = self._create_hands() if self.roi_enabled else None
+        self.roi = None                 # (x0, y0, x1, y1) in pixels for the next frame, None = full frame
+        self.last_inference_mode = ""   # "full", "roi" or "roi+full" (ROI missed, retried on the full frame)
+        self.last_roi = None            # ROI used for the most recent frame (None = full frame)
+        self._frames_since_full = 0
+        self._last_hand_count = 0
+        self._rgb_buffer = None  # flat uint8 scratch for the BGR->RGB conversion, grown to the largest view
+
+    def _create_hands(self):
+        return self.mp_hands.Hands(
             static_image_mode=False,
             model_complexity=1,
             max_num_hands=config.MAX_NUM_HANDS,
             min_detection_confidence=config.MIN_DETECTION_CONFIDENCE,
             min_tracking_confidence=config.MIN_TRACKING_CONFIDENCE
         )
-        self.mp_draw = mp.solutions.drawing_utils
 
-    def process_frame(self, frame):
+    def _detect(self, frame, roi, draw=True):
+        """Runs MediaPipe on the frame or on its ROI; returns TrackedHands in full-frame coordinates."""
+        if roi is None:
+            view = frame
+        else:
+            x0, y0, x1, y1 = roi
+            view = frame[y0:y1, x0:x1]  # a view: landmarks drawn on it land on the full frame
+        # Convert into the reused scratch buffer (MediaPipe copies the image, so it is free again
+        # as soon as process() returns)
+        h, w = view.shape[:2]
+        if self._rgb_buffer is None or self._rgb_buffer.size < h * w * 3:
+            self._rgb_buffer = np.empty(h * w * 3, dtype=np.uint8)
+        rgb_frame = self._rgb_buffer[:h * w * 3].reshape(h, w, 3)
+        cv2.cvtColor(view, cv2.COLOR_BGR2RGB, dst=rgb_frame)
+        results = (self.hands if roi is None else self.roi_hands).process(rgb_frame)
+
+        hands = []
+        if results.multi_hand_landmarks:
+            height, width = frame.shape[:2]
+            for i, hand_landmarks_data in enumerate(results.multi_hand_landmarks):
+                handedness, score = "", 0.0
+                if results.multi_handedness and i < len(results.multi_handedness):
+                    classification = results.multi_handedness[i].classification[0]
+                    handedness, score = classification.label, classification.score
+                points = utils.landmarks_to_array(hand_landmarks_data.landmark)
+                if roi is not None:
+                    # Crop-normalized -> frame-normalized (z is scaled like x by MediaPipe)
+                    scale_x, scale_y = (x1 - x0) / width, (y1 - y0) / height
+                    points[:, 0] = points[:, 0] * scale_x + x0 / width
+                    points[:, 1] = points[:, 1] * scale_y + y0 / height
+                    points[:, 2] *= scale_x
+                hands.append(TrackedHand(points, handedness, score))
+                if draw:
+                    self.mp_draw.draw_landmarks(
+                        view,
+                        hand_landmarks_data,
+                        self.mp_hands.HAND_CONNECTIONS
+                    )
+        return hands
+
+    def _update_roi(self, hands, width, height):
         """
-        Processes a video frame to detect hand landmarks.
+        Picks the ROI for the next frame: a square around all hands plus HAND_ROI_MARGIN.
+        The current ROI is kept while the hands stay inside it and it is not much larger than
+        needed (HAND_ROI_HYSTERESIS), so the crop does not jitter with every landmark update.
+        """
+        if not hands:
+            self.roi = None
+            return
+        xs = [float(v) for hand in hands for v in (hand.landmarks[:, 0].min(), hand.landmarks[:, 0].max())]
+        ys = [float(v) for hand in hands for v in (hand.landmarks[:, 1].min(), hand.landmarks[:, 1].max())]
+        bx0, bx1 = min(xs) * width, max(xs) * width
+        by0, by1 = min(ys) * height, max(ys) * height
+        side = max(bx1 - bx0, by1 - by0) * (1 + 2 * config.HAND_ROI_MARGIN)
+        side = max(side, config.HAND_ROI_MIN_SIZE * min(width, height))
+
+        if self.roi is not None:
+            x0, y0, x1, y1 = self.roi
+            # Keep half the margin as clearance so a moving hand is re-centred before it reaches the edge
+            pad = max(bx1 - bx0, by1 - by0) * config.HAND_ROI_MARGIN * 0.5
+            inside = x0 <= max(bx0 - pad, 0) and y0 <= max(by0 - pad, 0) and \
+                min(bx1 + pad, width) <= x1 and min(by1 + pad, height) <= y1
+            if inside and max(x1 - x0, y1 - y0) <= side * config.HAND_ROI_HYSTERESIS:
+                return
+
+        roi_w, roi_h = min(int(side), width), min(int(side), height)
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        x0 = int(min(max(cx - roi_w / 2, 0), width - roi_w))
+        y0 = int(min(max(cy - roi_h / 2, 0), height - roi_h))
+        if roi_w * roi_h >= width * height * 0.9:
+            self.roi = None  # hands fill the frame; cropping would not save anything
+        else:
+            self.roi = (x0, y0, x0 + roi_w, y0 + roi_h)
+
+    def process_frame(self, frame, draw=True):
+        """
+        Processes a video frame to detect hand landmarks (one MediaPipe pass for all hands,
+        on the ROI when one is set).
         Args:
             frame: The BGR video frame.
+            draw: draw landmarks, the ROI and hand labels on the frame.
         Returns:
-            A tuple (processed_frame, hand_landmarks).
+            A tuple (processed_frame, hands).
             processed_frame: The frame with landmarks drawn (if any).
-            hand_landmarks: MediaPipe landmarks object for the first detected hand, or None.
+            hands: list of TrackedHand (with handedness and track_id, landmarks normalized to
+                the full frame), empty if no hand.
         """
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(rgb_frame)
+        height, width = frame.shape[:2]
+        roi = self.roi if self.roi_enabled else None
+        if roi is not None and self._frames_since_full >= config.HAND_ROI_FULL_FRAME_INTERVAL \
+                and self._last_hand_count < config.MAX_NUM_HANDS:
+            roi = None  # look for hands that entered outside the ROI
 
-        hand_landmarks_data = None
-        if results.multi_hand_landmarks:
-            # For simplicity, using the first detected hand
-            hand_landmarks_data = results.multi_hand_landmarks[0]
-            self.mp_draw.draw_landmarks(
-                frame,
-                hand_landmarks_data,
-                self.mp_hands.HAND_CONNECTIONS
-            )
-        return frame, hand_landmarks_data
+        hands = self._detect(frame, roi, draw)
+        self.last_inference_mode = "full" if roi is None else "roi"
+        if roi is not None and not hands:
+            # Hand left the crop (or tracking failed): retry on the full frame right away
+            hands = self._detect(frame, None, draw)
+            self.last_inference_mode = "roi+full"
+        self._frames_since_full = self._frames_since_full + 1 if self.last_inference_mode == "roi" else 0
+        self.last_roi = roi
+
+        self._last_hand_count = len(hands)
+        self.id_tracker.assign(hands)
+        if self.roi_enabled:
+            self._update_roi(hands, width, height)
+        if draw:
+            draw_tracking_overlay(frame, hands, roi)
+        return frame, hands
 
     def close(self):
-        self.hands.close()
\ No newline at end of file
+        self.hands.close()
+        if self.roi_hands is not None:
+            self.roi_hands.close()
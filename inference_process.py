@@ -0,0 +1,211 @@
+# inference_process.py
+#
+# Runs HandTracker (MediaPipe) in a worker process so inference does not share the GIL with
+# recognition, action dispatch and the UI. Frames and landmarks travel through shared memory;
+# only a few small tuples per frame cross the pipe.
+#
+#   main process                               worker process
+#   copy frame -> frame ring[slot]
+#   send (seq, slot, height, width)     ->     HandTracker.process_frame(ring[slot], draw=False)
+#                                              landmarks -> result ring[slot]
+#   read result ring[slot]              <-     send (seq, slot, mode, roi, [(handedness, score, track_id)])
+#   draw landmarks / ROI with cv2
+#
+# InferenceProcess has the HandTracker interface (process_frame, last_inference_mode, close), so
+# processing_worker does not care where inference runs. Requests are synchronous: the processing
+# thread blocks on the pipe (without holding the GIL) while the worker runs MediaPipe, so latency
+# is one inference plus a frame copy and two pipe round trips. The ring has more than one slot so
+# a frame whose result timed out is not overwritten while the worker may still be reading it.
+#
+# The worker is started with "spawn" (forking a process that already runs camera and UI threads
+# is not safe) and reads config when it starts, so config changes made later do not reach it.
+
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import config
+from hand_tracker import TrackedHand, draw_hand_landmarks, draw_tracking_overlay
+
+NUM_LANDMARKS = 21
+
+
+def _worker_main(conn, frames_name, results_name, slots, slot_bytes, max_hands, roi_enabled):
+    """Worker process entry point: serves (seq, slot, height, width) requests until None or EOF."""
+    # Attaching also registers the blocks with the resource tracker, which the spawned worker shares
+    # with the main process, so the main process's unlink() cleans up both registrations
+    frames_shm = shared_memory.SharedMemory(name=frames_name)
+    results_shm = shared_memory.SharedMemory(name=results_name)
+    frames = np.ndarray((slots, slot_bytes), dtype=np.uint8, buffer=frames_shm.buf)
+    results = np.ndarray((slots, max_hands, NUM_LANDMARKS, 3), dtype=np.float32, buffer=results_shm.buf)
+    tracker = None
+    try:
+        from hand_tracker import HandTracker
+        tracker = HandTracker(roi_enabled=roi_enabled)
+        conn.send(("ready", os.getpid()))
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break  # main process is gone
+            if request is None:
+                break
+            seq, slot, height, width = request
+            frame = frames[slot, :height * width * 3].reshape(height, width, 3)
+            _, hands = tracker.process_frame(frame, draw=False)
+            hands = hands[:max_hands]
+            for i, hand in enumerate(hands):
+                results[slot, i] = hand.landmarks
+            conn.send((seq, slot, tracker.last_inference_mode, tracker.last_roi,
+                       [(hand.handedness, hand.score, hand.track_id) for hand in hands]))
+    except KeyboardInterrupt:
+        pass  # Ctrl+C reaches the whole process group; the main process shuts down on its own
+    except Exception as e:
+        try:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
+        except (OSError, EOFError):
+            pass
+    finally:
+        if tracker is not None:
+            tracker.close()
+        del frames, results
+        frames_shm.close()
+        results_shm.close()
+        conn.close()
+
+
+class InferenceProcess:
+    def __init__(self, stop_ev=None, roi_enabled=None, slots=None, max_frame=None):
+        """
+        stop_ev: threading.Event of the pipeline. Waits are cut short once it is set, and it is
+            set if the worker dies so the rest of the pipeline shuts down with it.
+        roi_enabled: passed to the worker's HandTracker.
+        slots: frames in the shared-memory ring (config.INFERENCE_SHM_SLOTS).
+        max_frame: (width, height) of the largest frame a slot can hold (config.INFERENCE_SHM_MAX_FRAME).
+        Raises RuntimeError if the worker does not come up within config.INFERENCE_START_TIMEOUT.
+        """
+        self.stop_ev = stop_ev
+        self.slots = config.INFERENCE_SHM_SLOTS if slots is None else slots
+        max_width, max_height = max_frame or config.INFERENCE_SHM_MAX_FRAME
+        self.slot_bytes = max_width * max_height * 3
+        self.max_hands = config.MAX_NUM_HANDS
+
+        self.last_inference_mode = ""
+        self.last_roi = None
+        self.timeouts = 0
+        self._seq = 0
+        self._next_slot = 0
+        self._process = None
+        self._conn = None
+
+        self._frames_shm = shared_memory.SharedMemory(create=True, size=self.slots * self.slot_bytes)
+        self._results_shm = shared_memory.SharedMemory(
+            create=True, size=self.slots * self.max_hands * NUM_LANDMARKS * 3 * 4)
+        self._frames = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self._frames_shm.buf)
+        self._results = np.ndarray((self.slots, self.max_hands, NUM_LANDMARKS, 3), dtype=np.float32,
+                                   buffer=self._results_shm.buf)
+
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(
+            target=_worker_main, name="HandBridge-inference", daemon=True,
+            args=(child_conn, self._frames_shm.name, self._results_shm.name, self.slots, self.slot_bytes,
+                  self.max_hands, roi_enabled))
+        self._process.start()
+        child_conn.close()
+
+        reply = self._wait_reply(config.INFERENCE_START_TIMEOUT)
+        if not reply or reply[0] != "ready":
+            reason = reply[1] if reply and reply[0] == "error" else "no response"
+            self.close()
+            raise RuntimeError(f"Inference process failed to start ({reason})")
+        print(f"Inference process started (pid {reply[1]}, {self.slots} shared-memory slots)")
+
+    def _wait_reply(self, timeout):
+        """Next message from the worker, or None on timeout, stop_ev or a dead worker."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                if self._conn.poll(min(remaining, 0.05)):
+                    return self._conn.recv()
+            except (EOFError, OSError):
+                return self._worker_died()
+            if self.stop_ev is not None and self.stop_ev.is_set():
+                return None
+            if not self._process.is_alive():
+                return self._worker_died()
+
+    def _worker_died(self):
+        self._process.join(timeout=0.5)  # the pipe can close a moment before the process is reaped
+        print(f"Error: inference process exited (code {self._process.exitcode})")
+        if self.stop_ev is not None:
+            self.stop_ev.set()
+        return None
+
+    def process_frame(self, frame, draw=True):
+        """Same contract as HandTracker.process_frame; returns (frame, []) if no result arrives."""
+        height, width = frame.shape[:2]
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame {width}x{height} does not fit an inference slot (INFERENCE_SHM_MAX_FRAME)")
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        np.copyto(self._frames[slot, :frame.nbytes].reshape(frame.shape), frame)
+        self._seq += 1
+        try:
+            self._conn.send((self._seq, slot, height, width))
+        except (OSError, ValueError):
+            self._worker_died()
+            return frame, []
+
+        while True:
+            reply = self._wait_reply(config.INFERENCE_FRAME_TIMEOUT)
+            if reply is None:
+                if not (self.stop_ev is not None and self.stop_ev.is_set()):
+                    self.timeouts += 1
+                    print(f"Warning: no inference result for frame {self._seq}")
+                return frame, []
+            if reply[0] == "error":
+                print(f"Error in inference process: {reply[1]}")
+                continue  # the worker exits after an error; the next wait notices
+            if reply[0] == self._seq:
+                break
+            # else: late result for a frame that already timed out
+
+        _, slot, self.last_inference_mode, self.last_roi, meta = reply
+        # Copy the landmarks out: the slot is rewritten a few frames from now
+        hands = [TrackedHand(self._results[slot, i].copy(), handedness, score, track_id)
+                 for i, (handedness, score, track_id) in enumerate(meta)]
+        if draw:
+            draw_hand_landmarks(frame, hands)
+            draw_tracking_overlay(frame, hands, self.last_roi)
+        return frame, hands
+
+    def close(self):
+        """Stops the worker (politely, then by force) and frees the shared memory. Safe to call twice."""
+        if self._process is not None:
+            if self._process.is_alive():
+                try:
+                    self._conn.send(None)
+                except (OSError, ValueError):
+                    pass
+                self._process.join(timeout=2)
+                if self._process.is_alive():
+                    print("Inference process did not exit, terminating it")
+                    self._process.terminate()
+                    self._process.join(timeout=1)
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._frames_shm is not None:
+            del self._frames, self._results
+            for shm in (self._frames_shm, self._results_shm):
+                shm.close()
+                shm.unlink()
+            self._frames_shm = self._results_shm = None
@@ -0,0 +1,405 @@
+# input_backends.py
+#
+# OS input injection behind a small common interface, so BASE_ACTIONS in action_controller
+# do not depend on pyautogui directly.
+#   - PyAutoGUIBackend: portable default (tweening, global pyautogui.PAUSE after every call).
+#   - XTestBackend: X11 XTest extension through python-xlib, no sleeps.
+#   - UInputBackend: Linux /dev/uinput virtual device through python-evdev (X11 and Wayland).
+#   - RecordingBackend: keeps timestamped events in memory, for tests, replay and benchmarks.
+#
+# Pick one with config.INPUT_BACKEND; `python input_backends.py` measures the injection
+# latency of every backend available on this machine.
+#
+# A backend is shared by the action dispatcher and the macro scheduler thread, and neither
+# python-xlib nor pyautogui is thread-safe, so every call holds the backend's lock. Compound
+# calls (click, hotkey, ...) hold it throughout, so another thread's input never lands between
+# a modifier going down and the key it modifies.
+
+import argparse
+import functools
+import threading
+import time
+
+import config
+
+
+def serialized(method):
+    """Runs a backend method under the backend's lock (see InputBackend)."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+class InputBackend:
+    """
+    Base class. Subclasses implement the primitive calls (decorated with @serialized) and call
+    InputBackend.__init__; compound ones are built on top.
+    """
+    name = "base"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def move_to(self, x, y, duration=0.0):
+        raise NotImplementedError
+
+    def mouse_down(self, button="left"):
+        raise NotImplementedError
+
+    def mouse_up(self, button="left"):
+        raise NotImplementedError
+
+    def scroll(self, amount):
+        """Positive scrolls up, negative scrolls down (pyautogui convention)."""
+        raise NotImplementedError
+
+    def key_down(self, key):
+        raise NotImplementedError
+
+    def key_up(self, key):
+        raise NotImplementedError
+
+    @serialized
+    def click(self, button="left"):
+        self.mouse_down(button)
+        self.mouse_up(button)
+
+    @serialized
+    def double_click(self, button="left"):
+        self.click(button)
+        self.click(button)
+
+    @serialized
+    def press(self, key):
+        self.key_down(key)
+        self.key_up(key)
+
+    @serialized
+    def hotkey(self, *keys):
+        pressed = []
+        try:
+            for key in keys:
+                self.key_down(key)
+                pressed.append(key)
+        finally:
+            # Release whatever went down even if a key failed, so no modifier stays held
+            error = None
+            for key in reversed(pressed):
+                try:
+                    self.key_up(key)
+                except Exception as e:
+                    error = error or e
+            if error is not None:
+                raise error
+
+    def close(self):
+        pass
+
+
+class PyAutoGUIBackend(InputBackend):
+    name = "pyautogui"
+
+    def __init__(self):
+        InputBackend.__init__(self)
+        import pyautogui
+        self.pyautogui = pyautogui
+        pyautogui.FAILSAFE = config.PYAUTOGUI_FAILSAFE
+
+    @serialized
+    def move_to(self, x, y, duration=0.0):
+        self.pyautogui.moveTo(x, y, duration=duration)
+
+    @serialized
+    def mouse_down(self, button="left"):
+        self.pyautogui.mouseDown(button=button)
+
+    @serialized
+    def mouse_up(self, button="left"):
+        self.pyautogui.mouseUp(button=button)
+
+    @serialized
+    def click(self, button="left"):
+        self.pyautogui.click(button=button)
+
+    @serialized
+    def double_click(self, button="left"):
+        self.pyautogui.doubleClick(button=button)
+
+    @serialized
+    def scroll(self, amount):
+        self.pyautogui.scroll(amount)
+
+    @serialized
+    def key_down(self, key):
+        self.pyautogui.keyDown(key)
+
+    @serialized
+    def key_up(self, key):
+        self.pyautogui.keyUp(key)
+
+    @serialized
+    def press(self, key):
+        self.pyautogui.press(key)
+
+    @serialized
+    def hotkey(self, *keys):
+        self.pyautogui.hotkey(*keys)
+
+
+# pyautogui-style key names -> X11 keysym names (f1..f35 map to F1..F35, other keys are used as is)
+_X11_KEYSYMS = {
+    "left": "Left", "right": "Right", "up": "Up", "down": "Down",
+    "alt": "Alt_L", "ctrl": "Control_L", "shift": "Shift_L", "win": "Super_L",
+    "esc": "Escape", "space": "space", "enter": "Return", "tab": "Tab", "backspace": "BackSpace",
+    "pageup": "Prior", "pagedown": "Next", "home": "Home", "end": "End", "delete": "Delete",
+    "=": "equal", "-": "minus", "+": "plus",
+}
+_X11_BUTTONS = {"left": 1, "middle": 2, "right": 3}
+
+
+class XTestBackend(InputBackend):
+    """Injects events through the X11 XTest extension (requires python-xlib and an X display)."""
+    name = "xtest"
+
+    def __init__(self):
+        InputBackend.__init__(self)
+        from Xlib import X, XK, display
+        from Xlib.ext import xtest
+        self.X, self.XK, self.xtest = X, XK, xtest
+        self.display = display.Display()
+        if not self.display.has_extension("XTEST"):
+            raise RuntimeError("X server does not support the XTEST extension")
+        self._keycodes = {}
+
+    def _keycode(self, key):
+        keycode = self._keycodes.get(key)
+        if keycode is None:
+            name = _X11_KEYSYMS.get(key)
+            if name is None:
+                # Function keys: pyautogui's "f5" is the keysym "F5" (string_to_keysym is case-sensitive)
+                name = key.upper() if key[:1] == "f" and key[1:].isdigit() else key
+            keysym = self.XK.string_to_keysym(name)
+            keycode = self.display.keysym_to_keycode(keysym)
+            if not keycode:
+                raise ValueError(f"No X11 keycode for key '{key}'")
+            self._keycodes[key] = keycode
+        return keycode
+
+    @serialized
+    def move_to(self, x, y, duration=0.0):
+        self.xtest.fake_input(self.display, self.X.MotionNotify, x=int(x), y=int(y))
+        self.display.flush()
+
+    @serialized
+    def mouse_down(self, button="left"):
+        self.xtest.fake_input(self.display, self.X.ButtonPress, _X11_BUTTONS[button])
+        self.display.flush()
+
+    @serialized
+    def mouse_up(self, button="left"):
+        self.xtest.fake_input(self.display, self.X.ButtonRelease, _X11_BUTTONS[button])
+        self.display.flush()
+
+    @serialized
+    def scroll(self, amount):
+        # X11 scrolls are clicks of buttons 4 (up) / 5 (down), one per unit, like pyautogui on Linux
+        button = 4 if amount > 0 else 5
+        for _ in range(abs(int(amount))):
+            self.xtest.fake_input(self.display, self.X.ButtonPress, button)
+            self.xtest.fake_input(self.display, self.X.ButtonRelease, button)
+        self.display.flush()
+
+    @serialized
+    def key_down(self, key):
+        self.xtest.fake_input(self.display, self.X.KeyPress, self._keycode(key))
+        self.display.flush()
+
+    @serialized
+    def key_up(self, key):
+        self.xtest.fake_input(self.display, self.X.KeyRelease, self._keycode(key))
+        self.display.flush()
+
+    @serialized
+    def close(self):
+        self.display.close()
+
+
+# pyautogui-style key names -> evdev key code names (letters/digits/F-keys map to KEY_<NAME>)
+_EVDEV_KEYS = {
+    "alt": "KEY_LEFTALT", "ctrl": "KEY_LEFTCTRL", "shift": "KEY_LEFTSHIFT", "win": "KEY_LEFTMETA",
+    "esc": "KEY_ESC", "enter": "KEY_ENTER", "pageup": "KEY_PAGEUP", "pagedown": "KEY_PAGEDOWN",
+    "=": "KEY_EQUAL", "-": "KEY_MINUS",
+}
+_EVDEV_BUTTONS = {"left": "BTN_LEFT", "middle": "BTN_MIDDLE", "right": "BTN_RIGHT"}
+
+
+class UInputBackend(InputBackend):
+    """
+    Creates a virtual absolute pointer + keyboard through /dev/uinput (requires python-evdev and
+    write access to /dev/uinput). Works below the display server, so also under Wayland.
+    """
+    name = "uinput"
+
+    def __init__(self):
+        InputBackend.__init__(self)
+        from evdev import AbsInfo, UInput, ecodes
+        self.ecodes = ecodes
+        key_codes = [code for name, code in ecodes.ecodes.items() if name.startswith("KEY_")]
+        button_codes = [getattr(ecodes, name) for name in _EVDEV_BUTTONS.values()]
+        capabilities = {
+            ecodes.EV_KEY: sorted(set(key_codes + button_codes)),
+            ecodes.EV_ABS: [
+                (ecodes.ABS_X, AbsInfo(value=0, min=0, max=config.SCREEN_W - 1, fuzz=0, flat=0, resolution=0)),
+                (ecodes.ABS_Y, AbsInfo(value=0, min=0, max=config.SCREEN_H - 1, fuzz=0, flat=0, resolution=0)),
+            ],
+            ecodes.EV_REL: [ecodes.REL_WHEEL],
+        }
+        self.device = UInput(capabilities, name="handbridge-virtual-input")
+
+    def _code(self, key):
+        name = _EVDEV_KEYS.get(key, f"KEY_{key.upper()}")
+        code = getattr(self.ecodes, name, None)
+        if code is None:
+            raise ValueError(f"No evdev key code for key '{key}'")
+        return code
+
+    def _emit(self, event_type, code, value):
+        self.device.write(event_type, code, value)
+        self.device.syn()
+
+    @serialized
+    def move_to(self, x, y, duration=0.0):
+        self.device.write(self.ecodes.EV_ABS, self.ecodes.ABS_X, int(x))
+        self.device.write(self.ecodes.EV_ABS, self.ecodes.ABS_Y, int(y))
+        self.device.syn()
+
+    @serialized
+    def mouse_down(self, button="left"):
+        self._emit(self.ecodes.EV_KEY, getattr(self.ecodes, _EVDEV_BUTTONS[button]), 1)
+
+    @serialized
+    def mouse_up(self, button="left"):
+        self._emit(self.ecodes.EV_KEY, getattr(self.ecodes, _EVDEV_BUTTONS[button]), 0)
+
+    @serialized
+    def scroll(self, amount):
+        self._emit(self.ecodes.EV_REL, self.ecodes.REL_WHEEL, int(amount))
+
+    @serialized
+    def key_down(self, key):
+        self._emit(self.ecodes.EV_KEY, self._code(key), 1)
+
+    @serialized
+    def key_up(self, key):
+        self._emit(self.ecodes.EV_KEY, self._code(key), 0)
+
+    @serialized
+    def close(self):
+        self.device.close()
+
+
+class RecordingBackend(InputBackend):
+    """
+    Records every primitive call as (timestamp, event, args) in `events` and touches nothing.
+    clock: time source for the timestamps (time.perf_counter by default; replay passes its clock).
+    """
+    name = "recording"
+
+    def __init__(self, clock=time.perf_counter):
+        InputBackend.__init__(self)
+        self.clock = clock
+        self.events = []
+
+    def _record(self, event, *args):
+        with self._lock:
+            self.events.append((self.clock(), event, args))
+
+    def move_to(self, x, y, duration=0.0):
+        self._record("move_to", x, y)
+
+    def mouse_down(self, button="left"):
+        self._record("mouse_down", button)
+
+    def mouse_up(self, button="left"):
+        self._record("mouse_up", button)
+
+    def scroll(self, amount):
+        self._record("scroll", amount)
+
+    def key_down(self, key):
+        self._record("key_down", key)
+
+    def key_up(self, key):
+        self._record("key_up", key)
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+
+BACKENDS = {
+    PyAutoGUIBackend.name: PyAutoGUIBackend,
+    XTestBackend.name: XTestBackend,
+    UInputBackend.name: UInputBackend,
+    RecordingBackend.name: RecordingBackend,
+}
+
+
+def create_backend(name=None):
+    """
+    Instantiates the backend called `name` (default config.INPUT_BACKEND). Falls back to
+    pyautogui if the requested backend is unknown or cannot be initialized on this machine.
+    """
+    name = name or config.INPUT_BACKEND
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        print(f"Unknown input backend '{name}', falling back to pyautogui.")
+        return PyAutoGUIBackend()
+    try:
+        return backend_class()
+    except Exception as e:
+        if backend_class is PyAutoGUIBackend:
+            raise
+        print(f"Input backend '{name}' unavailable ({e}), falling back to pyautogui.")
+        return PyAutoGUIBackend()
+
+
+def measure_injection_latency(backend, samples=200):
+    """
+    Times `samples` move_to calls (a small back-and-forth around the screen centre) and returns
+    (p50_ms, p99_ms). Note: this really moves the cursor.
+    """
+    cx, cy = config.SCREEN_W // 2, config.SCREEN_H // 2
+    latencies = []
+    for i in range(samples):
+        offset = 5 if i % 2 else -5
+        t0 = time.perf_counter()
+        backend.move_to(cx + offset, cy)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cursor injection latency of each input backend.")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--backends", nargs="*", default=[n for n in BACKENDS if n != RecordingBackend.name])
+    args = parser.parse_args()
+
+    for name in args.backends:
+        try:
+            backend = BACKENDS[name]()
+        except Exception as e:
+            print(f"{name:<10} unavailable: {e}")
+            continue
+        try:
+            p50, p99 = measure_injection_latency(backend, args.samples)
+            print(f"{name:<10} move_to p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+        finally:
+            backend.close()
+
+
+if __name__ == "__main__":
+    main()
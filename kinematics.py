@@ -0,0 +1,126 @@
+# kinematics.py
+#
+# Timestamped landmark history for motion gestures (swipe, scroll). Thresholds on per-frame
+# deltas depend on the frame rate: the same hand movement is half as many units per frame at
+# 60 fps as at 30. KinematicsBuffer keeps the last frames with their capture times and answers
+# velocity / acceleration queries over a time window, in normalized units per second, so the
+# thresholds behave the same at 15, 30 or 60 fps.
+#
+# Storage is a NumPy ring of capacity N written twice (at i and i + N), so the last N samples
+# are always one contiguous slice: no copies on read, and np.searchsorted works on the times.
+# The rolling sum of frame deltas over a window telescopes to the difference of its two end
+# points, so a windowed velocity is O(1) once the window start is found (a binary search).
+# The window start is interpolated between the two samples around it, so the window is exactly
+# the requested length whatever the frame timing.
+
+import numpy as np
+
+import config
+
+
+class KinematicsBuffer:
+    def __init__(self, capacity=None, num_points=21):
+        """capacity: frames kept (default: KINEMATICS_HISTORY_SECONDS at KINEMATICS_MAX_FPS)."""
+        if capacity is None:
+            capacity = int(config.KINEMATICS_HISTORY_SECONDS * config.KINEMATICS_MAX_FPS) + 1
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity, dtype=np.float64)
+        self._points = np.zeros((2 * capacity, num_points, 3), dtype=np.float32)
+        self._next = 0    # ring index of the next write
+        self.count = 0    # samples held (<= capacity)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+
+    def push(self, t, points):
+        """Appends the (num_points, 3) landmarks captured at time `t` (seconds). Times must increase."""
+        if self.count and t <= self.latest_time:
+            return  # same frame again (or an out-of-order timestamp): no new motion information
+        i = self._next
+        self._times[i] = self._times[i + self.capacity] = t
+        self._points[i] = points
+        self._points[i + self.capacity] = points
+        self._next = (i + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _window(self):
+        """(times, points) views of the held samples, oldest first."""
+        end = self._next + self.capacity
+        return self._times[end - self.count:end], self._points[end - self.count:end]
+
+    @property
+    def latest_time(self):
+        return self._times[self._next + self.capacity - 1]
+
+    @property
+    def span(self):
+        """Seconds between the oldest and newest sample."""
+        if self.count < 2:
+            return 0.0
+        times, _ = self._window()
+        return float(times[-1] - times[0])
+
+    @property
+    def frame_interval(self):
+        """Seconds between the two newest samples (0.0 with fewer than two)."""
+        if self.count < 2:
+            return 0.0
+        i = self._next + self.capacity - 1
+        return float(self._times[i] - self._times[i - 1])
+
+    def latest(self, point):
+        return self._points[self._next + self.capacity - 1, point]
+
+    def position_at(self, point, t):
+        """Landmark `point` at time `t`, interpolated between samples; None if `t` is outside the history."""
+        times, points = self._window()
+        if not self.count or t < times[0] or t > times[-1]:
+            return None
+        after = int(np.searchsorted(times, t, side="left"))
+        if times[after] == t or after == 0:
+            return points[after, point]
+        t0, t1 = times[after - 1], times[after]
+        w = (t - t0) / (t1 - t0)
+        return points[after - 1, point] + np.float32(w) * (points[after, point] - points[after - 1, point])
+
+    def resample(self, points, times):
+        """
+        Positions of landmarks `points` (list of indices) at the sample `times` (1-D array),
+        interpolated between frames: (len(times), len(points), 3). None if a time is outside the history.
+        """
+        held, history = self._window()
+        if self.count < 2 or times.min() < held[0] or times.max() > held[-1]:
+            return None
+        after = np.searchsorted(held, times, side="left")
+        np.clip(after, 1, self.count - 1, out=after)
+        t0, t1 = held[after - 1], held[after]
+        w = ((times - t0) / (t1 - t0)).astype(np.float32)[:, None, None]
+        before = history[np.ix_(after - 1, points)]
+        return before + w * (history[np.ix_(after, points)] - before)
+
+    def velocity(self, point, window):
+        """Mean (vx, vy, vz) of landmark `point` over the last `window` seconds; None without that much history."""
+        start = self.position_at(point, self.latest_time - window) if self.count >= 2 else None
+        if start is None:
+            return None
+        return (self.latest(point) - start) / window
+
+    def acceleration(self, point, window):
+        """
+        Mean acceleration of landmark `point` over the last `window` seconds: the change between
+        the velocities of the window's two halves. None without that much history.
+        """
+        if self.count < 2:
+            return None
+        now = self.latest_time
+        start = self.position_at(point, now - window)
+        if start is None:
+            return None
+        middle = self.position_at(point, now - window / 2)
+        half = window / 2
+        return (self.latest(point) - 2 * middle + start) / (half * half)
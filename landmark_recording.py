@@ -0,0 +1,163 @@
+# landmark_recording.py
+#
+# Compact on-disk format for timestamped hand landmarks, so live sessions can be replayed
+# through GestureRecognizer without a camera.
+#
+# Layout: a 16-byte header followed by fixed-size little-endian records (RECORD_DTYPE).
+# The record count is derived from the file size, so a recording that was cut short
+# (crash, power loss) is still readable up to its last complete record.
+
+import numpy as np
+
+from hand_tracker import TrackedHand
+
+MAGIC = b"HBLM"
+FORMAT_VERSION = 2  # 2 added capture_time; version 1 files are still read (their hands have no capture time)
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("num_landmarks", "<u2"),
+    ("reserved", "<u8"),
+])
+HEADER_SIZE = HEADER_DTYPE.itemsize  # 16 bytes
+
+NUM_LANDMARKS = 21
+RECORD_DTYPE = np.dtype([
+    ("timestamp", "<f8"),                          # seconds (time.time()) when the frame was recognized
+    ("capture_time", "<f8"),                       # seconds (same clock) when the frame was captured
+    ("present", "u1"),                             # 0 = no hand in this frame
+    ("handedness", "u1"),                          # see HANDEDNESS_CODES
+    ("reserved", "<u2"),
+    ("score", "<f4"),
+    ("landmarks", "<f4", (NUM_LANDMARKS, 3)),
+])
+RECORD_DTYPE_V1 = np.dtype([(name, RECORD_DTYPE.fields[name][0]) for name in RECORD_DTYPE.names
+                            if name != "capture_time"])
+RECORD_DTYPES = {1: RECORD_DTYPE_V1, 2: RECORD_DTYPE}
+
+HANDEDNESS_CODES = {"": 0, "Left": 1, "Right": 2}
+HANDEDNESS_LABELS = {code: label for label, code in HANDEDNESS_CODES.items()}
+
+
+class LandmarkRecorder:
+    """
+    Streams one record per processed frame to disk.
+    Usage:
+        with LandmarkRecorder("session.hblm") as recorder:
+            recorder.write(timestamp, hand, capture_time)   # hand: TrackedHand or None
+    """
+
+    def __init__(self, path, flush_every=300):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self._record = np.zeros(1, dtype=RECORD_DTYPE)  # reused for every frame
+        self._file = open(path, "wb")
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["version"] = FORMAT_VERSION
+        header["num_landmarks"] = NUM_LANDMARKS
+        self._file.write(header.tobytes())
+
+    def write(self, timestamp, hand, capture_time=None):
+        """
+        timestamp: time.time() of the frame's recognition; capture_time: time.time() of its capture
+        (the live pipeline filters and measures velocities on capture times), default `timestamp`.
+        """
+        record = self._record[0]
+        record["timestamp"] = timestamp
+        record["capture_time"] = timestamp if capture_time is None else capture_time
+        if hand is None:
+            record["present"] = 0
+            record["handedness"] = 0
+            record["score"] = 0.0
+            record["landmarks"] = 0.0
+        else:
+            record["present"] = 1
+            record["handedness"] = HANDEDNESS_CODES.get(hand.handedness, 0)
+            record["score"] = hand.score
+            record["landmarks"] = hand.landmarks
+        self._file.write(self._record.tobytes())
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class LandmarkRecording:
+    """
+    Read-only, memory-mapped view of a recording. Records are decoded on demand, so opening
+    an hours-long session is O(1) and seeking by time is a binary search over the timestamps.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) != 1 or header["magic"][0] != MAGIC:
+            raise ValueError(f"{path} is not a landmark recording")
+        record_dtype = RECORD_DTYPES.get(int(header["version"][0]))
+        if record_dtype is None:
+            raise ValueError(f"{path}: unsupported recording version {header['version'][0]}")
+
+        with open(path, "rb") as f:
+            f.seek(0, 2)
+            size = f.tell()
+        count = (size - HEADER_SIZE) // record_dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=record_dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=record_dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def timestamps(self):
+        return self.records["timestamp"]
+
+    @property
+    def capture_times(self):
+        """Capture time of every record; the recognition timestamps for version 1 recordings."""
+        if "capture_time" in self.records.dtype.names:
+            return self.records["capture_time"]
+        return self.records["timestamp"]
+
+    @property
+    def duration(self):
+        if len(self.records) < 2:
+            return 0.0
+        return float(self.records["timestamp"][-1] - self.records["timestamp"][0])
+
+    def seek(self, timestamp):
+        """Returns the index of the first record at or after `timestamp`."""
+        return int(np.searchsorted(self.timestamps, timestamp, side="left"))
+
+    def frame(self, index):
+        """Returns (timestamp, TrackedHand or None) for one record."""
+        record = self.records[index]
+        return float(record["timestamp"]), self._to_hand(record)
+
+    def iter_frames(self, start=0, stop=None):
+        """Yields (timestamp, TrackedHand or None) for records in [start, stop)."""
+        records = self.records[start:stop]
+        for record in records:
+            yield float(record["timestamp"]), self._to_hand(record)
+
+    @staticmethod
+    def _to_hand(record):
+        """TrackedHand with the recorded capture time as its timestamp (None for version 1 recordings)."""
+        if not record["present"]:
+            return None
+        capture_time = float(record["capture_time"]) if "capture_time" in record.dtype.names else None
+        return TrackedHand(np.array(record["landmarks"], dtype=np.float32),
+                           HANDEDNESS_LABELS.get(int(record["handedness"]), ""),
+                           float(record["score"]), timestamp=capture_time)
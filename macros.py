@@ -0,0 +1,224 @@
+# macros.py
+#
+# Composite actions: key sequences, holds, delays, repeats and typed text, bound to a gesture
+# like any action key. A macro is compiled once into a flat list of timed input operations;
+# invoking it only schedules the first one on the ActionScheduler and returns, so a long macro
+# never blocks the action dispatcher (or gesture recognition). Each step is scheduled from the
+# previous one at an absolute offset from the macro's start, so delays do not accumulate drift.
+#
+# Macros are lists of steps, one key per step (plain JSON, so they can live in config.MACROS
+# or directly in the gesture mappings / gesture_mappings.json):
+#   {"press": "f"}                              press and release a key
+#   {"hotkey": ["ctrl", "c"]}                   key combination
+#   {"down": "shift"}, {"up": "shift"}          hold / release a key
+#   {"click": "left"}, {"mouse_down": "left"}, {"mouse_up": "left"}
+#   {"scroll": -5}
+#   {"action": "zoom_in"}                       an action key that takes no gesture data
+#   {"wait": 0.5}                               seconds before the next step
+#   {"type": "hello", "interval": 0.03}         one key press per character
+#   {"repeat": 3, "steps": [...], "interval": 0.2}
+# Consecutive steps are MACRO_STEP_DELAY apart. Cancelling a macro (e.g. on a profile change)
+# drops its remaining steps and releases the keys and buttons it still holds.
+
+import threading
+
+import config
+
+_KEY_NAMES = {" ": "space", "\n": "enter", "\t": "tab"}
+
+
+class Macro:
+    """A compiled macro: `ops` is a list of (offset seconds, operation, argument), sorted by offset."""
+
+    def __init__(self, name, ops):
+        self.name = name
+        self.ops = ops
+        self.duration = ops[-1][0] if ops else 0.0
+
+
+def compile_macro(name, steps, actions, action_arguments=None):
+    """
+    Compiles a step list (see the module comment) into a Macro. Raises ValueError on a bad step.
+    actions: action key -> callable(backend) table for {"action": ...} steps.
+    action_arguments: action key -> names of the gesture data it reads (action_controller.ACTION_ARGUMENTS);
+        a macro has no gesture data, so those actions are rejected.
+    """
+    ops = []
+    _compile_steps(name, steps, actions, action_arguments or {}, ops, 0.0)
+    if not ops:
+        raise ValueError(f"macro {name!r} has no input steps")
+    return Macro(name, ops)
+
+
+def _compile_steps(name, steps, actions, action_arguments, ops, offset):
+    """Appends the ops of `steps` starting at `offset`; returns the offset after the last step."""
+    if not isinstance(steps, list):
+        raise ValueError(f"macro {name!r}: steps must be a list, got {steps!r}")
+    for step in steps:
+        if not isinstance(step, dict) or not step:
+            raise ValueError(f"macro {name!r}: bad step {step!r}")
+        if "wait" in step:
+            offset += float(step["wait"])
+            continue
+        if "repeat" in step:
+            interval = float(step.get("interval", 0.0))
+            for i in range(int(step["repeat"])):
+                if i:
+                    offset += interval
+                offset = _compile_steps(name, step.get("steps", []), actions, action_arguments, ops, offset)
+            continue
+        if "type" in step:
+            interval = float(step.get("interval", config.MACRO_TYPE_INTERVAL))
+            for i, char in enumerate(str(step["type"])):
+                if i:
+                    offset += interval
+                ops.append((offset, "press", _KEY_NAMES.get(char, char)))
+            offset += config.MACRO_STEP_DELAY
+            continue
+        if "press" in step:
+            ops.append((offset, "press", str(step["press"])))
+        elif "hotkey" in step:
+            ops.append((offset, "hotkey", tuple(str(key) for key in step["hotkey"])))
+        elif "down" in step:
+            ops.append((offset, "key_down", str(step["down"])))
+        elif "up" in step:
+            ops.append((offset, "key_up", str(step["up"])))
+        elif "click" in step:
+            ops.append((offset, "click", str(step["click"])))
+        elif "mouse_down" in step:
+            ops.append((offset, "mouse_down", str(step["mouse_down"])))
+        elif "mouse_up" in step:
+            ops.append((offset, "mouse_up", str(step["mouse_up"])))
+        elif "scroll" in step:
+            ops.append((offset, "scroll", int(step["scroll"])))
+        elif "action" in step:
+            if step["action"] not in actions:
+                raise ValueError(f"macro {name!r}: unknown action {step['action']!r}")
+            if action_arguments.get(step["action"]):
+                raise ValueError(f"macro {name!r}: action {step['action']!r} needs gesture data "
+                                 f"({', '.join(action_arguments[step['action']])}), use an input step instead")
+            ops.append((offset, "action", actions[step["action"]]))
+        else:
+            raise ValueError(f"macro {name!r}: unknown step {step!r}")
+        offset += config.MACRO_STEP_DELAY
+    return offset
+
+
+class _Run:
+    __slots__ = ("macro", "start", "index", "timer", "held", "cancelled")
+
+    def __init__(self, macro, start):
+        self.macro = macro
+        self.start = start
+        self.index = 0
+        self.timer = None
+        self.held = []          # ("key" | "button", name) currently held down by this run
+        self.cancelled = False
+
+
+class MacroPlayer:
+    def __init__(self, backend, scheduler):
+        """backend: input_backends.InputBackend; scheduler: action_scheduler.ActionScheduler."""
+        self.backend = backend
+        self.scheduler = scheduler
+        self.started = 0
+        self.skipped = 0        # invocations ignored because the same macro was still running
+        self.cancelled = 0
+        self._runs = []
+        self._lock = threading.Lock()
+
+    def start(self, macro):
+        """Starts `macro` and returns immediately. Ignored while the same macro is still running."""
+        with self._lock:
+            if any(run.macro is macro for run in self._runs):
+                self.skipped += 1
+                return
+            run = _Run(macro, self.scheduler.clock())
+            self._runs.append(run)
+            self.started += 1
+            run.timer = self.scheduler.schedule(run.start + macro.ops[0][0], lambda: self._advance(run))
+
+    def cancel_all(self):
+        """Stops every running macro and releases whatever they hold (on the scheduler thread)."""
+        with self._lock:
+            runs, self._runs = self._runs, []
+        for run in runs:
+            run.cancelled = True
+            self.scheduler.cancel(run.timer)
+            self.cancelled += 1
+            self.scheduler.schedule_in(0.0, lambda run=run: self._release(run))
+
+    def close(self, timeout=1.0):
+        """Cancels every macro, waits until their keys are released, then stops the scheduler thread."""
+        self.cancel_all()
+        # Releases are queued on the scheduler thread (also those of an earlier cancel_all); a
+        # marker queued after them fires once they have run
+        released = threading.Event()
+        self.scheduler.schedule_in(0.0, released.set)
+        released.wait(timeout)
+        self.scheduler.stop(timeout)
+
+    def _advance(self, run):
+        """Runs the ops due at the current offset, then schedules the next batch (scheduler thread)."""
+        if run.cancelled:
+            return
+        ops = run.macro.ops
+        offset = ops[run.index][0]
+        while run.index < len(ops) and ops[run.index][0] == offset:
+            _, operation, argument = ops[run.index]
+            run.index += 1
+            try:
+                self._execute(run, operation, argument)
+            except Exception as e:
+                print(f"Error in macro '{run.macro.name}' ({operation} {argument!r}): {e}")
+        if run.index < len(ops):
+            run.timer = self.scheduler.schedule(run.start + ops[run.index][0], lambda: self._advance(run))
+        else:
+            with self._lock:
+                if run in self._runs:
+                    self._runs.remove(run)
+
+    def _execute(self, run, operation, argument):
+        backend = self.backend
+        if operation == "press":
+            backend.press(argument)
+        elif operation == "hotkey":
+            backend.hotkey(*argument)
+        elif operation == "key_down":
+            backend.key_down(argument)
+            run.held.append(("key", argument))
+        elif operation == "key_up":
+            backend.key_up(argument)
+            if ("key", argument) in run.held:
+                run.held.remove(("key", argument))
+        elif operation == "click":
+            backend.click(argument)
+        elif operation == "mouse_down":
+            backend.mouse_down(argument)
+            run.held.append(("button", argument))
+        elif operation == "mouse_up":
+            backend.mouse_up(argument)
+            if ("button", argument) in run.held:
+                run.held.remove(("button", argument))
+        elif operation == "scroll":
+            backend.scroll(argument)
+        elif operation == "action":
+            argument(backend)
+
+    def _release(self, run):
+        for kind, name in reversed(run.held):
+            try:
+                if kind == "key":
+                    self.backend.key_up(name)
+                else:
+                    self.backend.mouse_up(name)
+            except Exception as e:
+                print(f"Error releasing {name!r} after cancelling macro '{run.macro.name}': {e}")
+        run.held = []
+
+    def snapshot(self):
+        with self._lock:
+            running = len(self._runs)
+        stats = {"running": running, "started": self.started, "skipped": self.skipped, "cancelled": self.cancelled}
+        stats.update(self.scheduler.snapshot())
+        return stats
@@ -54,7 +54,8 @@ def main():
     multithread_main.set_action_controller(global_action_controller) # Pass the instance to multithread_main
 
     root = tk.Tk()
-    app = ui_controller.UIController(root, start_gesture_control, stop_gesture_control, update_action_controller_mappings)
+    app = ui_controller.UIController(root, start_gesture_control, stop_gesture_control, update_action_controller_mappings,
+                                     metrics_provider=multithread_main.get_metrics_snapshot)
     root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root)) # Handle window close event
     root.mainloop()
 
@@ -0,0 +1,213 @@
+# metrics.py
+#
+# Low-overhead latency instrumentation for the gesture pipeline.
+# Frames are stamped (time.perf_counter) at capture and at every stage boundary; the stamps
+# are folded into rolling, log-bucketed histograms per stage. Recording a sample is a bisect
+# plus an increment, so it is cheap enough to run on every frame.
+
+import bisect
+import json
+import os
+import threading
+import time
+
+# Stage boundaries in pipeline order. A frame's stamp dict uses these keys; the latency of a
+# stage is the time between the previous present stamp and its own.
+STAGE_ORDER = [
+    "capture_start",  # camera_worker: before cap.read()
+    "capture",        # frame read from the camera
+    "flip",           # cv2.flip done, about to be published on the frame channel
+    "dequeue",        # processing_worker took it from the frame channel
+    "inference",      # HandTracker.process_frame done
+    "recognize",      # GestureRecognizer.recognize done, handed to the display and action queues
+    "result_dequeue", # display loop took it from the result channel
+    "action_dequeue", # ActionDispatcher took the gesture from its queue
+    "action",         # ActionController.execute_action done
+]
+# Human-readable names for the interval that ends at each stamp
+STAGE_LABELS = {
+    "capture": "capture",
+    "flip": "flip",
+    "dequeue": "frame_channel wait",
+    "inference": "hand tracking",
+    "recognize": "recognition",
+    "result_dequeue": "result_channel wait",
+    "action_dequeue": "action_queue wait",
+    "action": "action dispatch",
+}
+GLASS_TO_ACTION = "glass_to_action"
+
+# Histogram buckets: log-spaced from 10 us to ~20 s (ratio 1.2 -> ~80 buckets)
+_BUCKET_BOUNDS = []
+_b = 10e-6
+while _b < 20.0:
+    _BUCKET_BOUNDS.append(_b)
+    _b *= 1.2
+del _b
+
+
+class LatencyHistogram:
+    """
+    Rolling latency histogram. Samples go into the current window; every `window` seconds the
+    current window becomes the previous one, and percentiles are computed over both, so the
+    numbers reflect roughly the last one to two windows.
+    Designed for a single writer thread; readers get a consistent-enough copy for display.
+    """
+
+    def __init__(self, window=10.0):
+        self.window = window
+        self._current = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self._previous = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self._window_start = time.perf_counter()
+        self.total_count = 0
+        self.total_sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        now = time.perf_counter()
+        if now - self._window_start > self.window:
+            self._previous = self._current
+            self._current = [0] * (len(_BUCKET_BOUNDS) + 1)
+            self._window_start = now
+        self._current[bisect.bisect_left(_BUCKET_BOUNDS, seconds)] += 1
+        self.total_count += 1
+        self.total_sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound (seconds) of the bucket holding the q-th percentile (0-100) of recent samples."""
+        counts = [a + b for a, b in zip(self._current, self._previous)]
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        target = total * q / 100.0
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= target:
+                return _BUCKET_BOUNDS[index] if index < len(_BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            "count": self.total_count,
+            "mean_ms": (self.total_sum / self.total_count * 1000) if self.total_count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class PipelineMetrics:
+    """Per-stage latency histograms, channel drop counters and event counters for one pipeline."""
+
+    def __init__(self, window=10.0):
+        self.window = window
+        self.histograms = {}
+        self.drops = {}
+        self.counters = {}
+        self.started_at = time.time()
+        self.sections = {}  # name -> callable returning a JSON-serializable dict (see add_section)
+        self._lock = threading.Lock()  # only guards creation of new histograms / counters
+
+    def _histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram(self.window))
+        return histogram
+
+    def record(self, stage, seconds):
+        self._histogram(stage).record(seconds)
+
+    def record_stamps(self, stamps, first=None, last=None):
+        """
+        Records the interval ending at each stamp (in STAGE_ORDER) between `first` and `last`.
+        Each pipeline thread records the stages it owns, so every histogram has one writer.
+        """
+        previous = None
+        recording = first is None
+        for key in STAGE_ORDER:
+            t = stamps.get(key)
+            if key == first:
+                recording = True
+            if t is not None:
+                if recording and previous is not None:
+                    self.record(STAGE_LABELS.get(key, key), t - previous)
+                previous = t
+            if key == last:
+                break
+
+    def add_section(self, name, provider):
+        """Includes provider() under `name` in every snapshot (e.g. another component's stats)."""
+        self.sections[name] = provider
+
+    def count_drop(self, queue_name):
+        self.drops[queue_name] = self.drops.get(queue_name, 0) + 1
+
+    def increment(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Returns a JSON-serializable dict of every stage, drop counter and counter."""
+        stages = {name: histogram.snapshot() for name, histogram in list(self.histograms.items())}
+        snapshot = {
+            "timestamp": time.time(),
+            "uptime_s": time.time() - self.started_at,
+            "stages": stages,
+            "drops": dict(self.drops),
+            "counters": dict(self.counters),
+        }
+        for name, provider in list(self.sections.items()):
+            snapshot[name] = provider()
+        return snapshot
+
+    def dump_json(self, path):
+        """Writes a snapshot atomically (temp file + rename) so readers never see a partial file."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+def format_snapshot(snapshot):
+    """Multi-line text summary of a PipelineMetrics snapshot (used by the UI stats panel)."""
+    lines = [f"{'stage':<20}{'p50 ms':>9}{'p99 ms':>9}{'count':>9}"]
+    ordered = [STAGE_LABELS[k] for k in STAGE_ORDER if k in STAGE_LABELS] + [GLASS_TO_ACTION]
+    ordered += [name for name in snapshot["stages"] if name not in ordered]
+    for name in ordered:
+        stats = snapshot["stages"].get(name)
+        if stats:
+            lines.append(f"{name:<20}{stats['p50_ms']:>9.2f}{stats['p99_ms']:>9.2f}{stats['count']:>9}")
+    if snapshot["drops"]:
+        lines.append("drops: " + ", ".join(f"{k}={v}" for k, v in sorted(snapshot["drops"].items())))
+    if snapshot["counters"]:
+        lines.append(", ".join(f"{k}={v}" for k, v in sorted(snapshot["counters"].items())))
+    for name, section in snapshot.items():
+        if isinstance(section, dict) and name not in ("stages", "drops", "counters"):
+            values = [f"{k}={v:.1f}" if isinstance(v, float) else f"{k}={v}" for k, v in section.items() if v is not None]
+            lines.append(f"{name}: " + ", ".join(values))
+    return "\n".join(lines)
+
+
+class MetricsDumper(threading.Thread):
+    """Background thread that dumps a metrics snapshot to `path` every `interval` seconds."""
+
+    def __init__(self, metrics, path, interval, stop_event):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stop_event = stop_event
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self._dump()
+        self._dump()  # final snapshot on shutdown
+
+    def _dump(self):
+        try:
+            self.metrics.dump_json(self.path)
+        except OSError as e:
+            print(f"Error writing metrics to {self.path}: {e}")
@@ -0,0 +1,250 @@
+# motion_predictor.py
+#
+# Predictive cursor positioning. Between the camera capture of a frame and the moveTo that
+# acts on it the pipeline adds several frames of delay (see metrics GLASS_TO_ACTION), so a
+# cursor placed where the finger *was* visibly trails it. MotionPredictor runs a
+# constant-velocity Kalman filter over the cursor point (the filtered index tip, or the pinch
+# midpoint while dragging) and extrapolates it to the expected dispatch time:
+#     predicted = position + velocity * latency
+# where latency is the measured capture-to-action time (LatencyEstimate, fed by the
+# ActionDispatcher), capped at CURSOR_PREDICTION_MAX_HORIZON.
+#
+# Prediction is switched per application profile (config.CURSOR_PREDICTION). Measure it on a
+# recording with
+#   python motion_predictor.py recordings/session.hblm [--latency 0.08]
+# which replays the session with and without prediction and reports how far the cursor is from
+# where the finger actually is when the move lands. With --check the exit code is 1 if prediction
+# makes the mean or p95 error worse; without recordings it checks a generated fixture (a smooth
+# pointing movement with landmark noise, see write_fixture_recording). Only turn prediction on
+# for a profile once the check passes on real recordings of it.
+
+import argparse
+import contextlib
+import math
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import config
+import utils
+
+
+class LatencyEstimate:
+    """
+    Running (exponentially weighted) capture-to-action latency, in seconds. Written by the
+    action thread, read by the recognizer; a float assignment is atomic, so no lock is needed.
+    """
+
+    def __init__(self, initial=None, alpha=0.1):
+        self.value = config.CURSOR_PREDICTION_LATENCY if initial is None else initial
+        self.alpha = alpha
+        self.samples = 0
+
+    def update(self, seconds):
+        self.value += self.alpha * (seconds - self.value)
+        self.samples += 1
+
+
+class MotionPredictor:
+    """
+    Constant-velocity Kalman filter over a 2D point. x and y are independent with the same
+    noise model, so they share one 2x2 covariance. Two dimensions are cheaper in plain floats
+    than as NumPy arrays.
+    """
+
+    def __init__(self, process_noise=None, measurement_noise=None, max_horizon=None):
+        """
+        process_noise: spectral density of the (white) acceleration, (normalized units / s^2)^2 * s.
+            Higher follows direction changes faster, lower gives a steadier velocity.
+        measurement_noise: variance of the measured position (normalized units^2).
+        max_horizon: longest extrapolation in seconds; a longer latency is only partly compensated.
+        """
+        self.process_noise = config.CURSOR_PREDICTION_PROCESS_NOISE if process_noise is None else process_noise
+        self.measurement_noise = config.CURSOR_PREDICTION_MEASUREMENT_NOISE if measurement_noise is None else measurement_noise
+        self.max_horizon = config.CURSOR_PREDICTION_MAX_HORIZON if max_horizon is None else max_horizon
+        self.reset()
+
+    def reset(self):
+        self.x = self.y = None     # filtered position
+        self.vx = self.vy = 0.0    # velocity per second
+        self._t = None
+        self._p00 = self._p01 = self._p11 = 0.0  # position / cross / velocity covariance
+
+    def update(self, x, y, t):
+        """Feeds the point measured at time `t` (seconds)."""
+        if self.x is None:
+            self.x, self.y = x, y
+            self.vx = self.vy = 0.0
+            self._t = t
+            self._p00 = self.measurement_noise
+            self._p01 = 0.0
+            self._p11 = 1.0  # velocity unknown: let the first measurements set it
+            return
+        dt = t - self._t
+        if dt <= 0:
+            return
+        self._t = t
+
+        # Predict to t
+        q = self.process_noise
+        p11 = self._p11
+        self._p00 += dt * (2 * self._p01 + dt * p11) + q * dt ** 3 / 3
+        self._p01 += dt * p11 + q * dt ** 2 / 2
+        self._p11 += q * dt
+        px = self.x + self.vx * dt
+        py = self.y + self.vy * dt
+
+        # Correct with the measurement
+        s = self._p00 + self.measurement_noise
+        k0 = self._p00 / s
+        k1 = self._p01 / s
+        ex, ey = x - px, y - py
+        self.x, self.y = px + k0 * ex, py + k0 * ey
+        self.vx += k1 * ex
+        self.vy += k1 * ey
+        self._p11 -= k1 * self._p01
+        self._p00 *= 1.0 - k0
+        self._p01 *= 1.0 - k0
+
+    def predict(self, horizon):
+        """Extrapolated (x, y) `horizon` seconds after the last update."""
+        horizon = min(max(horizon, 0.0), self.max_horizon)
+        return self.x + self.vx * horizon, self.y + self.vy * horizon
+
+
+def evaluate_prediction(path, latency=None, start_time=None, end_time=None):
+    """
+    Replays a recording twice (prediction off / on, with a fixed `latency`) and compares every
+    cursor position the recognizer emits at time t with the recorded index tip at t + latency,
+    i.e. where the finger is when the move would land. Returns {"off": stats, "on": stats} with
+    pixel errors (see _error_stats).
+    """
+    import replay
+    from gesture_recognizer import GestureRecognizer
+    from landmark_recording import LandmarkRecording
+
+    latency = config.CURSOR_PREDICTION_LATENCY if latency is None else latency
+    recording = LandmarkRecording(path)
+    start = recording.seek(start_time) if start_time is not None else 0
+    stop = recording.seek(end_time) if end_time is not None else None
+    timestamps = np.asarray(recording.timestamps[start:stop], dtype=np.float64)
+    present = np.asarray(recording.records["present"][start:stop], dtype=bool)
+    tips = np.asarray(recording.records["landmarks"][start:stop, utils.INDEX_FINGER_TIP, :2], dtype=np.float64)
+
+    results = {}
+    for mode in ("off", "on"):
+        clock = replay.ReplayClock()
+        recognizer = GestureRecognizer(clock=clock, latency_estimate=LatencyEstimate(latency))
+        recognizer.set_prediction(mode == "on")
+        errors = []
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for timestamp, hand in recording.iter_frames(start, stop):
+                clock.now = timestamp
+                gesture_name, gesture_data = recognizer.recognize(hand)
+                if gesture_name != config.GESTURE_MOUSE_MOVING:
+                    continue
+                # Where the finger is when the move lands: interpolate between the two recorded frames around it
+                target_time = timestamp + latency
+                after = int(np.searchsorted(timestamps, target_time, side="left"))
+                if after >= len(timestamps) or not (present[after] and present[after - 1]):
+                    continue
+                t0, t1 = timestamps[after - 1], timestamps[after]
+                w = (target_time - t0) / (t1 - t0) if t1 > t0 else 1.0
+                tip = tips[after - 1] + w * (tips[after] - tips[after - 1])
+                target_x, target_y = utils.map_to_screen(tip[0], tip[1])
+                errors.append(np.hypot(gesture_data['x'] - target_x, gesture_data['y'] - target_y))
+        results[mode] = _error_stats(errors)
+    return results
+
+
+def check_prediction(results):
+    """Descriptions of where prediction is worse than no prediction in evaluate_prediction `results` (empty if nowhere)."""
+    off, on = results["off"], results["on"]
+    if not off["samples"] or not on["samples"]:
+        return ["no cursor movement to compare"]
+    return [f"{key} {on[key]:.1f} px with prediction > {off[key]:.1f} px without"
+            for key in ("mean_px", "p95_px") if on[key] > off[key]]
+
+
+def write_fixture_recording(path, fps=30, seconds=10.0, noise=0.002, seed=0):
+    """
+    Writes a deterministic recording of a pointing hand (benchmark.synthetic_hand) that moves
+    the cursor along a sum of slow sines, with Gaussian landmark noise, for --check.
+    """
+    import benchmark
+    from hand_tracker import TrackedHand
+    from landmark_recording import LandmarkRecorder
+
+    rng = np.random.default_rng(seed)
+    with LandmarkRecorder(path) as recorder:
+        for i in range(int(seconds * fps)):
+            t = i / fps
+            offset_x = 0.12 * math.sin(2 * math.pi * 0.4 * t) + 0.05 * math.sin(2 * math.pi * 0.9 * t)
+            offset_y = 0.08 * math.sin(2 * math.pi * 0.3 * t + 1.0)
+            points = benchmark.synthetic_hand("point", offset_x, offset_y)
+            points += rng.normal(0.0, noise, points.shape).astype(np.float32)
+            recorder.write(t, TrackedHand(points, "Right", 0.9, timestamp=t), t)
+
+
+def _error_stats(errors):
+    if not errors:
+        return {"samples": 0, "mean_px": None, "p50_px": None, "p95_px": None}
+    errors = np.asarray(errors)
+    return {
+        "samples": len(errors),
+        "mean_px": float(errors.mean()),
+        "p50_px": float(np.percentile(errors, 50)),
+        "p95_px": float(np.percentile(errors, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cursor tracking error with and without motion prediction.")
+    parser.add_argument("recordings", nargs="*", help="Recording files (.hblm); with --check, defaults to the generated fixture")
+    parser.add_argument("--latency", type=float, default=config.CURSOR_PREDICTION_LATENCY,
+                        help="Capture-to-action latency to compensate, in seconds (see glass_to_action in the metrics)")
+    parser.add_argument("--start", type=float, help="Recorded timestamp to start from")
+    parser.add_argument("--end", type=float, help="Recorded timestamp to stop at")
+    parser.add_argument("--check", action="store_true", help="Exit with 1 if prediction makes the error worse")
+    args = parser.parse_args()
+    if not args.recordings and not args.check:
+        parser.error("give at least one recording, or --check to use the generated fixture")
+
+    paths = args.recordings
+    if not paths:
+        fd, fixture = tempfile.mkstemp(suffix=".hblm")
+        os.close(fd)
+        write_fixture_recording(fixture)
+        paths = [fixture]
+
+    failures = []
+    for path in paths:
+        results = evaluate_prediction(path, args.latency, start_time=args.start, end_time=args.end)
+        print(f"{path} (latency {args.latency * 1000:.0f} ms):")
+        for mode in ("off", "on"):
+            stats = results[mode]
+            if not stats["samples"]:
+                print(f"    prediction {mode}: no cursor movement in this recording")
+                continue
+            print(f"    prediction {mode:<3}: {stats['samples']} moves, error mean {stats['mean_px']:.1f} px, "
+                  f"p50 {stats['p50_px']:.1f} px, p95 {stats['p95_px']:.1f} px")
+        if args.check:
+            failures += [f"{path}: {line}" for line in check_prediction(results)]
+    if not args.recordings:
+        os.remove(paths[0])
+
+    if not args.check:
+        return 0
+    if failures:
+        print("\nPREDICTION IS WORSE:")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    print("\nPrediction is not worse than no prediction.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+# multi_hand.py
+#
+# Gesture recognition for several tracked hands (see HandTracker / HandIdTracker):
+#   - one GestureRecognizer per track id, fed with that hand's HandFeatures (built once per
+#     hand and shared with the two-hand gestures), so work grows linearly with the hands in view;
+#   - a "primary" hand whose gestures drive the ActionController. The primary keeps control
+#     until its track is gone, so a second hand entering the frame cannot steal the cursor;
+#   - two-hand gestures, currently pinch-zoom: both hands pinch, then moving them apart /
+#     together emits Zoom In / Zoom Out each time the distance changes by PINCH_ZOOM_STEP_RATIO.
+
+import time
+
+import config
+import filters
+import posture_classifier
+from gesture_recognizer import GestureRecognizer
+from hand_features import HandFeatures
+
+PRIMARY_POLICIES = ("first", "right", "left", "largest")
+
+
+class MultiHandRecognizer:
+    def __init__(self, clock=time.time, recognizer_factory=None, primary_policy=None, latency_estimate=None):
+        """
+        clock: time source shared with the per-hand recognizers.
+        recognizer_factory: callable() -> GestureRecognizer for a new track.
+        primary_policy: how a primary hand is picked when there is none (config.PRIMARY_HAND_POLICY):
+            "first" (longest-tracked hand), "right" / "left" (that handedness if present),
+            "largest" (biggest hand on screen, i.e. closest to the camera).
+        latency_estimate: motion_predictor.LatencyEstimate shared with the default recognizers.
+        """
+        self.clock = clock
+        self.recognizer_factory = recognizer_factory or (
+            lambda: GestureRecognizer(clock=clock, latency_estimate=latency_estimate))
+        self.primary_policy = primary_policy or config.PRIMARY_HAND_POLICY
+        self.classifier = posture_classifier.default_classifier()  # shared HandFeatures posture source
+        if self.primary_policy not in PRIMARY_POLICIES:
+            raise ValueError(f"Unknown primary hand policy '{self.primary_policy}'")
+
+        self.recognizers = {}      # track_id -> GestureRecognizer
+        self._missed = {}          # track_id -> consecutive frames without that hand
+        self.primary_id = None
+        self.primary_hand = None   # TrackedHand of the primary for the most recent frame, or None
+        self.last_results = {}     # track_id -> (gesture, gesture_data) for the most recent frame
+        self.filter_params = filters.filter_params("default")  # landmark filter parameters of the active profile
+        self.prediction_enabled = config.CURSOR_PREDICTION["default"]
+
+        # Pinch-zoom state
+        self.zoom_active = False
+        self.zoom_ids = ()
+        self.zoom_anchor_distance = 0.0
+
+    @property
+    def primary_recognizer(self):
+        return self.recognizers.get(self.primary_id)
+
+    def set_profile(self, profile):
+        """
+        Applies an application profile's landmark filter parameters and cursor prediction setting
+        to every hand (app_detector profile listener).
+        """
+        self.filter_params = filters.filter_params(profile)
+        self.prediction_enabled = config.CURSOR_PREDICTION.get(profile, config.CURSOR_PREDICTION["default"])
+        for recognizer in list(self.recognizers.values()):
+            recognizer.set_filter_params(self.filter_params)
+            recognizer.set_prediction(self.prediction_enabled)
+
+    def _choose_primary(self, hands, features):
+        if self.primary_policy == "largest":
+            return max(hands, key=lambda h: features[h.track_id].hand_scale).track_id
+        if self.primary_policy in ("right", "left"):
+            preferred = [h for h in hands if h.handedness.lower() == self.primary_policy]
+            if preferred:
+                hands = preferred
+        return min(h.track_id for h in hands)
+
+    def _flush(self, track_id):
+        """Ends single-hand recognition for a track as if the hand was lost (e.g. drops a drag)."""
+        return self.recognizers[track_id].recognize(None)
+
+    def recognize(self, hands):
+        """
+        hands: list of hand_tracker.TrackedHand with track ids (may be empty).
+        Returns (gesture, gesture_data) for the primary hand, or a two-hand gesture.
+        """
+        features = {hand.track_id: HandFeatures(hand.landmarks, self.classifier) for hand in hands}
+        results = {}
+        primary_result = None
+
+        # Tracks that are missing this frame: reset like a lost hand, forget them after a few frames
+        for track_id in list(self.recognizers):
+            if track_id in features:
+                self._missed[track_id] = 0
+                continue
+            result = self._flush(track_id)
+            if track_id == self.primary_id and result[0] != config.GESTURE_NONE:
+                primary_result = result
+            self._missed[track_id] = self._missed.get(track_id, 0) + 1
+            if self._missed[track_id] > config.HAND_TRACK_MAX_MISSED:
+                del self.recognizers[track_id]
+                del self._missed[track_id]
+                if track_id == self.primary_id:
+                    self.primary_id = None
+        for hand in hands:
+            if hand.track_id not in self.recognizers:
+                recognizer = self.recognizer_factory()
+                # A hand (re-)entering the frame starts debounced, as a single recognizer does after
+                # losing its hand: nothing fires before GESTURE_DEBOUNCE_DELAY has passed
+                recognizer._reset_all_states()
+                recognizer.set_filter_params(self.filter_params)
+                recognizer.set_prediction(self.prediction_enabled)
+                self.recognizers[hand.track_id] = recognizer
+                self._missed[hand.track_id] = 0
+
+        if self.primary_id is None and hands:
+            self.primary_id = self._choose_primary(hands, features)
+        self.primary_hand = next((h for h in hands if h.track_id == self.primary_id), None)
+
+        zoom_result = self._pinch_zoom(hands, features) if config.PINCH_ZOOM_ENABLED else None
+
+        for hand in hands:
+            if self.zoom_active and hand.track_id in self.zoom_ids:
+                continue  # both hands are driving the two-hand gesture
+            results[hand.track_id] = self.recognizers[hand.track_id].recognize(hand, features[hand.track_id])
+        self.last_results = results
+
+        if primary_result is not None:
+            return primary_result
+        if zoom_result is not None:
+            return zoom_result
+        return results.get(self.primary_id, (config.GESTURE_NONE, {}))
+
+    def _pinch_zoom(self, hands, features):
+        """Engages when the primary and one other hand both pinch; returns a zoom gesture or None."""
+        if self.zoom_active:
+            present = [features.get(track_id) for track_id in self.zoom_ids]
+            if None in present or present[0].pinch_open or present[1].pinch_open:
+                self._end_zoom()
+                return None
+            distance = self._pinch_distance(*present)
+            ratio = distance / self.zoom_anchor_distance if self.zoom_anchor_distance > 0 else 1.0
+            if ratio > 1.0 + config.PINCH_ZOOM_STEP_RATIO:
+                gesture = config.GESTURE_ZOOM_IN
+            elif ratio < 1.0 / (1.0 + config.PINCH_ZOOM_STEP_RATIO):
+                gesture = config.GESTURE_ZOOM_OUT
+            else:
+                return None
+            self.zoom_anchor_distance = distance
+            print(f"Two-hand gesture: {gesture} (ratio {ratio:.2f})")
+            return gesture, {'ratio': ratio, 'performed_action': True}
+
+        if self.primary_hand is None or len(hands) < 2:
+            return None
+        primary = features[self.primary_id]
+        if not primary.pinch_closed:
+            return None
+        for hand in hands:
+            if hand.track_id != self.primary_id and features[hand.track_id].pinch_closed:
+                self.zoom_active = True
+                self.zoom_ids = (self.primary_id, hand.track_id)
+                self.zoom_anchor_distance = self._pinch_distance(primary, features[hand.track_id])
+                # Hand both hands over from single-hand recognition (drops a drag in progress)
+                results = [self._flush(track_id) for track_id in self.zoom_ids]
+                return results[0] if results[0][0] != config.GESTURE_NONE else None
+        return None
+
+    def _end_zoom(self):
+        # Reset both recognizers again so a half-released pinch is not read as a click
+        for track_id in self.zoom_ids:
+            if track_id in self.recognizers:
+                self._flush(track_id)
+        self.zoom_active = False
+        self.zoom_ids = ()
+
+    @staticmethod
+    def _pinch_distance(a, b):
+        (ax, ay), (bx, by) = a.pinch_midpoint, b.pinch_midpoint
+        return ((ax - bx) ** 2 + (ay - by) ** 2) ** 0.5
@@ -0,0 +1,295 @@
+# posture_classifier.py
+#
+# Learned alternative to the hand-written posture checks in utils (is_hand_closed_to_fist,
+# is_hand_fully_open, get_finger_extended_states, ...). Those assume an upright hand and can
+# disagree with each other near their thresholds; the classifier picks exactly one posture per
+# frame from a small MLP, in pure NumPy:
+#   features: landmarks relative to the wrist, scaled by the wrist -> middle MCP distance and
+#             rotated so that direction points up (so the hand's roll does not matter), plus the
+#             hand's up direction itself, which thumbs-up needs (it is defined by the thumb
+#             pointing at the ceiling, not along the hand).
+#   model:    standardize -> dense(HIDDEN) -> ReLU -> dense(one score per posture) -> argmax.
+# Every posture is scored in the same forward pass: two small matrix products per frame.
+#
+# Enable it by pointing config.POSTURE_CLASSIFIER_PATH at a trained model; HandFeatures then takes
+# is_fist / is_open_hand / pointing / middle-finger / thumbs-up from it (pinch stays geometric).
+#
+# Training uses recorded landmarks (landmark_recording.py) with posture labels in the same
+# sidecar file as evaluate.py's gesture labels:
+#   clip.labels.json: {"postures": [{"posture": "fist", "start": 1.0, "end": 2.5}, ...]}
+# (seconds from the clip's first frame). --bootstrap labels every other frame with the
+# heuristics, e.g. to start from the current behaviour and correct the labeled stretches only.
+#   python posture_classifier.py train recordings/ --out models/postures.npz [--bootstrap]
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+import config
+import utils
+
+POSTURES = ("other", "fist", "open", "point", "middle", "thumbs_up")
+HIDDEN = 32
+
+_FLAT = np.array([i for i in range(21) if i != utils.WRIST])
+_MIDDLE_MCP_ROW = int(np.nonzero(_FLAT == utils.MIDDLE_FINGER_MCP)[0][0])
+
+
+def posture_features(points):
+    """
+    Normalized features of a (21, 3) landmark array, or of a batch (N, 21, 3).
+    Returns (N, 62): the 20 non-wrist landmarks relative to the wrist, scaled and rotated so the
+    hand points up (x, y, z per landmark), then the hand's up direction (unit wrist -> middle MCP
+    vector in image coordinates).
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if points.ndim == 2:
+        points = points[None]
+    rel = points[:, _FLAT] - points[:, utils.WRIST:utils.WRIST + 1]
+    up = rel[:, _MIDDLE_MCP_ROW, :2]
+    scale = np.sqrt((up * up).sum(axis=1))
+    np.maximum(scale, 1e-6, out=scale)
+    u = up / scale[:, None]
+    # Rotation taking u to (0, -1), i.e. the hand pointing up in image coordinates, and 1 / scale
+    rotation = np.zeros((len(points), 3, 3), dtype=np.float32)
+    rotation[:, 0, 0] = -u[:, 1] / scale
+    rotation[:, 1, 0] = u[:, 0] / scale
+    rotation[:, 0, 1] = -u[:, 0] / scale
+    rotation[:, 1, 1] = -u[:, 1] / scale
+    rotation[:, 2, 2] = 1.0 / scale
+    return np.concatenate([np.matmul(rel, rotation).reshape(len(points), -1), u], axis=1)
+
+
+def _frame_features(points):
+    """posture_features of a single (21, 3) array as a (62,) vector, without the batch overhead."""
+    rel = points[_FLAT] - points[utils.WRIST]
+    ux, uy = float(rel[_MIDDLE_MCP_ROW, 0]), float(rel[_MIDDLE_MCP_ROW, 1])
+    inv = 1.0 / max((ux * ux + uy * uy) ** 0.5, 1e-6)
+    ux, uy = ux * inv, uy * inv
+    rotation = np.array([[-uy * inv, -ux * inv, 0.0],
+                         [ux * inv, -uy * inv, 0.0],
+                         [0.0, 0.0, inv]], dtype=np.float32)
+    out = np.empty(62, dtype=np.float32)
+    np.dot(rel, rotation, out=out[:60].reshape(20, 3))
+    out[60] = ux
+    out[61] = uy
+    return out
+
+
+class PostureClassifier:
+    def __init__(self, w1, b1, w2, b2, mean, std, postures=POSTURES):
+        self.w1, self.b1, self.w2, self.b2 = w1, b1, w2, b2
+        self.mean, self.std = mean, std
+        self.postures = tuple(postures)
+        # Standardization folded into the first layer, so classify() is just two matrix products
+        self._w1 = (w1 / std[:, None]).astype(np.float32)
+        self._b1 = (b1 - np.dot(mean / std, w1)).astype(np.float32)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data["w1"], data["b1"], data["w2"], data["b2"], data["mean"], data["std"],
+                   [str(p) for p in data["postures"]])
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(path, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2, mean=self.mean, std=self.std,
+                 postures=np.array(self.postures))
+
+    def scores(self, features):
+        """(N, len(postures)) unnormalized scores for (N, 62) features."""
+        hidden = np.dot((features - self.mean) / self.std, self.w1)
+        hidden += self.b1
+        np.maximum(hidden, 0.0, out=hidden)
+        return np.dot(hidden, self.w2) + self.b2
+
+    def classify(self, points):
+        """Posture name of one (21, 3) landmark array."""
+        hidden = np.dot(_frame_features(points), self._w1)
+        hidden += self._b1
+        np.maximum(hidden, 0.0, out=hidden)
+        return self.postures[int(np.argmax(np.dot(hidden, self.w2) + self.b2))]
+
+    def classify_batch(self, points):
+        return [self.postures[i] for i in np.argmax(self.scores(posture_features(points)), axis=1)]
+
+
+_loaded = {}
+
+
+def default_classifier():
+    """The classifier at config.POSTURE_CLASSIFIER_PATH (loaded once per process), or None if unset."""
+    path = config.POSTURE_CLASSIFIER_PATH
+    if not path:
+        return None
+    if path not in _loaded:
+        _loaded[path] = PostureClassifier.load(path)
+        print(f"Posture classifier loaded from {path}")
+    return _loaded[path]
+
+
+# --- Training ---
+
+def heuristic_posture(points):
+    """The utils heuristics folded into one POSTURES label (the same precedence the recognizer uses)."""
+    from hand_features import HandFeatures
+    f = HandFeatures(points)
+    if f.is_thumbs_up_posture:
+        return "thumbs_up"
+    if f.is_middle_finger_scroll_posture:
+        return "middle"
+    if f.is_fist:
+        return "fist"
+    if f.is_open_hand:
+        return "open"
+    if f.is_mouse_move_posture:
+        return "point"
+    return "other"
+
+
+def load_training_frames(paths, bootstrap=False):
+    """
+    Collects (points (N, 21, 3), labels (N,) indices into POSTURES) from recordings.
+    Frames inside a labeled stretch get its posture; other frames are skipped, or labeled by
+    heuristic_posture with `bootstrap`.
+    """
+    from landmark_recording import LandmarkRecording
+    all_points, all_labels = [], []
+    for path in paths:
+        records = LandmarkRecording(path).records
+        labels_path = path[:-len(".hblm")] + ".labels.json"
+        stretches = []
+        if os.path.exists(labels_path):
+            with open(labels_path, "r") as f:
+                stretches = [(POSTURES.index(s["posture"]), float(s["start"]), float(s["end"]))
+                             for s in json.load(f).get("postures", [])]
+        present = records["present"].astype(bool)
+        if not present.any():
+            continue
+        times = records["timestamp"] - records["timestamp"][0]
+        labels = np.full(len(records), -1, dtype=np.int64)
+        for posture, start, end in stretches:
+            labels[(times >= start) & (times <= end)] = posture
+        points = np.asarray(records["landmarks"], dtype=np.float32)
+        if bootstrap:
+            for i in np.nonzero(present & (labels < 0))[0]:
+                labels[i] = POSTURES.index(heuristic_posture(points[i]))
+        keep = present & (labels >= 0)
+        all_points.append(points[keep])
+        all_labels.append(labels[keep])
+    if not all_points:
+        return np.zeros((0, 21, 3), dtype=np.float32), np.zeros(0, dtype=np.int64)
+    return np.concatenate(all_points), np.concatenate(all_labels)
+
+
+def augment(points, rng, copies=4, max_roll=20.0):
+    """
+    Adds mirrored (other hand) and slightly rolled copies. The rolls only vary the orientation
+    features (the normalization removes roll from the rest) and stay small, because thumbs-up
+    does depend on the hand's orientation.
+    """
+    mirrored = points.copy()
+    mirrored[:, :, 0] = 1.0 - mirrored[:, :, 0]
+    base = np.concatenate([points, mirrored])
+    out = [base]
+    for _ in range(copies):
+        angle = np.radians(rng.uniform(-max_roll, max_roll, size=len(base)))
+        c, s = np.cos(angle)[:, None], np.sin(angle)[:, None]
+        centre = base[:, utils.WRIST:utils.WRIST + 1, :2]
+        xy = base[:, :, :2] - centre
+        rolled = base.copy()
+        rolled[:, :, 0] = centre[:, :, 0] + c * xy[:, :, 0] - s * xy[:, :, 1]
+        rolled[:, :, 1] = centre[:, :, 1] + s * xy[:, :, 0] + c * xy[:, :, 1]
+        rolled += rng.normal(0.0, 0.002, size=rolled.shape).astype(np.float32)
+        out.append(rolled)
+    return np.concatenate(out), len(out)
+
+
+def train(points, labels, hidden=HIDDEN, epochs=400, learning_rate=0.01, weight_decay=1e-4, seed=0):
+    """Trains a PostureClassifier (full-batch Adam on class-balanced cross-entropy). Returns (classifier, train accuracy)."""
+    rng = np.random.default_rng(seed)
+    points, repeats = augment(points, rng)
+    labels = np.tile(np.concatenate([labels, labels]), repeats)
+    features = posture_features(points)
+    x = features.astype(np.float64)
+    mean, std = x.mean(axis=0), x.std(axis=0) + 1e-6
+    x = (x - mean) / std
+    n, classes = len(x), len(POSTURES)
+    onehot = np.eye(classes)[labels]
+    counts = np.bincount(labels, minlength=classes).astype(np.float64)
+    sample_weight = (n / (classes * np.maximum(counts, 1)))[labels] / n
+
+    params = [rng.normal(0, np.sqrt(2.0 / x.shape[1]), (x.shape[1], hidden)), np.zeros(hidden),
+              rng.normal(0, np.sqrt(2.0 / hidden), (hidden, classes)), np.zeros(classes)]
+    m = [np.zeros_like(p) for p in params]
+    v = [np.zeros_like(p) for p in params]
+    for step in range(1, epochs + 1):
+        w1, b1, w2, b2 = params
+        h = np.maximum(x @ w1 + b1, 0.0)
+        logits = h @ w2 + b2
+        logits -= logits.max(axis=1, keepdims=True)
+        prob = np.exp(logits)
+        prob /= prob.sum(axis=1, keepdims=True)
+        d_logits = (prob - onehot) * sample_weight[:, None]
+        d_h = (d_logits @ w2.T) * (h > 0)
+        grads = [x.T @ d_h + weight_decay * w1, d_h.sum(axis=0), h.T @ d_logits + weight_decay * w2, d_logits.sum(axis=0)]
+        for i, g in enumerate(grads):
+            m[i] = 0.9 * m[i] + 0.1 * g
+            v[i] = 0.999 * v[i] + 0.001 * g * g
+            params[i] -= learning_rate * (m[i] / (1 - 0.9 ** step)) / (np.sqrt(v[i] / (1 - 0.999 ** step)) + 1e-8)
+
+    f32 = [p.astype(np.float32) for p in params]
+    classifier = PostureClassifier(*f32, mean.astype(np.float32), std.astype(np.float32))
+    accuracy = float((np.argmax(classifier.scores(features), axis=1) == labels).mean())
+    return classifier, accuracy
+
+
+def _recordings(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for directory, _, filenames in os.walk(item):
+                paths += [os.path.join(directory, f) for f in filenames if f.endswith(".hblm")]
+        else:
+            paths.append(item)
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Posture classifier tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="Train a model from labeled recordings")
+    train_parser.add_argument("recordings", nargs="+", help="Recording files (.hblm) or directories")
+    train_parser.add_argument("--out", required=True, help="Model file to write (.npz)")
+    train_parser.add_argument("--bootstrap", action="store_true", help="Label unlabeled frames with the heuristics")
+    train_parser.add_argument("--epochs", type=int, default=400)
+    train_parser.add_argument("--hidden", type=int, default=HIDDEN)
+    compare_parser = commands.add_parser("compare", help="Compare a model with the heuristics on recordings")
+    compare_parser.add_argument("model", help="Model file (.npz)")
+    compare_parser.add_argument("recordings", nargs="+", help="Recording files (.hblm) or directories")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        points, labels = load_training_frames(_recordings(args.recordings), args.bootstrap)
+        if not len(points):
+            parser.error("no labeled frames (add .labels.json posture stretches or use --bootstrap)")
+        counts = np.bincount(labels, minlength=len(POSTURES))
+        print("frames per posture: " + ", ".join(f"{p}={c}" for p, c in zip(POSTURES, counts)))
+        classifier, accuracy = train(points, labels, hidden=args.hidden, epochs=args.epochs)
+        classifier.save(args.out)
+        print(f"training accuracy {accuracy:.3f}; model written to {args.out}")
+    else:
+        classifier = PostureClassifier.load(args.model)
+        points, labels = load_training_frames(_recordings(args.recordings), bootstrap=False)
+        if not len(points):
+            parser.error("no labeled frames in these recordings")
+        predicted = np.array([POSTURES.index(p) for p in classifier.classify_batch(points)])
+        heuristic = np.array([POSTURES.index(heuristic_posture(p)) for p in points])
+        print(f"{len(points)} labeled frames: classifier accuracy {(predicted == labels).mean():.3f}, "
+              f"heuristics {(heuristic == labels).mean():.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# profile_rules.py
+#
+# Window -> application profile matching driven by config.APP_PROFILE_RULES (plus an optional
+# JSON file, config.PROFILE_RULES_PATH), compiled once into a few lookup structures:
+#   - every "title_contains" literal goes into one prefix-factored (trie) regex, so a title is
+#     scanned once and the work per character is bounded by the literal length, not the number
+#     of rules;
+#   - "title_regex" patterns are combined into one alternation (keep these few, each one is
+#     tried at every position of the title);
+#   - "process" and "window_class" names are dict lookups.
+# Resolved profiles are kept in an LRU cache keyed by (title, process, window_class), so a
+# title seen before resolves in O(1).
+#
+# A rule matches when ANY of its patterns matches. When several rules match, the highest
+# "priority" wins; ties go to the rule listed first.
+
+import functools
+import json
+import re
+
+import config
+
+_RULE_KEYS = ("profile", "title_contains", "title_regex", "process", "window_class", "priority")
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def _trie_pattern(words):
+    """Regex matching any of `words`, factored by common prefixes (longest match first)."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = None
+
+    def build(node):
+        if "" in node and len(node) == 1:
+            return None
+        alternatives, single_chars = [], []
+        optional = False
+        for ch in sorted(k for k in node if k != ""):
+            sub = build(node[ch])
+            if sub is None:
+                single_chars.append(re.escape(ch))
+            else:
+                alternatives.append(re.escape(ch) + sub)
+        if "" in node:
+            optional = True
+        if single_chars:
+            alternatives.append(single_chars[0] if len(single_chars) == 1 else "[" + "".join(single_chars) + "]")
+        result = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        return "(?:" + result + ")?" if optional else result
+
+    return build(trie)
+
+
+def load_rules(rules=None, path=None):
+    """Returns config.APP_PROFILE_RULES (or `rules`) followed by the rules in the JSON file `path`."""
+    rules = list(config.APP_PROFILE_RULES if rules is None else rules)
+    path = config.PROFILE_RULES_PATH if path is None else path
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                rules.extend(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Error loading profile rules from {path}: {e}")
+    return rules
+
+
+class ProfileRuleSet:
+    """Compiled profile rules. match(title, process, window_class) -> profile name or None."""
+
+    def __init__(self, rules, cache_size=None):
+        for rule in rules:
+            unknown = set(rule) - set(_RULE_KEYS)
+            if "profile" not in rule or unknown:
+                raise ValueError(f"Invalid profile rule {rule!r} (keys: {', '.join(_RULE_KEYS)})")
+        # Rank 0 is the best rule: highest priority first, then the original order
+        ordered = sorted(enumerate(rules), key=lambda item: (-item[1].get("priority", 0), item[0]))
+        self.rules = [rule for _, rule in ordered]
+        self.profiles = [rule["profile"] for rule in self.rules]
+
+        literal_ranks = {}
+        process_ranks = {}
+        class_ranks = {}
+        regex_parts = []
+        for rank, rule in enumerate(self.rules):
+            for literal in _as_list(rule.get("title_contains")):
+                literal = literal.lower()
+                if literal:
+                    literal_ranks.setdefault(literal, rank)
+            for pattern in _as_list(rule.get("title_regex")):
+                re.compile(pattern)  # report a bad pattern against the rule that contains it
+                regex_parts.append(f"(?P<r{rank}_{len(regex_parts)}>{pattern})")
+            for name in _as_list(rule.get("process")):
+                process_ranks.setdefault(name.lower(), rank)
+            for name in _as_list(rule.get("window_class")):
+                class_ranks.setdefault(name.lower(), rank)
+
+        # The literal regex reports the longest literal starting at each position; a shorter
+        # literal at the same position is a prefix of it, so fold prefixes into each entry.
+        self._literal_ranks = {}
+        for literal, rank in literal_ranks.items():
+            best = rank
+            for end in range(1, len(literal)):
+                prefix_rank = literal_ranks.get(literal[:end])
+                if prefix_rank is not None and prefix_rank < best:
+                    best = prefix_rank
+            self._literal_ranks[literal] = best
+        self._literal_regex = re.compile("(?=(" + _trie_pattern(literal_ranks) + "))") if literal_ranks else None
+        self._title_regex = re.compile("(?=" + "|".join(regex_parts) + ")", re.IGNORECASE) if regex_parts else None
+        self._process_ranks = process_ranks
+        self._class_ranks = class_ranks
+        self.needs_process = bool(process_ranks)
+        self.needs_window_class = bool(class_ranks)
+
+        cache_size = config.PROFILE_RULE_CACHE_SIZE if cache_size is None else cache_size
+        self._cached_match = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    def match(self, title, process=None, window_class=None):
+        return self._cached_match(title or "", process, window_class)
+
+    def cache_info(self):
+        return self._cached_match.cache_info()
+
+    def _match(self, title, process, window_class):
+        best = len(self.rules)
+        if self._literal_regex is not None and title:
+            for m in self._literal_regex.finditer(title.lower()):
+                rank = self._literal_ranks[m.group(1)]
+                if rank < best:
+                    best = rank
+                    if best == 0:
+                        return self.profiles[0]
+        if self._title_regex is not None and title:
+            for m in self._title_regex.finditer(title):
+                rank = int(m.lastgroup[1:].split("_", 1)[0])
+                if rank < best:
+                    best = rank
+        if process:
+            best = min(best, self._process_ranks.get(process.lower(), best))
+        if window_class:
+            best = min(best, self._class_ranks.get(window_class.lower(), best))
+        return self.profiles[best] if best < len(self.rules) else None
+
+
+_rule_set = None
+
+
+def get_rule_set():
+    """The process-wide rule set, compiled from config on first use."""
+    global _rule_set
+    if _rule_set is None:
+        _rule_set = ProfileRuleSet(load_rules())
+    return _rule_set
+
+
+def reload_rules(rules=None, path=None):
+    """Recompiles the process-wide rule set (e.g. after editing the rules file) and returns it."""
+    global _rule_set
+    _rule_set = ProfileRuleSet(load_rules(rules, path))
+    return _rule_set
@@ -0,0 +1,139 @@
+# replay.py
+#
+# Pushes recorded landmark sessions through GestureRecognizer and ActionController as fast
+# as the CPU allows. The recognizer and controller read time from a ReplayClock driven by
+# the recorded timestamps, and input events land in a RecordingBackend instead of the OS.
+#
+# Usage:
+#   python replay.py recordings/session.hblm [more.hblm ...] [--profile browser] [--json out.json]
+
+import argparse
+import contextlib
+import json
+import os
+import time
+from collections import Counter
+
+import config
+import filters
+from action_controller import ActionController
+from gesture_recognizer import GestureRecognizer
+from input_backends import RecordingBackend
+from landmark_recording import LandmarkRecording
+from session import is_actionable
+
+
+class ReplayClock:
+    """Clock whose value is set explicitly from the recorded frame timestamps."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class ReplayResult:
+    def __init__(self, path, frames, session_duration, wall_time, gestures, actions):
+        self.path = path
+        self.frames = frames
+        self.session_duration = session_duration
+        self.wall_time = wall_time
+        self.gestures = gestures  # [(timestamp, gesture_name, gesture_data)]
+        self.actions = actions    # input events: [(timestamp, event, args)]
+
+    @property
+    def speedup(self):
+        return self.session_duration / self.wall_time if self.wall_time > 0 else float("inf")
+
+    def gesture_counts(self):
+        return Counter(name for _, name, _ in self.gestures if name != config.GESTURE_MOUSE_MOVING)
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "frames": self.frames,
+            "session_duration": self.session_duration,
+            "wall_time": self.wall_time,
+            "gestures": [[t, name, data] for t, name, data in self.gestures],
+            "actions": [[t, event, list(args)] for t, event, args in self.actions],
+        }
+
+
+def replay_session(path, mappings=None, profile="default", start_time=None, end_time=None, quiet=True):
+    """
+    Replays one recording and returns a ReplayResult.
+    start_time / end_time (recorded timestamps) select a slice of the session.
+    quiet: silence the recognizer's per-gesture prints.
+    """
+    recording = LandmarkRecording(path)
+    start = recording.seek(start_time) if start_time is not None else 0
+    stop = recording.seek(end_time) if end_time is not None else None
+
+    clock = ReplayClock()
+    backend = RecordingBackend(clock=clock)
+    recognizer = GestureRecognizer(clock=clock, filter_params=filters.filter_params(profile))
+    recognizer.set_prediction(config.CURSOR_PREDICTION.get(profile, config.CURSOR_PREDICTION["default"]))
+    controller = ActionController(initial_mappings=mappings, clock=clock,
+                                  profile_provider=lambda: profile, backend=backend)
+
+    gestures = []
+    frames = 0
+    first_ts = last_ts = None
+    wall_start = time.perf_counter()
+    with open(os.devnull, "w") as devnull, contextlib.ExitStack() as stack:
+        if quiet:
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+        for timestamp, hand in recording.iter_frames(start, stop):
+            clock.now = timestamp
+            if first_ts is None:
+                first_ts = timestamp
+            last_ts = timestamp
+            frames += 1
+
+            gesture_name, gesture_data = recognizer.recognize(hand)
+            if gesture_name == config.GESTURE_NONE:
+                continue
+            gestures.append((timestamp, gesture_name, gesture_data))
+            if is_actionable(gesture_name, gesture_data):
+                controller.execute_action(gesture_name, gesture_data)
+    wall_time = time.perf_counter() - wall_start
+
+    session_duration = (last_ts - first_ts) if frames > 1 else 0.0
+    return ReplayResult(path, frames, session_duration, wall_time, gestures, backend.events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded landmark sessions through the gesture recognizer.")
+    parser.add_argument("recordings", nargs="+", help="Recording files (.hblm)")
+    parser.add_argument("--profile", default="default", help="Application profile used for action mapping")
+    parser.add_argument("--mappings", help="Gesture mappings JSON (as saved by the UI); defaults to config")
+    parser.add_argument("--start", type=float, help="Recorded timestamp to start from")
+    parser.add_argument("--end", type=float, help="Recorded timestamp to stop at")
+    parser.add_argument("--json", help="Write gestures and actions of every session to this file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the recognizer's debug prints")
+    args = parser.parse_args()
+
+    mappings = None
+    if args.mappings:
+        with open(args.mappings, "r") as f:
+            mappings = json.load(f)
+
+    results = []
+    for path in args.recordings:
+        result = replay_session(path, mappings=mappings, profile=args.profile,
+                                start_time=args.start, end_time=args.end, quiet=not args.verbose)
+        results.append(result)
+        print(f"{path}: {result.frames} frames, {result.session_duration:.1f}s recorded, "
+              f"replayed in {result.wall_time:.3f}s ({result.speedup:.0f}x real time)")
+        for name, count in sorted(result.gesture_counts().items()):
+            print(f"    {name}: {count}")
+        print(f"    input events: {len(result.actions)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump([r.to_dict() for r in results], f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
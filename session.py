@@ -0,0 +1,692 @@
+# session.py
+#
+# A GestureSession is one complete pipeline: a video source, hand tracking, recognition, an
+# action sink and a profile, with its own channels, frame pool, stop event and metrics. Nothing
+# in it is module-global, so one process can run several sessions side by side.
+#
+#   camera_worker -> frame_ch -> processing_worker -> result_ch -> consumer (display or headless)
+#                                       |
+#                                       +-> ActionDispatcher -> ActionController -> input backend
+#
+# The two handoffs are latest-value mailboxes (channels.LatestChannel): the camera never waits
+# for a slow stage, a frame that is not picked up before the next one is dropped (and its slot
+# released), and each stage wakes as soon as a new item is published.
+#
+# SessionSupervisor serves several cameras (e.g. one per meeting room) from one host: the
+# sessions are spread over a pool of host processes sized to the CPU cores, so a crash takes down
+# only its own host, and each host's watchdog restarts a session whose camera stops delivering
+# frames without touching the other sessions. Run `python session.py --source 0 --source 1`, or
+# list the sessions in config.SESSIONS.
+
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+
+import app_detector
+import config
+import input_backends
+from action_controller import ActionController
+from action_dispatcher import ActionDispatcher
+from channels import LatestChannel
+from duty_cycle import DutyCycleScheduler
+from frame_buffers import FramePool
+from hand_tracker import HandTracker
+from inference_process import InferenceProcess
+from landmark_recording import LandmarkRecorder
+from metrics import PipelineMetrics
+from motion_predictor import LatencyEstimate
+from multi_hand import MultiHandRecognizer
+
+if sys.platform == "win32":
+    import ctypes
+    HWND_TOPMOST = -1
+    SWP_NOMOVE = 0x0002
+    SWP_NOSIZE = 0x0001
+    SWP_NOACTIVATE = 0x0010
+    FLAGS = SWP_NOMOVE | SWP_NOSIZE | SWP_NOACTIVATE
+
+
+def camera_worker(cap, pool, frame_ch, stop_ev, metrics=None, scheduler=None, frame_interval=None):
+    """
+    Reads and mirrors frames into FramePool slots (no per-frame allocation) and publishes them
+    on frame_ch, replacing a frame the processing worker has not taken yet.
+    Channel items are (slot, stamps); stamps are perf_counter times keyed by stage.
+    scheduler: optional DutyCycleScheduler; frames it skips are grabbed but not decoded.
+    frame_interval: seconds between reads for sources that are not paced by hardware (video
+        files), so they play at their own frame rate instead of being decoded and dropped at full speed.
+    """
+    print("Camera worker started")
+    next_read = time.perf_counter()
+    while not stop_ev.is_set():
+        if frame_interval:
+            delay = next_read - time.perf_counter()
+            if delay > 0 and stop_ev.wait(delay):
+                break
+            next_read = max(next_read + frame_interval, time.perf_counter() - frame_interval)
+        if scheduler is not None and not scheduler.should_process():
+            # Keep the driver's buffer fresh so a wake-up sees a current frame
+            if not cap.grab():
+                stop_ev.wait(0.01)  # no camera / end of file: back off like a failed read
+            continue
+        slot = pool.acquire("camera")
+        if slot is None:
+            # Every buffer is in flight or on screen: a stage is holding on to slots
+            if metrics is not None:
+                metrics.count_drop("frame_pool")
+            time.sleep(0.001)
+            continue
+        stamps = {"capture_start": time.perf_counter()}
+        success = pool.read(cap, slot)
+        if success:
+            stamps["capture"] = time.perf_counter()
+            cv2.flip(slot.frame, 1, dst=slot.frame)
+            stamps["flip"] = time.perf_counter()
+            if metrics is not None:
+                metrics.record_stamps(stamps, last="flip")
+            pool.handoff(slot, "frame_channel")
+            if not frame_ch.put((slot, stamps)):
+                pool.release(slot)  # session is shutting down
+        else:
+            pool.release(slot)
+            stop_ev.wait(0.01)
+    print("Camera worker stopped")
+
+def file_frame_interval(cap):
+    """Seconds per frame if `cap` reads a video file (which has a frame count), else None."""
+    if cap.get(cv2.CAP_PROP_FRAME_COUNT) > 0:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        return 1.0 / fps if fps > 0 else 1.0 / 30
+    return None
+
+def is_actionable(gesture_name, gesture_data):
+    """True if a recognized gesture should be sent to the ActionController."""
+    return gesture_name != config.GESTURE_NONE and \
+        gesture_name != config.GESTURE_SCROLL_MODE_ENGAGED and \
+        gesture_data.get('performed_action', False)
+
+def processing_worker(hand_tracker, gesture_recognizer, pool, frame_ch, result_ch, stop_ev, recorder=None, metrics=None,
+                      dispatcher=None, scheduler=None):
+    """
+    Runs hand tracking and recognition on the newest frame of frame_ch. Actionable gestures go
+    straight to the ActionDispatcher (so none are lost when the display falls behind); result
+    items for display are (gesture, gesture_data, slot, stamps), and the display releases the slot.
+    """
+    print("Processing worker started")
+    while not stop_ev.is_set():
+        item = frame_ch.get(timeout=0.1)  # wakes as soon as a frame arrives; the timeout only bounds the stop check
+        if item is None:
+            continue
+        slot, stamps = item
+        pool.handoff(slot, "processing")
+        stamps["dequeue"] = time.perf_counter()
+
+        # HandTracker or InferenceProcess; either draws on the slot's frame in place
+        _, hands = hand_tracker.process_frame(slot.frame)
+        stamps["inference"] = time.perf_counter()
+        for hand in hands:
+            hand.timestamp = stamps["capture"]
+        if scheduler is not None:
+            scheduler.report(bool(hands))
+        recognized_gesture, gesture_data = gesture_recognizer.recognize(hands)
+        stamps["recognize"] = time.perf_counter()
+        if recorder is not None:
+            # Recordings hold one hand per frame: the primary one, which drives the actions. The
+            # capture time is stored too (as wall-clock time), so replays filter and measure
+            # velocities on the same times as the live pipeline.
+            now = time.time()
+            recorder.write(now, gesture_recognizer.primary_hand, now - (time.perf_counter() - stamps["capture"]))
+        if metrics is not None:
+            metrics.record_stamps(stamps, first="dequeue", last="recognize")
+            metrics.increment(f"inference_{hand_tracker.last_inference_mode}")
+        if dispatcher is not None and is_actionable(recognized_gesture, gesture_data):
+            dispatcher.submit(recognized_gesture, gesture_data, stamps)
+
+        pool.handoff(slot, "result_channel")
+        if not result_ch.put((recognized_gesture, gesture_data, slot, stamps)):
+            pool.release(slot)
+    print("Processing worker stopped")
+
+
+class SessionSpec:
+    """
+    Describes one session. Plain data, so it can be sent to a host process.
+    name: unique label used in logs, status reports and the window title.
+    source: camera index, or a file path / stream URL accepted by cv2.VideoCapture.
+    profile: fixed application profile, or None to follow the active window (app_detector).
+    input_backend: input_backends name for the action sink (config.INPUT_BACKEND);
+        "recording" records the actions without injecting them.
+    actions: False to recognize gestures without executing any action.
+    display: show the annotated frames in a window (q: stop, p: next profile). HighGUI is not
+        thread-safe, so run at most one display session per process.
+    title: window title (default "HandBridge - <name>").
+    recording_path: LandmarkRecorder path (passed through time.strftime), or None.
+    inference_process: run MediaPipe in its own process (config.INFERENCE_IN_SUBPROCESS).
+    """
+
+    def __init__(self, name, source=0, profile=None, input_backend=None, actions=True, display=False, title=None,
+                 recording_path=None, inference_process=None):
+        self.name = name
+        self.source = source
+        self.profile = profile
+        self.input_backend = input_backend
+        self.actions = actions
+        self.display = display
+        self.title = title or f"HandBridge - {name}"
+        self.recording_path = recording_path
+        self.inference_process = inference_process
+
+    @classmethod
+    def from_dict(cls, entry):
+        """Builds a spec from a config.SESSIONS entry (keys are the constructor's arguments)."""
+        return cls(**entry)
+
+
+class GestureSession:
+    def __init__(self, spec, stop_ev=None, action_controller=None, metrics=None):
+        """
+        spec: SessionSpec.
+        stop_ev: threading.Event that ends the session (a new one by default).
+        action_controller: ActionController to drive; by default run() builds one from the spec.
+        metrics: PipelineMetrics to fill (a new one by default).
+        """
+        self.spec = spec
+        self.stop_ev = stop_ev if stop_ev is not None else threading.Event()
+        self.action_controller = action_controller
+        self.metrics = metrics if metrics is not None else PipelineMetrics(window=config.METRICS_WINDOW_SECONDS)
+        self.scheduler = None
+        self.pool = FramePool()
+        # An overwritten frame or result gives its slot back to the pool
+        self.frame_ch = LatestChannel("frame_channel", on_drop=lambda item: self._drop("frame_channel", item[0]))
+        self.result_ch = LatestChannel("result_channel", on_drop=lambda item: self._drop("result_channel", item[2]))
+        self.state = "created"          # created -> starting -> running -> stopped / failed
+        self.error = None
+        self.last_result_time = None    # time.monotonic() of the newest result, the watchdog's heartbeat
+        self.latency_estimate = LatencyEstimate()  # measured capture-to-action latency, for cursor prediction
+        self._hwnd = None
+
+    def stop(self):
+        self.stop_ev.set()
+        self.frame_ch.close()
+        self.result_ch.close()
+
+    def _drop(self, channel_name, slot):
+        self.pool.release(slot)
+        self.metrics.count_drop(channel_name)
+
+    def _create_hand_tracker(self):
+        use_process = self.spec.inference_process
+        if use_process is None:
+            use_process = config.INFERENCE_IN_SUBPROCESS
+        if use_process:
+            try:
+                return InferenceProcess(self.stop_ev)
+            except RuntimeError as e:
+                print(f"[{self.spec.name}] {e}; running inference in-process")
+        return HandTracker()
+
+    def _create_action_controller(self):
+        profile = self.spec.profile
+        return ActionController(profile_provider=None if profile is None else (lambda: profile),
+                                backend=input_backends.create_backend(self.spec.input_backend))
+
+    def run(self):
+        """Runs the pipeline until stop_ev is set (or q is pressed in its window). Blocks."""
+        spec = self.spec
+        self.state = "starting"
+        self.last_result_time = time.monotonic()
+
+        cap = cv2.VideoCapture(spec.source)
+        if not cap.isOpened():
+            print(f"Error: Cannot open camera {spec.source!r} for session {spec.name}.")
+            cap.release()
+            self.state, self.error = "failed", "cannot open source"
+            return
+
+        hand_tracker = self._create_hand_tracker()
+        gesture_recognizer = MultiHandRecognizer(latency_estimate=self.latency_estimate)
+        if spec.profile is None:
+            gesture_recognizer.set_profile(app_detector.get_active_application_profile())
+            app_detector.add_profile_listener(gesture_recognizer.set_profile)
+        else:
+            gesture_recognizer.set_profile(spec.profile)
+
+        recorder = None
+        if spec.recording_path:
+            recording_path = time.strftime(spec.recording_path)
+            os.makedirs(os.path.dirname(recording_path) or ".", exist_ok=True)
+            recorder = LandmarkRecorder(recording_path)
+            print(f"[{spec.name}] Recording landmarks to {recording_path}")
+
+        if config.DUTY_CYCLE_ENABLED:
+            self.scheduler = DutyCycleScheduler()
+            self.metrics.add_section("duty_cycle", self.scheduler.snapshot)
+
+        # Actions run on their own thread so slow OS input calls never stall the vision loop
+        dispatcher = None
+        owns_controller = False  # a controller passed in by the caller is theirs to close
+        if spec.actions:
+            if self.action_controller is None:
+                self.action_controller = self._create_action_controller()
+                owns_controller = True
+            dispatcher = ActionDispatcher(self.action_controller, self.metrics, self.latency_estimate)
+            self.metrics.add_section("cursor_prediction", lambda: {"latency_ms": self.latency_estimate.value * 1000,
+                                                                  "samples": self.latency_estimate.samples})
+            self.metrics.add_section("macros", self.action_controller.macro_snapshot)
+            dispatcher.start()
+
+        cam_thread = threading.Thread(target=camera_worker, name=f"{spec.name}-camera", daemon=True,
+                                      args=(cap, self.pool, self.frame_ch, self.stop_ev, self.metrics, self.scheduler,
+                                            file_frame_interval(cap)))
+        proc_thread = threading.Thread(target=processing_worker, name=f"{spec.name}-processing", daemon=True,
+                                       args=(hand_tracker, gesture_recognizer, self.pool, self.frame_ch, self.result_ch,
+                                             self.stop_ev, recorder, self.metrics, dispatcher, self.scheduler))
+        cam_thread.start()
+        proc_thread.start()
+        self.state = "running"
+
+        try:
+            if spec.display:
+                self._display_loop()
+            else:
+                while not self.stop_ev.is_set():
+                    result = self._next_result(0.1)
+                    if result is not None:
+                        self.pool.release(result[2])
+        except Exception as e:
+            self.state, self.error = "failed", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            print(f"Stopping session {spec.name}...")
+            self.stop()  # Signal all threads to stop and wake the ones waiting on a channel
+
+            if cam_thread.is_alive(): cam_thread.join(timeout=1)
+            if proc_thread.is_alive(): proc_thread.join(timeout=1)
+            if dispatcher is not None:
+                dispatcher.stop()  # Flushes pending discrete actions (e.g. a drag drop) before exiting
+                self.action_controller.cancel_macros()  # and releases keys a running macro still holds
+
+            if cam_thread.is_alive():
+                # Releasing a capture while a read blocks on it can crash the whole process
+                print(f"Warning: camera read of session {spec.name} is stuck, leaving the capture open")
+            elif cap.isOpened():
+                cap.release()
+            if spec.display:
+                cv2.destroyWindow(spec.title)
+            hand_tracker.close()
+            app_detector.remove_profile_listener(gesture_recognizer.set_profile)
+            if owns_controller:
+                # Unregisters its profile listener, stops the macro timer thread and gives the
+                # X display / uinput device back; the next run() builds a new controller
+                self.action_controller.close()
+                self.action_controller = None
+            if recorder is not None: recorder.close()
+            if self.state != "failed":
+                self.state = "stopped"
+            print(f"Session {spec.name} finished.")
+
+    def _next_result(self, timeout):
+        """Takes the newest (gesture, gesture_data, slot, stamps) off result_ch; the caller releases the slot."""
+        result = self.result_ch.get(timeout)
+        if result is None:
+            return None
+        slot, stamps = result[2], result[3]
+        self.pool.handoff(slot, "display")
+        stamps["result_dequeue"] = time.perf_counter()
+        self.metrics.record_stamps(stamps, first="result_dequeue", last="result_dequeue")
+        self.metrics.increment("frames")
+        self.last_result_time = time.monotonic()
+        return result
+
+    def _display_loop(self):
+        title = self.spec.title
+        current_display_gesture = config.GESTURE_NONE
+        last_actionable_gesture = config.GESTURE_NONE
+        prev_time_main = time.time()
+
+        while not self.stop_ev.is_set():
+            result = self._next_result(0.03)
+            if result is None:
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('q'):
+                    self.stop_ev.set()
+                    break
+                continue
+            recognized_gesture_name, gesture_data, display_slot, stamps = result
+            display_frame = display_slot.frame
+
+            # --- Update Display Text and Show Frame ---
+            if recognized_gesture_name != config.GESTURE_NONE:
+                current_display_gesture = recognized_gesture_name
+                if gesture_data.get('performed_action', False):
+                    last_actionable_gesture = recognized_gesture_name
+            else:
+                current_display_gesture = config.GESTURE_NONE
+
+            if self.spec.profile is None:
+                profile_text = f"Profile: {app_detector.get_current_profile_display_name()}"
+            else:
+                profile_text = f"Profile: {app_detector.SUPPORTED_PROFILES.get(self.spec.profile, self.spec.profile)}"
+            cv2.putText(display_frame, profile_text, (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2, cv2.LINE_AA)
+
+            display_text = current_display_gesture
+            if current_display_gesture == config.GESTURE_NONE and last_actionable_gesture != config.GESTURE_NONE:
+                display_text = f"Last Action: {last_actionable_gesture}"
+            elif current_display_gesture == config.GESTURE_SCROLL_MODE_ENGAGED:
+                display_text = config.GESTURE_SCROLL_MODE_ENGAGED
+            cv2.putText(display_frame, display_text, (10, 70),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
+
+            # --- FPS Calculation for main loop---
+            curr_time_main = time.time()
+            fps_main = 1.0 / (curr_time_main - prev_time_main) if (curr_time_main - prev_time_main) > 0 else 0
+            prev_time_main = curr_time_main
+            fps_text_main = f"Display FPS: {fps_main:.1f}"
+            cv2.putText(display_frame, fps_text_main, (10, 110),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2, cv2.LINE_AA)
+            if self.scheduler is not None:
+                cv2.putText(display_frame, self.scheduler.overlay_text(), (10, 140),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2, cv2.LINE_AA)
+
+            cv2.imshow(title, display_frame)  # imshow copies, so the slot can be reused right away
+            self.pool.release(display_slot)
+
+            if sys.platform == "win32":
+                if self._hwnd is None:
+                    self._hwnd = ctypes.windll.user32.FindWindowW(None, title)
+                if self._hwnd:
+                    ctypes.windll.user32.SetWindowPos(self._hwnd, HWND_TOPMOST, 0, 0, 0, 0, FLAGS)
+
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                self.stop_ev.set()
+                break
+            elif key == ord('p') and self.spec.profile is None:
+                app_detector.cycle_app_profile()
+                if self.action_controller is not None:
+                    self.action_controller.update_profile()
+                last_actionable_gesture = config.GESTURE_NONE
+
+
+class SessionHost:
+    """
+    Runs a group of sessions in the current process, one thread each, and acts as their
+    watchdog: a session that fails, or stalls (no result for `stall_timeout` seconds, e.g. an
+    unplugged camera or a hung read), is stopped and started again after `restart_delay`.
+    The other sessions keep running throughout.
+    """
+
+    def __init__(self, specs, stall_timeout=None, restart_delay=None):
+        self.specs = {spec.name: spec for spec in specs}
+        self.stall_timeout = config.SESSION_STALL_TIMEOUT if stall_timeout is None else stall_timeout
+        self.restart_delay = config.SESSION_RESTART_DELAY if restart_delay is None else restart_delay
+        self.sessions = {}      # name -> current GestureSession
+        self.threads = {}       # name -> thread running it
+        self.restarts = {name: 0 for name in self.specs}
+        self._restart_at = {}   # name -> time.monotonic() of the next start attempt
+        self._last_frames = {}  # name -> (frames counter, time) at the previous status(), for the fps
+
+    def start(self):
+        for name in self.specs:
+            self._start(name)
+
+    def _start(self, name):
+        session = GestureSession(self.specs[name])
+        thread = threading.Thread(target=self._run_session, args=(session,), name=f"session-{name}", daemon=True)
+        self.sessions[name] = session
+        self.threads[name] = thread
+        self._last_frames.pop(name, None)
+        thread.start()
+
+    @staticmethod
+    def _run_session(session):
+        try:
+            session.run()
+        except Exception as e:
+            session.state, session.error = "failed", f"{type(e).__name__}: {e}"
+            print(f"Session {session.spec.name} crashed: {session.error}")
+
+    def check(self):
+        """One watchdog pass: restarts sessions that failed or stalled."""
+        now = time.monotonic()
+        for name, session in list(self.sessions.items()):
+            if name in self._restart_at:
+                if now >= self._restart_at[name]:
+                    del self._restart_at[name]
+                    self.restarts[name] += 1
+                    print(f"Restarting session {name} (restart #{self.restarts[name]})")
+                    self._start(name)
+                continue
+            if self.threads[name].is_alive():
+                if session.state in ("starting", "running") and now - session.last_result_time > self.stall_timeout:
+                    print(f"Session {name} stalled ({now - session.last_result_time:.1f} s without a frame)")
+                    session.state, session.error = "stalled", "no frames"
+                    session.stop()  # its threads are abandoned if they stay stuck; the new session does not wait
+                    self._restart_at[name] = now + self.restart_delay
+            elif session.state != "stopped":  # ended without being asked to (failed to open, crashed)
+                self._restart_at[name] = now + self.restart_delay
+        return self
+
+    def status(self):
+        """One JSON-serializable status dict per session (with its metrics snapshot)."""
+        now = time.monotonic()
+        statuses = []
+        for name, session in self.sessions.items():
+            snapshot = session.metrics.snapshot()
+            frames = snapshot["counters"].get("frames", 0)
+            previous = self._last_frames.get(name)
+            fps = None
+            if previous is not None and now > previous[1]:
+                fps = (frames - previous[0]) / (now - previous[1])
+            self._last_frames[name] = (frames, now)
+            statuses.append({
+                "name": name,
+                "source": session.spec.source,
+                "state": "restarting" if name in self._restart_at else session.state,
+                "error": session.error,
+                "restarts": self.restarts[name],
+                "pid": os.getpid(),
+                "fps": fps,
+                "last_result_age_s": now - session.last_result_time if session.last_result_time is not None else None,
+                "metrics": snapshot,
+            })
+        return statuses
+
+    def stop(self, timeout=2.0):
+        for session in self.sessions.values():
+            session.stop()
+        for thread in self.threads.values():
+            thread.join(timeout=timeout)
+
+
+def _host_main(specs, status_q, control, stall_timeout, restart_delay, status_interval):
+    """
+    Host process entry point: runs `specs` with a SessionHost and reports their status until
+    the supervisor sends None over `control` (or goes away, which closes the pipe).
+    """
+    if any(spec.actions and spec.profile is None for spec in specs):
+        app_detector.start_profile_detector()
+    host = SessionHost(specs, stall_timeout, restart_delay)
+    host.start()
+    try:
+        while not control.poll(status_interval):
+            for status in host.check().status():
+                status_q.put(status)
+    except (KeyboardInterrupt, EOFError, OSError):
+        pass  # Ctrl+C reaches every process and the supervisor stops the hosts itself
+    finally:
+        host.stop()
+        app_detector.stop_profile_detector()
+
+
+class SessionSupervisor:
+    def __init__(self, specs, processes=None, stall_timeout=None, restart_delay=None, status_interval=None):
+        """
+        specs: SessionSpecs, with unique names.
+        processes: number of host processes (config.SESSION_PROCESSES, default: CPU cores). The
+            sessions are dealt round-robin over them, so with at least as many cores as sessions
+            every session runs in its own process.
+        stall_timeout / restart_delay: per-session watchdog settings, see SessionHost.
+        status_interval: seconds between status reports from the hosts.
+        """
+        names = [spec.name for spec in specs]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Session names must be unique: {names}")
+        if not specs:
+            raise ValueError("No sessions to run")
+        processes = processes or config.SESSION_PROCESSES or os.cpu_count() or 1
+        processes = min(processes, len(specs))
+        self.groups = [specs[i::processes] for i in range(processes)]
+        self.stall_timeout = config.SESSION_STALL_TIMEOUT if stall_timeout is None else stall_timeout
+        self.restart_delay = config.SESSION_RESTART_DELAY if restart_delay is None else restart_delay
+        self.status_interval = config.SESSION_STATUS_INTERVAL if status_interval is None else status_interval
+
+        # spawn: the hosts load MediaPipe themselves instead of inheriting this process's threads
+        self._ctx = multiprocessing.get_context("spawn")
+        self._status_q = self._ctx.Queue()
+        # Stop requests go over one pipe per host rather than a shared multiprocessing.Event:
+        # setting an Event can block forever once a process waiting on it has been killed
+        self._controls = [None] * processes
+        self._stopping = False
+        self.hosts = [None] * processes
+        self.host_restarts = 0
+        self._host_restart_at = {}  # host index -> time.monotonic() of the next start attempt
+        self.status = {}            # session name -> latest status dict from its host
+
+    def _start_host(self, index):
+        control_recv, control_send = self._ctx.Pipe(duplex=False)
+        # Hosts are not daemonic so their sessions may start inference processes of their own
+        process = self._ctx.Process(
+            target=_host_main, name=f"HandBridge-host-{index}",
+            args=(self.groups[index], self._status_q, control_recv, self.stall_timeout, self.restart_delay,
+                  self.status_interval))
+        process.start()
+        control_recv.close()
+        if self._controls[index] is not None:
+            self._controls[index].close()
+        self._controls[index] = control_send
+        self.hosts[index] = process
+        print(f"Host {index} (pid {process.pid}): sessions {', '.join(spec.name for spec in self.groups[index])}")
+
+    def start(self):
+        self._stopping = False
+        for index in range(len(self.groups)):
+            self._start_host(index)
+
+    def poll(self):
+        """Collects status reports and restarts host processes that died."""
+        while True:
+            try:
+                status = self._status_q.get_nowait()
+            except queue.Empty:
+                break
+            self.status[status["name"]] = status
+        if self._stopping:
+            return
+        now = time.monotonic()
+        for index, process in enumerate(self.hosts):
+            if index in self._host_restart_at:
+                if now >= self._host_restart_at[index]:
+                    del self._host_restart_at[index]
+                    self.host_restarts += 1
+                    self._start_host(index)
+            elif process is not None and not process.is_alive():
+                print(f"Host {index} exited (code {process.exitcode}), restarting its sessions")
+                for spec in self.groups[index]:
+                    if spec.name in self.status:
+                        self.status[spec.name]["state"] = "host restarting"
+                self._host_restart_at[index] = now + self.restart_delay
+
+    def snapshot(self):
+        return {name: dict(status) for name, status in self.status.items()}
+
+    def stop(self, timeout=5.0):
+        self._stopping = True
+        for control in self._controls:
+            if control is not None:
+                try:
+                    control.send(None)
+                except OSError:
+                    pass  # that host is already gone
+        deadline = time.monotonic() + timeout
+        for process in self.hosts:
+            while process is not None and process.is_alive() and time.monotonic() < deadline:
+                process.join(timeout=0.1)
+                self.poll()  # keep the status queue drained so hosts can flush it and exit
+            if process is not None and process.is_alive():
+                print(f"Host pid {process.pid} did not exit, terminating it")
+                process.terminate()
+                process.join(timeout=1)
+        for index, control in enumerate(self._controls):
+            if control is not None:
+                control.close()
+                self._controls[index] = None
+        self.poll()
+        for status in self.status.values():
+            status["state"] = "stopped"
+
+    def run(self, stop_ev=None, report_interval=None):
+        """Starts the hosts and supervises them until stop_ev is set or Ctrl+C, printing a status table."""
+        report_interval = self.status_interval * 5 if report_interval is None else report_interval
+        self.start()
+        next_report = time.monotonic() + report_interval
+        try:
+            while stop_ev is None or not stop_ev.is_set():
+                time.sleep(0.2)
+                self.poll()
+                if time.monotonic() >= next_report:
+                    print(format_status(self.snapshot()))
+                    next_report += report_interval
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print("Stopping sessions...")
+            self.stop()
+
+
+def format_status(statuses):
+    """Text table of SessionSupervisor.snapshot(): one line per session."""
+    lines = [f"{'session':<16}{'state':<17}{'fps':>6}{'track ms':>10}{'restarts':>10}{'drops':>7}  pid"]
+    for name, status in sorted(statuses.items()):
+        metrics = status.get("metrics") or {}
+        tracking = metrics.get("stages", {}).get("hand tracking")
+        fps = status.get("fps")
+        lines.append(f"{name:<16}{status['state']:<17}"
+                     f"{fps if fps is not None else 0:>6.1f}"
+                     f"{tracking['p50_ms'] if tracking else 0:>10.2f}"
+                     f"{status['restarts']:>10}"
+                     f"{sum(metrics.get('drops', {}).values()):>7}  {status['pid']}")
+    return "\n".join(lines)
+
+
+def _parse_source(value):
+    return int(value) if value.isdigit() else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve several cameras, one gesture session each.")
+    parser.add_argument("--source", action="append", type=_parse_source, default=[],
+                        help="Camera index or stream URL; repeat for more sessions (default: config.SESSIONS)")
+    parser.add_argument("--profile", help="Fixed application profile for --source sessions")
+    parser.add_argument("--backend", help="Input backend for --source sessions (e.g. recording for a dry run)")
+    parser.add_argument("--processes", type=int, help="Host processes (default: CPU cores)")
+    args = parser.parse_args()
+
+    if args.source:
+        specs = [SessionSpec(f"camera{i}", source, profile=args.profile, input_backend=args.backend)
+                 for i, source in enumerate(args.source)]
+    else:
+        specs = [SessionSpec.from_dict(entry) for entry in config.SESSIONS]
+    if not specs:
+        parser.error("no sessions: pass --source or fill config.SESSIONS")
+    SessionSupervisor(specs, processes=args.processes).run()
+
+
+if __name__ == "__main__":
+    main()
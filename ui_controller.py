@@ -7,19 +7,22 @@ import time
 
 import config
 import app_detector
+import metrics
+import gesture_templates
 
 # Define a file to save and load configurations
 CONFIG_FILE = "gesture_mappings.json"
 
 class UIController:
-    def __init__(self, master, start_callback, stop_callback, update_mappings_callback):
+    def __init__(self, master, start_callback, stop_callback, update_mappings_callback, metrics_provider=None):
         self.master = master
         self.master.title("HandBridge")
-        self.master.geometry("800x600")
+        self.master.geometry("800x750")
 
         self.start_callback = start_callback
         self.stop_callback = stop_callback
         self.update_mappings_callback = update_mappings_callback
+        self.metrics_provider = metrics_provider # Callable returning a metrics.PipelineMetrics snapshot
 
         self.running = False
         self.gesture_mappings = self._load_mappings()
@@ -30,6 +33,9 @@ class UIController:
         # Update the action_controller with the loaded mappings
         self.update_mappings_callback(self.gesture_mappings)
 
+        if self.metrics_provider is not None:
+            self._refresh_stats()
+
 
     def _load_mappings(self):
         if os.path.exists(CONFIG_FILE):
@@ -71,6 +77,13 @@ class UIController:
         self.profile_dropdown.set(list(app_detector.SUPPORTED_PROFILES.keys())[0]) # Set default
         self.profile_dropdown.bind("<<ComboboxSelected>>", self._on_profile_selected)
 
+        # Pipeline Stats Frame (per-stage latency, queue drops)
+        if self.metrics_provider is not None:
+            stats_frame = ttk.LabelFrame(self.master, text="Pipeline Stats")
+            stats_frame.pack(padx=10, pady=5, fill="x")
+            self.stats_label = ttk.Label(stats_frame, text="Not running", font=("Courier", 9), justify="left")
+            self.stats_label.pack(padx=5, pady=5, anchor="w")
+
         # Mappings Display Frame
         self.mappings_frame = ttk.LabelFrame(self.master, text="Gesture Mappings")
         self.mappings_frame.pack(padx=10, pady=10, fill="both", expand=True)
@@ -99,7 +112,10 @@ class UIController:
         current_profile_mappings = self.gesture_mappings.get(current_profile_name, {})
 
         row = 0
-        for gesture_name in config.CUSTOM_APP_GESTURE_MAPPINGS["default"].keys(): # Use default keys for consistent order
+        # Use default keys for consistent order, then the custom template gestures (gesture_templates.py)
+        gesture_names = list(config.CUSTOM_APP_GESTURE_MAPPINGS["default"].keys())
+        gesture_names += [name for name in gesture_templates.template_names() if name not in gesture_names]
+        for gesture_name in gesture_names:
             if gesture_name == config.GESTURE_MOUSE_MOVING or gesture_name == config.GESTURE_DRAGGING:
                 # These gestures' actions are fixed and not user-configurable in this UI
                 ttk.Label(self.inner_mappings_frame, text=f"{gesture_name}:").grid(row=row, column=0, padx=5, pady=2, sticky="w")
@@ -111,11 +127,12 @@ class UIController:
             ttk.Label(self.inner_mappings_frame, text=f"{gesture_name}:").grid(row=row, column=0, padx=5, pady=2, sticky="w")
 
             var = tk.StringVar()
-            # Set current value or default if not found
-            var.set(current_profile_mappings.get(gesture_name, "do_nothing"))
+            # Set current value or default if not found (an inline macro step list shows as "macro")
+            action = current_profile_mappings.get(gesture_name, "do_nothing")
+            var.set(action if isinstance(action, str) else "macro")
             self.gesture_vars[gesture_name] = var
 
-            dropdown = ttk.Combobox(self.inner_mappings_frame, textvariable=var, values=config.AVAILABLE_ACTIONS)
+            dropdown = ttk.Combobox(self.inner_mappings_frame, textvariable=var, values=config.AVAILABLE_ACTIONS + sorted(config.MACROS))
             dropdown.grid(row=row, column=1, padx=5, pady=2, sticky="ew")
             dropdown.bind("<<ComboboxSelected>>", lambda event, g=gesture_name, p=current_profile_name: self._on_mapping_changed(g, p))
             row += 1
@@ -124,6 +141,14 @@ class UIController:
         self.canvas.config(scrollregion=self.canvas.bbox("all"))
 
 
+    def _refresh_stats(self):
+        if self.running:
+            try:
+                self.stats_label.config(text=metrics.format_snapshot(self.metrics_provider()))
+            except Exception as e:
+                self.stats_label.config(text=f"Stats unavailable: {e}")
+        self.master.after(config.UI_STATS_REFRESH_MS, self._refresh_stats)
+
     def _on_profile_selected(self, event=None):
         self._populate_mappings()
 
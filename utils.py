@@ -1,5 +1,7 @@
 import numpy as np
+from itertools import chain
 from math import hypot
+from operator import attrgetter
 import config
 import mediapipe as mp
 
@@ -59,6 +61,103 @@ def is_thumb_extended(landmarks):
         return False
 
 
+# --- Array-backed landmark helpers ---
+# 以下函数作用于 (21, 3) float32 数组（x, y, z 归一化坐标），
+# 与上面基于 NormalizedLandmark 的版本逻辑一致。
+WRIST = 0
+THUMB_IP = 3
+THUMB_TIP = 4
+INDEX_FINGER_MCP = 5
+INDEX_FINGER_TIP = 8
+MIDDLE_FINGER_MCP = 9
+MIDDLE_FINGER_TIP = 12
+
+_LANDMARK_XYZ = attrgetter("x", "y", "z")
+_PIP_TIP = ((6, 8), (10, 12), (14, 16), (18, 20))  # (PIP, TIP) per finger, index..pinky
+
+
+def landmarks_to_array(landmarks):
+    """Converts a sequence of MediaPipe landmarks into a contiguous (21, 3) float32 array."""
+    # One flat fromiter pass; np.array over a list of (x, y, z) tuples has to discover the
+    # nesting first and is ~1.5x slower for a single hand
+    return np.fromiter(chain.from_iterable(map(_LANDMARK_XYZ, landmarks)), dtype=np.float32,
+                       count=3 * len(landmarks)).reshape(-1, 3)
+
+
+def posture_measurements(points):
+    """
+    Converts a (21, 3) landmark array once into what the posture predicates read: a flat list
+    of Python floats, landmark i at [3 * i : 3 * i + 3].
+    For a single hand the handful of distances the predicates need is cheaper in scalar math
+    than any NumPy expression (each NumPy call costs about as much as all of them together),
+    so the array is only touched by this one ravel().tolist().
+    """
+    return points.ravel().tolist()
+
+
+def get_finger_extended_states_array(points, measurements=None):
+    """
+    Array version of get_finger_extended_states.
+    Returns: list[bool]: [Index, Middle, Ring, Pinky]
+    """
+    c = measurements or posture_measurements(points)
+    tol = config.FINGER_CURL_TOLERANCE
+    # tip above (lower y than) "DIP" (tip - 2) and "DIP" above "PIP" (tip - 3), like the scalar version
+    return [c[3 * tip + 1] < c[3 * tip - 5] - tol and c[3 * tip - 5] < c[3 * tip - 8] - tol
+            for tip in (8, 12, 16, 20)]
+
+
+def is_thumb_extended_array(points, measurements=None):
+    """Array version of is_thumb_extended (2D wrist distance of THUMB_TIP vs THUMB_IP)."""
+    c = measurements or posture_measurements(points)
+    wx, wy = c[0], c[1]
+    tip_dx, tip_dy = c[3 * THUMB_TIP] - wx, c[3 * THUMB_TIP + 1] - wy
+    ip_dx, ip_dy = c[3 * THUMB_IP] - wx, c[3 * THUMB_IP + 1] - wy
+    return tip_dx * tip_dx + tip_dy * tip_dy > ip_dx * ip_dx + ip_dy * ip_dy
+
+
+def is_hand_fully_open_array(points, measurements=None):
+    """Array version of is_hand_fully_open: every finger tip is at least as far from the wrist as its PIP."""
+    c = measurements or posture_measurements(points)
+    wx, wy, wz = c[0], c[1], c[2]
+    for pip, tip in _PIP_TIP:
+        tx, ty, tz = c[3 * tip] - wx, c[3 * tip + 1] - wy, c[3 * tip + 2] - wz
+        px, py, pz = c[3 * pip] - wx, c[3 * pip + 1] - wy, c[3 * pip + 2] - wz
+        if tx * tx + ty * ty + tz * tz < px * px + py * py + pz * pz:
+            return False
+    return True
+
+
+def is_hand_closed_to_fist_array(points, measurements=None):
+    """Array version of is_hand_closed_to_fist: all five tips lie close to the middle finger MCP."""
+    c = measurements or posture_measurements(points)
+    threshold_sq = config.FIST_CLOSED_THRESHOLD ** 2
+    mx, my, mz = c[3 * MIDDLE_FINGER_MCP], c[3 * MIDDLE_FINGER_MCP + 1], c[3 * MIDDLE_FINGER_MCP + 2]
+    for tip in (THUMB_TIP, 8, 12, 16, 20):
+        dx, dy, dz = c[3 * tip] - mx, c[3 * tip + 1] - my, c[3 * tip + 2] - mz
+        if dx * dx + dy * dy + dz * dz > threshold_sq:
+            return False
+    return True
+
+
+def calculate_landmark_distance_2d_array(points, idx1, idx2):
+    """Array version of calculate_landmark_distance_2d for two landmark indices."""
+    x1, y1 = points[idx1, :2].tolist()
+    x2, y2 = points[idx2, :2].tolist()
+    return hypot(x1 - x2, y1 - y2)
+
+
+def compute_hand_postures(points):
+    """
+    一次性计算所有姿态判断，返回 (is_fist, is_open_hand, finger_ext_states, is_thumb_extended)。
+    """
+    measurements = posture_measurements(points)
+    return (is_hand_closed_to_fist_array(points, measurements),
+            is_hand_fully_open_array(points, measurements),
+            get_finger_extended_states_array(points, measurements),
+            is_thumb_extended_array(points, measurements))
+
+
 def map_to_screen(x_normalized, y_normalized):
     """Maps normalized hand coordinates to actual screen coordinates."""
     screen_x = np.interp(x_normalized,
@@ -75,6 +174,10 @@ def get_pinch_midpoint_normalized(thumb_tip, index_tip):
     mid_y = (thumb_tip.y + index_tip.y) / 2
     return mid_x, mid_y
 
+def get_pinch_midpoint_normalized_array(thumb_tip, index_tip):
+    """Array version of get_pinch_midpoint_normalized; thumb_tip / index_tip are landmark rows."""
+    return float(thumb_tip[0] + index_tip[0]) / 2, float(thumb_tip[1] + index_tip[1]) / 2
+
 
 def is_hand_fully_open(landmarks):
     """